@@ -15,13 +15,40 @@ LOGGING_LEVEL = logging.DEBUG
 LOG_DIR = os.path.join(ROOT_DIR, "logs")
 TEST_DIR = os.path.join(ROOT_DIR, "tests")
 COLOR_THEME = "dark"
+WATCH_STYLES = False
 DEFAULT_LOCALE = "en_US"
 # STATS_DB = os.path.join(RESOURCES_DIR, "stats.sqlite")
 DB = os.path.join(RESOURCES_DIR, "db.sqlite")
 WORDSET_TABLE = "wordsets"
 WORD_TABLE = "words"
-CON_NAME = "db_con"
+DB_STATEMENT_CACHE_SIZE = 64
+DB_JOURNAL_MODE = "WAL"
+AUTOSAVE_INTERVAL = 10 * 1000
 GAME_TABLE = "games"
+GAME_ERROR_TABLE = "game_errors"
+DAILY_STATS_TABLE = "daily_stats"
+HISTORY_PAGE_SIZE = 100
+INGEST_CHUNK_SIZE = 1000
+ARCHIVED_ERROR_TABLE = "archived_errors"
+USER_STATS_TABLE = "user_stats"
+ERROR_TOTAL_TABLE = "error_char_totals"
+GAME_CONFUSION_TABLE = "game_confusions"
+CONFUSION_TOTAL_TABLE = "confusion_totals"
+GAME_LATENCY_TABLE = "game_latencies"
+LATENCY_TOTAL_TABLE = "latency_totals"
+GAME_WORD_TABLE = "game_words"
+GAME_TEXT_TABLE = "game_texts"
+WORD_TOTAL_TABLE = "word_totals"
+WORD_SCHEDULE_TABLE = "word_schedule"
+PRACTICE_RATIO = 0.3
+DIFFICULTY_BANDS = 3
+ADAPTIVE_WINDOW = 10
+LATENCY_SKETCH_ACCURACY = 0.02
+MAX_KEYSTROKE_INTERVAL = 2.0
+HISTORY_RETENTION_DAYS = None
+MAINTENANCE_IDLE_DELAY = 2 * 60 * 1000
+MAINTENANCE_VACUUM_PAGES = 1000
+ANALYZE_INTERVAL = 24 * 60 * 60
 BACKSPACE_KEY = 16777219
 DELETE_KEY = 16777223
 X_KEY = 88
@@ -1,53 +1,82 @@
+"""
+Access the game database through the standard sqlite3 module.
+
+Every thread gets its own connection (see get_connection), so the data
+layer can be used from worker threads. Statements are kept as module-level
+strings and always bound with parameters, which lets each connection reuse
+its compiled statements from the sqlite3 statement cache. The schema is
+upgraded once by init_database and assumed everywhere else.
+
+Functions:
+
+    init_database(str) -> bool
+    get_connection() -> sqlite3.Connection
+    close_connection() -> None
+    clear_game_table() -> bool
+    clear_wordset_tables() -> bool
+    add_wordsets_to_database(Iterable[Wordset]) -> bool
+    add_games_to_database(Iterable[TypingGame]) -> bool
+    save_game(GameState) -> int
+    get_unfinished_game() -> Optional[Tuple[int, float]]
+    finish_game(int) -> bool
+    delete_game(float) -> bool
+    delete_checkpoints(Optional[float]) -> bool
+    get_wordset(Optional[int], Optional[str]) -> Optional[Tuple]
+    get_game(Optional[int], Optional[float]) -> Optional[Tuple]
+    get_game_confusions(int) -> List[Tuple[str, str, int]]
+    get_confusion_totals() -> List[Tuple[str, str, int]]
+    get_game_latencies(int) -> List[Tuple[str, int, int]]
+    get_latency_totals(int) -> List[Tuple[str, int, int]]
+    get_game_words(int) -> List[Tuple[str, int, int]]
+    get_game_text(int) -> Optional[str]
+    get_word_speed(int) -> Optional[float]
+    get_slowest_words(int, int, int) -> List[Tuple[str, float, int]]
+    get_error_prone_words(int, int, int) -> List[Tuple[str, float, int]]
+    get_word_schedule(int) -> List[Tuple[str, int, float, float, float]]
+    save_word_schedule(int, Iterable[Tuple[str, int, float, float, float]]) -> bool
+    get_game_id(float) -> Optional[int]
+    get_available_wordsets_ids() -> List[int]
+    get_wordset_names() -> List[Tuple[int, str]]
+    get_default_period() -> Tuple[float, float]
+    get_game_data(Optional[Tuple[float, float]]) -> Optional[List[Tuple]]
+    get_game_series(Tuple[float, float]) -> Tuple[List[float], List[float], List[float]]
+    get_top_error_chars(Optional[Tuple[float, float]], int) -> List[Tuple[str, int]]
+    get_period_summary(Tuple[float, float]) -> Tuple[int, float, float, float, float]
+    get_bucketed_stats(str, Optional[Tuple[float, float]], ...) -> List[BucketStats]
+    get_game_history(Optional[Tuple], int, str, bool, ...) -> List[Tuple]
+    iter_game_records(int) -> Iterator[Dict]
+    ingest_games(Iterable[Dict], int) -> Tuple[int, int, int]
+    apply_retention(Optional[int]) -> int
+    run_maintenance(Optional[int], bool) -> None
+    merge_database(str) -> Tuple[int, int]
+    get_user_stats() -> Dict
+    get_error_totals(int) -> List[Tuple[str, int]]
+    verify_user_stats() -> Dict
+    recompute_user_stats() -> None
+
+"""
+
+import json
 import logging
-from functools import lru_cache
-from typing import Iterable, List, Tuple, Optional
-from collections import Counter
+import os
+import pathlib
+import sqlite3
+import tempfile
+import threading
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Tuple, Optional
+import math
 import time
 import datetime
+from functools import lru_cache
+from itertools import islice
 
-from PyQt6.QtSql import QSqlDatabase, QSqlQuery, QSqlQueryModel
-
-from speed_typing_game import config, models, utils
+from speed_typing_game import config, migrations, models, utils
 
 logger = logging.getLogger(__name__)
-createWordsetTableQueryString = f"""
-            CREATE TABLE IF NOT EXISTS {config.WORDSET_TABLE} (
-                id INTEGER PRIMARY KEY AUTOINCREMENT UNIQUE NOT NULL,
-                name VARCHAR(40) NOT NULL,
-                language_code VARCHAR(6) NOT NULL,
-                difficulty INTEGER
-            )
-            """
-
-createWordTableQueryString = f"""
-            CREATE TABLE IF NOT EXISTS {config.WORD_TABLE} (
-                id INTEGER PRIMARY KEY AUTOINCREMENT UNIQUE NOT NULL,
-                content VARCHAR(50) NOT NULL,
-                wordset_id INTEGER NOT NULL,
-                FOREIGN KEY (wordset_id)
-                    REFERENCES {config.WORDSET_TABLE}(id)
-                    ON DELETE CASCADE,
-                UNIQUE(content, wordset_id)
-            )
-            """
-
-createGameTableQueryString = f"""
-            CREATE TABLE IF NOT EXISTS {config.GAME_TABLE} (
-                id INTEGER PRIMARY KEY AUTOINCREMENT UNIQUE NOT NULL,
-                mode VARCHAR(10),
-                wordset_id INTEGER,
-                seed INTEGER NOT NULL,
-                pos INTEGER NOT NULL,
-                incorrect_chars TEXT,
-                elapsed REAL,
-                created_at REAL NOT NULL UNIQUE,
-                word_count INTEGER,
-                last_updated REAL,
-                FOREIGN KEY (wordset_id)
-                    REFERENCES {config.WORDSET_TABLE} (id)
-                    ON DELETE SET NULL
-            );
-            """
+_local = threading.local()
+_db_name: str = config.DB
+_schema_lock = threading.Lock()
+_schema_version = 0
 
 insertWordsetQueryString = f"""
         INSERT INTO {config.WORDSET_TABLE} (
@@ -66,348 +95,1920 @@ insertWordQueryString = f"""
         VALUES (?, ?)
         """
 
-insertGameQueryString = f"""
+upsertGameQueryString = f"""
         INSERT INTO {config.GAME_TABLE} (
             mode,
             wordset_id,
             seed,
             pos,
-            incorrect_chars,
+            error_count,
             elapsed,
             created_at,
             word_count,
-            last_updated
+            last_updated,
+            duration,
+            finished
         )
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT (created_at) DO UPDATE SET
+            pos = excluded.pos,
+            error_count = excluded.error_count,
+            elapsed = excluded.elapsed,
+            word_count = excluded.word_count,
+            last_updated = excluded.last_updated,
+            duration = excluded.duration,
+            finished = excluded.finished
+        RETURNING id, wpm, accuracy
         """
 
-deleteWordsetTableQueryStr = """DROP TABLE wordsets"""
-deleteWordTableQueryStr = """DROP TABLE words"""
-deleteGameTableQueryStr = """DROP TABLE games"""
+selectGameFinishedQueryString = f"""
+        SELECT id, finished, wpm, accuracy FROM {config.GAME_TABLE} WHERE created_at = ?
+        """
 
+# one Welford step; all right-hand sides see the values before the update
+updateUserStatsQueryString = f"""
+        UPDATE {config.USER_STATS_TABLE} SET
+            game_count = game_count + 1,
+            wpm_count = wpm_count + (:wpm IS NOT NULL),
+            wpm_mean = IFNULL(wpm_mean + (:wpm - wpm_mean) / (wpm_count + 1), wpm_mean),
+            wpm_m2 = IFNULL(
+                wpm_m2 + (:wpm - wpm_mean) * (:wpm - wpm_mean - (:wpm - wpm_mean) / (wpm_count + 1)),
+                wpm_m2
+            ),
+            accuracy_count = accuracy_count + (:accuracy IS NOT NULL),
+            accuracy_mean = IFNULL(
+                accuracy_mean + (:accuracy - accuracy_mean) / (accuracy_count + 1),
+                accuracy_mean
+            ),
+            accuracy_m2 = IFNULL(
+                accuracy_m2 + (:accuracy - accuracy_mean)
+                    * (:accuracy - accuracy_mean - (:accuracy - accuracy_mean) / (accuracy_count + 1)),
+                accuracy_m2
+            ),
+            best_wpm = IIF(:wpm > IFNULL(best_wpm, -1), :wpm, best_wpm),
+            best_wpm_at = IIF(:wpm > IFNULL(best_wpm, -1), :created_at, best_wpm_at),
+            best_accuracy = IIF(:accuracy > IFNULL(best_accuracy, -1), :accuracy, best_accuracy),
+            best_accuracy_at = IIF(:accuracy > IFNULL(best_accuracy, -1), :created_at, best_accuracy_at)
+        WHERE id = 1
+        """
 
-def delete_game_table() -> bool:
-    con_name = config.CON_NAME
-    game_tablename = config.GAME_TABLE
-    db = QSqlDatabase.database(con_name)
-    if not db.open():
-        logger.error(f"Could not open database connection '{con_name}'")
-        utils.display_error("Database Error", f"Could not open database connection '{con_name}'")
-    if True:  # not check_table_exists(wordset_tablename, con_name):
-        dropTableQuery = QSqlQuery(db)
-        if not dropTableQuery.exec(deleteGameTableQueryStr):
-            logger.error(
-                f"Unable to delete table '{game_tablename}'\n"
-                + dropTableQuery.lastError().text()
+# the inverse Welford step, for a finished game whose result changes
+removeUserStatsQueryString = f"""
+        UPDATE {config.USER_STATS_TABLE} SET
+            game_count = game_count - 1,
+            wpm_count = wpm_count - (:wpm IS NOT NULL),
+            wpm_mean = CASE
+                WHEN :wpm IS NULL THEN wpm_mean
+                WHEN wpm_count > 1 THEN (wpm_mean * wpm_count - :wpm) / (wpm_count - 1)
+                ELSE 0 END,
+            wpm_m2 = CASE
+                WHEN :wpm IS NULL THEN wpm_m2
+                WHEN wpm_count > 1 THEN MAX(wpm_m2 - (:wpm - wpm_mean)
+                    * (:wpm - (wpm_mean * wpm_count - :wpm) / (wpm_count - 1)), 0)
+                ELSE 0 END,
+            accuracy_count = accuracy_count - (:accuracy IS NOT NULL),
+            accuracy_mean = CASE
+                WHEN :accuracy IS NULL THEN accuracy_mean
+                WHEN accuracy_count > 1
+                    THEN (accuracy_mean * accuracy_count - :accuracy) / (accuracy_count - 1)
+                ELSE 0 END,
+            accuracy_m2 = CASE
+                WHEN :accuracy IS NULL THEN accuracy_m2
+                WHEN accuracy_count > 1 THEN MAX(accuracy_m2 - (:accuracy - accuracy_mean)
+                    * (:accuracy - (accuracy_mean * accuracy_count - :accuracy) / (accuracy_count - 1)), 0)
+                ELSE 0 END
+        WHERE id = 1
+        """
+
+# best scores cannot be updated incrementally when a game gets worse
+refreshBestScoresQueryString = f"""
+        UPDATE {config.USER_STATS_TABLE} SET
+            (best_wpm, best_wpm_at) = (
+                SELECT wpm, created_at FROM {config.GAME_TABLE}
+                WHERE finished = 1 AND wpm IS NOT NULL
+                ORDER BY wpm DESC, created_at LIMIT 1
+            ),
+            (best_accuracy, best_accuracy_at) = (
+                SELECT accuracy, created_at FROM {config.GAME_TABLE}
+                WHERE finished = 1 AND accuracy IS NOT NULL
+                ORDER BY accuracy DESC, created_at LIMIT 1
             )
-            utils.display_error("Database Error", f"Unable to delete table '{game_tablename}'\n"
-                + dropTableQuery.lastError().text())
-        logger.debug(
-            f"Deleted table '{game_tablename}' from {db.databaseName()}"
+        WHERE id = 1
+        """
+
+subtractErrorTotalQueryString = f"""
+        UPDATE {config.ERROR_TOTAL_TABLE} SET count = count - ? WHERE char = ?
+        """
+
+deleteEmptyErrorTotalsQueryString = f"""
+        DELETE FROM {config.ERROR_TOTAL_TABLE} WHERE count <= 0
+        """
+
+upsertErrorTotalQueryString = f"""
+        INSERT INTO {config.ERROR_TOTAL_TABLE} (char, count) VALUES (?, ?)
+        ON CONFLICT (char) DO UPDATE SET count = count + excluded.count
+        """
+
+selectUserStatsQueryString = f"""
+        SELECT game_count, wpm_count, wpm_mean, wpm_m2, accuracy_count,
+            accuracy_mean, accuracy_m2, best_wpm, best_wpm_at, best_accuracy,
+            best_accuracy_at
+        FROM {config.USER_STATS_TABLE} WHERE id = 1
+        """
+
+selectErrorTotalsQueryString = f"""
+        SELECT char, count FROM {config.ERROR_TOTAL_TABLE}
+        ORDER BY count DESC LIMIT ?
+        """
+
+# finished games removed by the retention policy: their rollups stay in the
+# daily stats, so they are the games counted there but no longer stored
+selectArchivedGameCountQueryString = f"""
+        SELECT
+            (SELECT IFNULL(SUM(game_count), 0) FROM {config.DAILY_STATS_TABLE})
+            - (SELECT COUNT(*) FROM {config.GAME_TABLE} WHERE finished = 1)
+        """
+
+# count, mean, M2, sum and sum of squares of the wpm and accuracy of stored games
+selectGameMomentsQueryString = f"""
+        WITH A AS (
+            SELECT COUNT(*) AS n, COUNT(wpm) AS wpm_n, IFNULL(AVG(wpm), 0) AS wpm_mean,
+                COUNT(accuracy) AS accuracy_n, IFNULL(AVG(accuracy), 0) AS accuracy_mean
+            FROM {config.GAME_TABLE} WHERE finished = 1
         )
-    return True
+        SELECT
+            A.n,
+            A.wpm_n, A.wpm_mean,
+            TOTAL((G.wpm - A.wpm_mean) * (G.wpm - A.wpm_mean)),
+            TOTAL(G.wpm), TOTAL(G.wpm * G.wpm),
+            A.accuracy_n, A.accuracy_mean,
+            TOTAL((G.accuracy - A.accuracy_mean) * (G.accuracy - A.accuracy_mean)),
+            TOTAL(G.accuracy), TOTAL(G.accuracy * G.accuracy)
+        FROM A LEFT JOIN {config.GAME_TABLE} G ON G.finished = 1
+        """
 
+selectRollupMomentsQueryString = f"""
+        SELECT IFNULL(SUM(wpm_count), 0), TOTAL(wpm_sum), TOTAL(wpm_sum_sq),
+            IFNULL(SUM(accuracy_count), 0), TOTAL(accuracy_sum), TOTAL(accuracy_sum_sq)
+        FROM {config.DAILY_STATS_TABLE}
+        """
 
-def delete_wordset_table() -> bool:
-    con_name = config.CON_NAME
-    wordset_tablename = config.WORDSET_TABLE
-    word_tablename = config.WORD_TABLE
-    db = QSqlDatabase.database(con_name)
-    if not db.open():
-        logger.error(f"Could not open database connection '{con_name}'")
-        utils.display_error("Database Error", f"Could not open database connection '{con_name}'")
-
-    if True:  # not check_table_exists(wordset_tablename, con_name):
-        dropTableQuery = QSqlQuery(db)
-        if not dropTableQuery.exec(deleteWordsetTableQueryStr):
-            logger.error(
-                f"Unable to delete table '{wordset_tablename}'\n"
-                + dropTableQuery.lastError().text()
-            )
-            utils.display_error("Database Error", f"Unable to delete table '{wordset_tablename}'\n"
-                + dropTableQuery.lastError().text()
-            )
+selectBestScoresQueryString = {
+    column: f"""
+        SELECT {column}, created_at FROM {config.GAME_TABLE}
+        WHERE finished = 1 AND {column} IS NOT NULL
+        ORDER BY {column} DESC, created_at LIMIT 1
+        """
+    for column in ("wpm", "accuracy")
+}
 
-        if not dropTableQuery.exec(deleteWordTableQueryStr):
-            logger.error(
-                f"Unable to delete table '{word_tablename}'\n"
-                + dropTableQuery.lastError().text()
-            )
-            utils.display_error("Database Error",
-                f"Unable to delete table '{word_tablename}'\n"
-                + dropTableQuery.lastError().text())
+deleteUserStatsQueryString = f"""
+        DELETE FROM {config.USER_STATS_TABLE}
+        """
+
+insertUserStatsQueryString = f"""
+        INSERT INTO {config.USER_STATS_TABLE}
+        VALUES (1, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """
 
-        logger.debug(
-            f"Deleted table '{wordset_tablename}' from {db.databaseName()}"
+deleteErrorTotalsQueryString = f"""
+        DELETE FROM {config.ERROR_TOTAL_TABLE}
+        """
+
+rebuildErrorTotalsQueryString = f"""
+        INSERT INTO {config.ERROR_TOTAL_TABLE} (char, count)
+        SELECT char, SUM(count) FROM (
+            SELECT E.char, E.count
+            FROM {config.GAME_ERROR_TABLE} E
+            JOIN {config.GAME_TABLE} G ON G.id = E.game_id
+            WHERE G.finished = 1
+            UNION ALL
+            SELECT char, count FROM {config.ARCHIVED_ERROR_TABLE}
         )
-    return True
+        GROUP BY char
+        """
 
+deleteGameErrorsQueryString = f"""
+        DELETE FROM {config.GAME_ERROR_TABLE} WHERE game_id = ?
+        """
 
-def check_table_exists(tablename: str, db_con: str) -> bool:
-    return tablename in QSqlDatabase.database(db_con).tables()
+insertGameErrorQueryString = f"""
+        INSERT INTO {config.GAME_ERROR_TABLE} (game_id, char, count)
+        VALUES (?, ?, ?)
+        """
 
+selectWordsetIdsQueryString = f"""
+        SELECT id FROM {config.WORDSET_TABLE}
+        """
 
-def add_wordsets_to_database(wordsets: Iterable["models.Wordset"]) -> bool:
-    con_name = config.CON_NAME
-    wordset_tablename = config.WORDSET_TABLE
-    word_tablename = config.WORD_TABLE
-    db = QSqlDatabase.database(con_name)
-    if not db.open():
-        logger.error(f"Could not open database connection '{con_name}'")
-        utils.display_error("Database Error", f"Could not open database connection '{con_name}'")
-
-    if True:  # not check_table_exists(wordset_tablename, con_name):
-        createTableQuery = QSqlQuery(db)
-        if not createTableQuery.exec(createWordsetTableQueryString):
-            logger.error(
-                f"Unable to create table '{wordset_tablename}'\n"
-                + createTableQuery.lastError().text()
-            )
-            utils.display_error("Database Error", f"Unable to create table '{wordset_tablename}'\n"
-                + createTableQuery.lastError().text())
+selectWordsetNamesQueryString = f"""
+        SELECT id, name FROM {config.WORDSET_TABLE} ORDER BY id
+        """
 
-        logger.debug(
-            f"Created/updated table '{wordset_tablename}' in {db.databaseName()}"
+selectWordsetIdByNameQueryString = f"""
+        SELECT id FROM {config.WORDSET_TABLE} WHERE name = ? LIMIT 1
+        """
+
+selectWordsetByIdQueryString = f"""
+        SELECT WS.id, WS.name, WS.language_code, WS.difficulty, W.content
+        FROM {config.WORDSET_TABLE} WS
+        JOIN {config.WORD_TABLE} W ON W.wordset_id = WS.id
+        WHERE WS.id = ?
+        """
+
+selectWordsetByNameQueryString = f"""
+        SELECT WS.id, WS.name, WS.language_code, WS.difficulty, W.content
+        FROM {config.WORDSET_TABLE} WS
+        JOIN {config.WORD_TABLE} W ON W.wordset_id = WS.id
+        WHERE WS.id = (
+            SELECT id FROM {config.WORDSET_TABLE} WHERE name = ? LIMIT 1
         )
+        """
 
-    if True:  # not check_table_exists(word_tablename, con_name):
-        createTableQuery = QSqlQuery(db)
-        if not createTableQuery.exec(createWordTableQueryString):
-            logger.error(
-                f"Unable to create table '{word_tablename}'\n"
-                + createTableQuery.lastError().text()
-            )
-            utils.display_error("Database Error", f"Unable to create table '{word_tablename}'\n"
-                + createTableQuery.lastError().text())
-
-        logger.debug(
-            f"Created/updated table '{word_tablename}' in {db.databaseName()}"
-        )
-
-    insertWordsetQuery = QSqlQuery(db)
-    insertWordsetQuery.prepare(insertWordsetQueryString)
-    wordset_ids = []
-    word_vals = []
-    for wordset in wordsets:
-        name, language_code, difficulty = (
-            wordset.name,
-            wordset.language,
-            wordset.difficulty,
-        )
-        words = wordset.words
-        if not words:
-            logger.warning(f"Ignoring empty wordset {name}")
-            continue
-        insertWordsetQuery.addBindValue(name)
-        insertWordsetQuery.addBindValue(language_code)
-        insertWordsetQuery.addBindValue(difficulty)
-        if not insertWordsetQuery.exec():
-            logger.error(
-                f"Unable to insert wordset data into table '{wordset_tablename}'\n"
-                + insertWordsetQuery.lastError().text()
-            )
-            utils.display_error("Database Error", f"Unable to insert wordset data into table '{wordset_tablename}'\n"
-                + insertWordsetQuery.lastError().text())
+selectGameColumns = f"""
+        id, mode, wordset_id, seed, pos,
+        (
+            SELECT json_group_object(char, count) FROM {config.GAME_ERROR_TABLE}
+            WHERE game_id = {config.GAME_TABLE}.id
+        ),
+        elapsed, created_at, word_count, last_updated, duration, error_count
+        """
 
-        logger.info(
-            f"Added wordset {name} to table {db.databaseName()}.{wordset_tablename}"
+selectGameByIdQueryString = f"""
+        SELECT {selectGameColumns}
+        FROM {config.GAME_TABLE}
+        WHERE id = ?
+        """
+
+selectGameByCreationTimeQueryString = f"""
+        SELECT {selectGameColumns}
+        FROM {config.GAME_TABLE}
+        WHERE created_at = ?
+        """
+
+selectGameIdQueryString = f"""
+        SELECT id FROM {config.GAME_TABLE} WHERE created_at = ?
+        """
+
+# the expressions of the generated accuracy and wpm columns (NULL for games
+# without typed characters or elapsed time), spelled out so that the query
+# is answered from the covering index
+selectGameDataQueryString = f"""
+        SELECT
+            CASE WHEN pos > 0 THEN 1.0 - error_count * 1.0 / pos END,
+            CASE WHEN elapsed > 0 THEN IFNULL(word_count, 0) * 60.0 / elapsed END,
+            created_at, error_count
+        FROM {config.GAME_TABLE}
+        WHERE finished = 1 AND created_at BETWEEN ? AND ?
+        """
+
+selectGameSeriesQueryString = f"""
+        SELECT created_at, wpm, accuracy
+        FROM {config.GAME_TABLE}
+        WHERE finished = 1 AND created_at BETWEEN ? AND ?
+            AND wpm IS NOT NULL AND accuracy IS NOT NULL
+        ORDER BY created_at
+        """
+
+selectTopErrorCharsQueryString = f"""
+        SELECT char, SUM(total) AS total
+        FROM (
+            SELECT E.char AS char, E.count AS total
+            FROM {config.GAME_TABLE} G
+            JOIN {config.GAME_ERROR_TABLE} E ON E.game_id = G.id
+            WHERE G.finished = 1 AND G.created_at BETWEEN ?1 AND ?2
+            UNION ALL
+            SELECT char, count FROM {config.ARCHIVED_ERROR_TABLE}
+            WHERE day BETWEEN date(?1, 'unixepoch', 'localtime')
+                AND date(?2, 'unixepoch', 'localtime')
         )
-        selectAutoincrIdQueryStr = f"""
-            SELECT seq, name FROM sqlite_sequence WHERE name = '{wordset_tablename}';
+        GROUP BY char
+        ORDER BY total DESC
+        LIMIT ?3
         """
-        selectAutoincrIdQuery = QSqlQuery(db)
-        if not selectAutoincrIdQuery.exec(selectAutoincrIdQueryStr):
-            logger.error(
-                f"Unable to select autoincrement value for table {wordset_tablename}:\n"
-                + selectAutoincrIdQuery.lastError().text()
-            )
-            utils.display_error("Database Error", f"Unable to select autoincrement value for table {wordset_tablename}:\n"
-                + selectAutoincrIdQuery.lastError().text())
-
-        selectAutoincrIdQuery.next()
-        last_wordset_id = selectAutoincrIdQuery.value(0)
-        last_name = selectAutoincrIdQuery.value(1)
-        logger.debug(
-            f"Wordset autoincrement value: {last_wordset_id} for table {last_name}"
-        )
-        wordset_ids.extend([last_wordset_id] * len(words))
-        word_vals.extend(
-            [
-                *words,
-            ]
-        )
-
-    insertWordQuery = QSqlQuery(db)
-    insertWordQuery.prepare(insertWordQueryString)
-    insertWordQuery.addBindValue(word_vals)
-    insertWordQuery.addBindValue(wordset_ids)
-    if not insertWordQuery.execBatch():
-        logger.error(
-            f"Unable to insert words into table '{word_tablename}'\n"
-            + insertWordQuery.lastError().text()
-        )
-        deleteWordsetQueryString = f"""
-            DELETE FROM {wordset_tablename}
-            WHERE id IN {*wordset_ids,}
-        """
-        deleteWordsetQuery = QSqlQuery(db)
-        if not deleteWordsetQuery.exec(deleteWordsetQueryString):
-            logger.error(
-                f"Unable to delete wordsets from table '{wordset_tablename}'\n"
-                + deleteWordsetQuery.lastError().text()
+
+selectGameRecordsQueryString = f"""
+        SELECT G.created_at, G.mode, WS.name, G.seed, G.pos, G.error_count,
+            G.elapsed, G.word_count, G.last_updated, G.duration, G.finished,
+            (
+                SELECT json_group_object(char, count) FROM {config.GAME_ERROR_TABLE}
+                WHERE game_id = G.id
+            ),
+            (
+                SELECT json_group_array(json_array(expected, typed, count))
+                FROM {config.GAME_CONFUSION_TABLE} WHERE game_id = G.id
+            ),
+            (
+                SELECT json_group_array(json_array(ngram, bucket, count))
+                FROM {config.GAME_LATENCY_TABLE} WHERE game_id = G.id
+            ),
+            (SELECT words FROM {config.GAME_WORD_TABLE} WHERE game_id = G.id)
+        FROM {config.GAME_TABLE} G
+        LEFT JOIN {config.WORDSET_TABLE} WS ON WS.id = G.wordset_id
+        ORDER BY G.created_at
+        """
+
+# fields of the row produced by TypingGame.get_state, in upsertGameQueryString order
+GAME_ROW_FIELDS = (
+    "mode", "wordset_id", "seed", "pos", "error_count", "elapsed",
+    "created_at", "word_count", "last_updated", "duration", "finished",
+)
+
+GAME_RECORD_FIELDS = (
+    "created_at", "mode", "wordset", "seed", "pos", "error_count", "elapsed",
+    "word_count", "last_updated", "duration", "finished", "errors", "confusions",
+    "latencies", "words",
+)
+
+selectPeriodSummaryQueryString = f"""
+        SELECT
+            TOTAL(game_count),
+            TOTAL(wpm_count), TOTAL(wpm_sum), TOTAL(wpm_sum_sq),
+            TOTAL(accuracy_count), TOTAL(accuracy_sum), TOTAL(accuracy_sum_sq)
+        FROM {config.DAILY_STATS_TABLE}
+        WHERE day BETWEEN date(?, 'unixepoch', 'localtime')
+            AND date(?, 'unixepoch', 'localtime')
+        """
+
+# grouped and filtered by _bucketed_stats_query; the variances are those of
+# the population of games in a bucket
+selectBucketedStatsQueryString = f"""
+        SELECT
+            {{bucket}},
+            {{mode}},
+            {{wordset}},
+            SUM(game_count),
+            SUM(wpm_sum) / NULLIF(SUM(wpm_count), 0),
+            (SUM(wpm_sum_sq) - SUM(wpm_sum) * SUM(wpm_sum) / NULLIF(SUM(wpm_count), 0))
+                / NULLIF(SUM(wpm_count), 0),
+            SUM(accuracy_sum) / NULLIF(SUM(accuracy_count), 0),
+            (SUM(accuracy_sum_sq) - SUM(accuracy_sum) * SUM(accuracy_sum) / NULLIF(SUM(accuracy_count), 0))
+                / NULLIF(SUM(accuracy_count), 0),
+            SUM(elapsed_sum),
+            SUM(char_count_sum),
+            SUM(error_count_sum)
+        FROM {config.DAILY_STATS_TABLE}
+        WHERE day BETWEEN date(?, 'unixepoch', 'localtime')
+            AND date(?, 'unixepoch', 'localtime'){{filters}}
+        GROUP BY {{group}}
+        ORDER BY {{group}}
+        """
+
+# bucket name -> expression giving the first day of the bucket of a daily_stats day
+BUCKET_EXPRESSIONS = {
+    "day": "day",
+    # weeks start on Monday
+    "week": "date(day, '-6 days', 'weekday 1')",
+    "month": "substr(day, 1, 7) || '-01'",
+}
+
+selectGameHistoryQueryString = f"""
+        SELECT G.id, G.created_at, G.mode, WS.name, G.wpm, G.accuracy,
+            G.elapsed, G.error_count
+        FROM {config.GAME_TABLE} G
+        LEFT JOIN {config.WORDSET_TABLE} WS ON WS.id = G.wordset_id
+        WHERE G.finished = 1{{filters}}
+        ORDER BY {{key}} {{order}}, G.created_at {{order}}
+        LIMIT ?
+        """
+
+# sort name -> (ORDER BY expression, index of the value in a history row)
+HISTORY_SORT_KEYS = {
+    "created_at": ("G.created_at", 1),
+    "wpm": ("G.wpm", 4),
+    "accuracy": ("G.accuracy", 5),
+}
+
+archiveGameErrorsQueryString = f"""
+        INSERT INTO {config.ARCHIVED_ERROR_TABLE} (day, char, count)
+        SELECT date(G.created_at, 'unixepoch', 'localtime'), E.char, SUM(E.count)
+        FROM {config.GAME_TABLE} G
+        JOIN {config.GAME_ERROR_TABLE} E ON E.game_id = G.id
+        WHERE G.finished = 1 AND G.created_at < ?
+        GROUP BY 1, 2
+        ON CONFLICT (day, char) DO UPDATE SET count = count + excluded.count
+        """
+
+deleteGamesBeforeQueryString = f"""
+        DELETE FROM {config.GAME_TABLE} WHERE created_at < ?
+        """
+
+# statements used while another database is attached as "other"; only
+# wordsets created by the merge get words, and only games inserted by it
+# get errors, which keeps re-running a merge harmless
+createWordsetMapQueryString = f"""
+        CREATE TEMP TABLE wordset_map AS
+        SELECT OW.id AS other_id, (
+            SELECT MIN(W.id) FROM main.{config.WORDSET_TABLE} W
+            WHERE W.name = OW.name AND W.language_code = OW.language_code
+        ) AS local_id
+        FROM other.{config.WORDSET_TABLE} OW
+        """
+
+mergeWordsetsQueryString = f"""
+        INSERT INTO main.{config.WORDSET_TABLE} (name, language_code, difficulty)
+        SELECT OW.name, OW.language_code, OW.difficulty
+        FROM other.{config.WORDSET_TABLE} OW
+        WHERE NOT EXISTS (
+            SELECT 1 FROM main.{config.WORDSET_TABLE} W
+            WHERE W.name = OW.name AND W.language_code = OW.language_code
+        )
+        ORDER BY OW.id
+        """
+
+mergeWordsQueryString = f"""
+        INSERT OR IGNORE INTO main.{config.WORD_TABLE} (content, wordset_id)
+        SELECT OWd.content, M.local_id
+        FROM other.{config.WORD_TABLE} OWd
+        JOIN temp.wordset_map M ON M.other_id = OWd.wordset_id
+        WHERE M.local_id > ?
+        """
+
+mergeGamesQueryString = f"""
+        INSERT INTO main.{config.GAME_TABLE} (
+            mode, wordset_id, seed, pos, error_count, elapsed, created_at,
+            word_count, last_updated, duration, finished
+        )
+        SELECT OG.mode, M.local_id, OG.seed, OG.pos, OG.error_count,
+            OG.elapsed, OG.created_at, OG.word_count, OG.last_updated,
+            OG.duration, OG.finished
+        FROM other.{config.GAME_TABLE} OG
+        LEFT JOIN temp.wordset_map M ON M.other_id = OG.wordset_id
+        WHERE OG.finished = 1
+        ORDER BY OG.created_at
+        ON CONFLICT (created_at) DO NOTHING
+        """
+
+mergeGameErrorsQueryString = f"""
+        INSERT INTO main.{config.GAME_ERROR_TABLE} (game_id, char, count)
+        SELECT G.id, OE.char, OE.count
+        FROM other.{config.GAME_ERROR_TABLE} OE
+        JOIN other.{config.GAME_TABLE} OG ON OG.id = OE.game_id
+        JOIN main.{config.GAME_TABLE} G ON G.created_at = OG.created_at
+        WHERE G.id > ?
+        """
+
+mergeGameConfusionsQueryString = f"""
+        INSERT INTO main.{config.GAME_CONFUSION_TABLE} (game_id, expected, typed, count)
+        SELECT G.id, OC.expected, OC.typed, OC.count
+        FROM other.{config.GAME_CONFUSION_TABLE} OC
+        JOIN other.{config.GAME_TABLE} OG ON OG.id = OC.game_id
+        JOIN main.{config.GAME_TABLE} G ON G.created_at = OG.created_at
+        WHERE G.id > ?
+        """
+
+addNewConfusionTotalsQueryString = f"""
+        INSERT INTO main.{config.CONFUSION_TOTAL_TABLE} (expected, typed, count)
+        SELECT C.expected, C.typed, SUM(C.count)
+        FROM main.{config.GAME_CONFUSION_TABLE} C
+        WHERE C.game_id > ?
+        GROUP BY C.expected, C.typed
+        ON CONFLICT (expected, typed) DO UPDATE SET count = count + excluded.count
+        """
+
+mergeGameLatenciesQueryString = f"""
+        INSERT INTO main.{config.GAME_LATENCY_TABLE} (game_id, ngram, bucket, count)
+        SELECT G.id, OL.ngram, OL.bucket, OL.count
+        FROM other.{config.GAME_LATENCY_TABLE} OL
+        JOIN other.{config.GAME_TABLE} OG ON OG.id = OL.game_id
+        JOIN main.{config.GAME_TABLE} G ON G.created_at = OG.created_at
+        WHERE G.id > ?
+        """
+
+addNewLatencyTotalsQueryString = f"""
+        INSERT INTO main.{config.LATENCY_TOTAL_TABLE} (ngram, bucket, count)
+        SELECT L.ngram, L.bucket, SUM(L.count)
+        FROM main.{config.GAME_LATENCY_TABLE} L
+        WHERE L.game_id > ?
+        GROUP BY L.ngram, L.bucket
+        ON CONFLICT (ngram, bucket) DO UPDATE SET count = count + excluded.count
+        """
+
+mergeGameWordsQueryString = f"""
+        INSERT INTO main.{config.GAME_WORD_TABLE} (game_id, words)
+        SELECT G.id, OW.words
+        FROM other.{config.GAME_WORD_TABLE} OW
+        JOIN other.{config.GAME_TABLE} OG ON OG.id = OW.game_id
+        JOIN main.{config.GAME_TABLE} G ON G.created_at = OG.created_at
+        WHERE G.id > ?
+        """
+
+addNewWordTotalsQueryString = f"""
+        INSERT INTO main.{config.WORD_TOTAL_TABLE} (wordset_id, word, count, total_time, error_count)
+        SELECT G.wordset_id, json_extract(W.value, '$[0]'), COUNT(*),
+            SUM(json_extract(W.value, '$[1]')), SUM(json_extract(W.value, '$[2]'))
+        FROM main.{config.GAME_WORD_TABLE} GW
+        JOIN main.{config.GAME_TABLE} G ON G.id = GW.game_id
+        JOIN json_each(GW.words) W
+        WHERE GW.game_id > ? AND G.finished = 1 AND G.wordset_id IS NOT NULL
+        GROUP BY 1, 2
+        ON CONFLICT (wordset_id, word) DO UPDATE SET
+            count = count + excluded.count,
+            total_time = total_time + excluded.total_time,
+            error_count = error_count + excluded.error_count
+        """
+
+selectNewGamesQueryString = f"""
+        SELECT wpm, accuracy, created_at
+        FROM main.{config.GAME_TABLE}
+        WHERE id > ? AND finished = 1
+        ORDER BY id
+        """
+
+addNewErrorTotalsQueryString = f"""
+        INSERT INTO main.{config.ERROR_TOTAL_TABLE} (char, count)
+        SELECT E.char, SUM(E.count)
+        FROM main.{config.GAME_ERROR_TABLE} E
+        WHERE E.game_id > ?
+        GROUP BY E.char
+        ON CONFLICT (char) DO UPDATE SET count = count + excluded.count
+        """
+
+selectMaxIdQueryString = "SELECT IFNULL(MAX(id), 0) FROM main.{}"
+
+selectUnfinishedGameQueryString = f"""
+        SELECT id, created_at FROM {config.GAME_TABLE}
+        WHERE finished = 0
+        ORDER BY created_at DESC
+        LIMIT 1
+        """
+
+finishGameQueryString = f"""
+        UPDATE {config.GAME_TABLE} SET finished = 1 WHERE id = ? AND finished = 0
+        RETURNING id, wpm, accuracy, created_at
+        """
+
+selectGameErrorsQueryString = f"""
+        SELECT char, count FROM {config.GAME_ERROR_TABLE} WHERE game_id = ?
+        """
+
+deleteGameConfusionsQueryString = f"""
+        DELETE FROM {config.GAME_CONFUSION_TABLE} WHERE game_id = ?
+        """
+
+insertGameConfusionQueryString = f"""
+        INSERT INTO {config.GAME_CONFUSION_TABLE} (game_id, expected, typed, count)
+        VALUES (?, ?, ?, ?)
+        """
+
+selectGameConfusionsQueryString = f"""
+        SELECT expected, typed, count FROM {config.GAME_CONFUSION_TABLE}
+        WHERE game_id = ?
+        """
+
+upsertConfusionTotalQueryString = f"""
+        INSERT INTO {config.CONFUSION_TOTAL_TABLE} (expected, typed, count)
+        VALUES (?, ?, ?)
+        ON CONFLICT (expected, typed) DO UPDATE SET count = count + excluded.count
+        """
+
+subtractConfusionTotalQueryString = f"""
+        UPDATE {config.CONFUSION_TOTAL_TABLE} SET count = count - ?
+        WHERE expected = ? AND typed = ?
+        """
+
+deleteEmptyConfusionTotalsQueryString = f"""
+        DELETE FROM {config.CONFUSION_TOTAL_TABLE} WHERE count <= 0
+        """
+
+selectConfusionTotalsQueryString = f"""
+        SELECT expected, typed, count FROM {config.CONFUSION_TOTAL_TABLE}
+        """
+
+deleteGameLatenciesQueryString = f"""
+        DELETE FROM {config.GAME_LATENCY_TABLE} WHERE game_id = ?
+        """
+
+insertGameLatencyQueryString = f"""
+        INSERT INTO {config.GAME_LATENCY_TABLE} (game_id, ngram, bucket, count)
+        VALUES (?, ?, ?, ?)
+        """
+
+selectGameLatenciesQueryString = f"""
+        SELECT ngram, bucket, count FROM {config.GAME_LATENCY_TABLE}
+        WHERE game_id = ?
+        """
+
+upsertLatencyTotalQueryString = f"""
+        INSERT INTO {config.LATENCY_TOTAL_TABLE} (ngram, bucket, count)
+        VALUES (?, ?, ?)
+        ON CONFLICT (ngram, bucket) DO UPDATE SET count = count + excluded.count
+        """
+
+subtractLatencyTotalQueryString = f"""
+        UPDATE {config.LATENCY_TOTAL_TABLE} SET count = count - ?
+        WHERE ngram = ? AND bucket = ?
+        """
+
+deleteEmptyLatencyTotalsQueryString = f"""
+        DELETE FROM {config.LATENCY_TOTAL_TABLE} WHERE count <= 0
+        """
+
+upsertGameWordsQueryString = f"""
+        INSERT INTO {config.GAME_WORD_TABLE} (game_id, words) VALUES (?, ?)
+        ON CONFLICT (game_id) DO UPDATE SET words = excluded.words
+        """
+
+deleteGameWordsQueryString = f"""
+        DELETE FROM {config.GAME_WORD_TABLE} WHERE game_id = ?
+        """
+
+selectGameWordsQueryString = f"""
+        SELECT words FROM {config.GAME_WORD_TABLE} WHERE game_id = ?
+        """
+
+# adds (:sign = 1) or subtracts (:sign = -1) the words of a game to the totals
+addGameWordTotalsQueryString = f"""
+        INSERT INTO {config.WORD_TOTAL_TABLE} (wordset_id, word, count, total_time, error_count)
+        SELECT G.wordset_id, json_extract(W.value, '$[0]'), :sign * COUNT(*),
+            :sign * SUM(json_extract(W.value, '$[1]')),
+            :sign * SUM(json_extract(W.value, '$[2]'))
+        FROM {config.GAME_WORD_TABLE} GW
+        JOIN {config.GAME_TABLE} G ON G.id = GW.game_id
+        JOIN json_each(GW.words) W
+        WHERE GW.game_id = :game_id AND G.wordset_id IS NOT NULL
+        GROUP BY 1, 2
+        ON CONFLICT (wordset_id, word) DO UPDATE SET
+            count = count + excluded.count,
+            total_time = total_time + excluded.total_time,
+            error_count = error_count + excluded.error_count
+        """
+
+deleteEmptyWordTotalsQueryString = f"""
+        DELETE FROM {config.WORD_TOTAL_TABLE} WHERE count <= 0
+        """
+
+selectWordTotalsQueryString = f"""
+        SELECT wordset_id, word, count, total_time, error_count
+        FROM {config.WORD_TOTAL_TABLE}
+        """
+
+# ranked by time per character, so that long words do not always come first
+selectSlowestWordsQueryString = f"""
+        SELECT word, total_time * 1.0 / count, count FROM {config.WORD_TOTAL_TABLE}
+        WHERE wordset_id = ? AND count >= ?
+        ORDER BY total_time * 1.0 / (count * length(word)) DESC
+        LIMIT ?
+        """
+
+# a word is timed together with the space after it; 5 characters make a word
+selectWordSpeedQueryString = f"""
+        SELECT SUM((length(word) + 1) * count) * 12000.0 / SUM(total_time)
+        FROM {config.WORD_TOTAL_TABLE}
+        WHERE wordset_id = ?
+        """
+
+upsertGameTextQueryString = f"""
+        INSERT INTO {config.GAME_TEXT_TABLE} (game_id, text) VALUES (?, ?)
+        ON CONFLICT (game_id) DO UPDATE SET text = excluded.text
+        """
+
+deleteGameTextQueryString = f"""
+        DELETE FROM {config.GAME_TEXT_TABLE} WHERE game_id = ?
+        """
+
+selectGameTextQueryString = f"""
+        SELECT text FROM {config.GAME_TEXT_TABLE} WHERE game_id = ?
+        """
+
+selectErrorProneWordsQueryString = f"""
+        SELECT word, error_count * 1.0 / count, count FROM {config.WORD_TOTAL_TABLE}
+        WHERE wordset_id = ? AND count >= ? AND error_count > 0
+        ORDER BY error_count * 1.0 / count DESC, count DESC
+        LIMIT ?
+        """
+
+selectWordScheduleQueryString = f"""
+        SELECT word, repetitions, interval, ease, due FROM {config.WORD_SCHEDULE_TABLE}
+        WHERE wordset_id = ?
+        """
+
+upsertWordScheduleQueryString = f"""
+        INSERT INTO {config.WORD_SCHEDULE_TABLE} (
+            wordset_id, word, repetitions, interval, ease, due
+        )
+        VALUES (?, ?, ?, ?, ?, ?)
+        ON CONFLICT (wordset_id, word) DO UPDATE SET
+            repetitions = excluded.repetitions,
+            interval = excluded.interval,
+            ease = excluded.ease,
+            due = excluded.due
+        """
+
+selectLatencyTotalsQueryString = f"""
+        SELECT ngram, bucket, count FROM {config.LATENCY_TOTAL_TABLE}
+        WHERE ngram IN (
+            SELECT ngram FROM {config.LATENCY_TOTAL_TABLE}
+            GROUP BY ngram HAVING SUM(count) >= ?
+        )
+        ORDER BY ngram, bucket
+        """
+
+deleteGameQueryString = f"""
+        DELETE FROM {config.GAME_TABLE} WHERE created_at = ?
+        """
+
+# unfinished games other than the one given (NULL matches every game)
+deleteCheckpointsQueryString = f"""
+        DELETE FROM {config.GAME_TABLE} WHERE finished = 0 AND created_at IS NOT ?
+        """
+
+clearSequenceQueryString = """
+        DELETE FROM sqlite_sequence WHERE name = ?
+        """
+
+
+def init_database(db_name: str = config.DB) -> bool:
+    """Point the data layer at a database file and upgrade its schema."""
+    global _db_name, _schema_version
+    with _schema_lock:
+        if db_name == _db_name and _schema_version:
+            return True
+        _db_name = db_name
+        try:
+            # only takes effect on new databases; others convert in run_maintenance
+            get_connection().execute("PRAGMA auto_vacuum = INCREMENTAL")
+            _schema_version = migrations.migrate(get_connection())
+            _set_journal_mode(get_connection())
+        except sqlite3.Error as e:
+            logger.error(f"Unable to upgrade database schema of {_db_name}\n{e}")
+            utils.display_error(
+                "Database Error",
+                f"Unable to upgrade database schema of {_db_name}\n{e}",
             )
-        logger.info(
-            f"Removed wordsets from table {db.databaseName()}.{wordset_tablename}"
+            return False
+    logger.info(f"Initialized database {_db_name} (schema version {_schema_version})")
+    return True
+
+
+def get_connection() -> sqlite3.Connection:
+    """Return a connection to the game database owned by the calling thread."""
+    con: Optional[sqlite3.Connection] = getattr(_local, "con", None)
+    if con is not None and _local.db_name == _db_name:
+        return con
+    close_connection()
+    logger.info(f"Trying to open database connection {_db_name}")
+    try:
+        con = sqlite3.connect(
+            _db_name, cached_statements=config.DB_STATEMENT_CACHE_SIZE
         )
-        utils.display_error("Database Error", f"Unable to insert words into table '{word_tablename}'\n"
-            + insertWordQuery.lastError().text())
+        con.execute("PRAGMA foreign_keys = ON")
+        con.execute("PRAGMA synchronous = NORMAL")
+    except sqlite3.Error as e:
+        _report_error(f"Could not open database {_db_name}", e)
+        raise
+    _local.con = con
+    _local.db_name = _db_name
+    return con
+
 
+def close_connection() -> None:
+    """Close the connection owned by the calling thread, if any."""
+    con: Optional[sqlite3.Connection] = getattr(_local, "con", None)
+    if con is not None:
+        con.close()
+        _local.con = None
+
+
+def _set_journal_mode(con: sqlite3.Connection) -> None:
+    (journal_mode,) = con.execute(
+        f"PRAGMA journal_mode = {config.DB_JOURNAL_MODE}"
+    ).fetchone()
+    if journal_mode.lower() != config.DB_JOURNAL_MODE.lower():
+        logger.warning(
+            f"Database {_db_name} does not support journal mode {config.DB_JOURNAL_MODE}, using {journal_mode}"
+        )
+
+
+def _report_error(message: str, error: sqlite3.Error) -> None:
+    """Log a failed request; the caller re-raises so it reaches the future."""
+    logger.error(f"{message}\n{error}")
+
+
+def clear_game_table() -> bool:
+    """Remove all games from the database, keeping the schema."""
+    con = get_connection()
+    try:
+        with con:
+            con.execute(f"DELETE FROM {config.GAME_TABLE}")
+            con.execute(clearSequenceQueryString, (config.GAME_TABLE,))
+    except sqlite3.Error as e:
+        _report_error(f"Unable to clear table '{config.GAME_TABLE}'", e)
+        raise
+    logger.debug(f"Cleared table '{config.GAME_TABLE}' in {_db_name}")
+    return True
+
+
+def clear_wordset_tables() -> bool:
+    """Remove all wordsets and words from the database, keeping the schema."""
+    con = get_connection()
+    try:
+        with con:
+            for tablename in (config.WORD_TABLE, config.WORDSET_TABLE):
+                con.execute(f"DELETE FROM {tablename}")
+                con.execute(clearSequenceQueryString, (tablename,))
+    except sqlite3.Error as e:
+        _report_error(f"Unable to clear table '{config.WORDSET_TABLE}'", e)
+        raise
+    logger.debug(f"Cleared table '{config.WORDSET_TABLE}' in {_db_name}")
+    return True
+
+
+def add_wordsets_to_database(wordsets: Iterable["models.Wordset"]) -> bool:
+    """Insert wordsets and their words in a single transaction."""
+    wordset_tablename = config.WORDSET_TABLE
+    word_tablename = config.WORD_TABLE
+    con = get_connection()
+    saved_wordsets = []
+    word_count = 0
+    try:
+        with con:
+            for wordset in wordsets:
+                if not wordset.words:
+                    logger.warning(f"Ignoring empty wordset {wordset.name}")
+                    continue
+                wordset_id = con.execute(
+                    insertWordsetQueryString,
+                    (wordset.name, wordset.language, wordset.difficulty),
+                ).lastrowid
+                con.executemany(
+                    insertWordQueryString,
+                    ((word, wordset_id) for word in wordset.words),
+                )
+                logger.debug(f"Added wordset {wordset.name} with id {wordset_id}")
+                saved_wordsets.append((wordset, wordset_id))
+                word_count += len(wordset.words)
+    except sqlite3.Error as e:
+        _report_error(
+            f"Unable to insert wordsets into table '{wordset_tablename}' (rolled back)", e
+        )
+        raise
+    for wordset, wordset_id in saved_wordsets:
+        wordset.id = wordset_id
     logger.info(
-        f"Added {len(word_vals)} words to table '{db.databaseName()}.{word_tablename}'"
+        f"Added {len(saved_wordsets)} wordsets with {word_count} words to tables "
+        f"'{_db_name}.{wordset_tablename}' and '{word_tablename}'"
     )
     return True
 
 
-def add_games_to_database(games: Iterable["models.TypingGame"]) -> bool:
-    # TODO: update
-    con_name = config.CON_NAME
-    game_tablename = config.GAME_TABLE
-    db = QSqlDatabase.database(con_name)
-    if not db.open():
-        logger.error(f"Could not open database connection {con_name}")
-        utils.display_error("Database Error", f"Could not open database connection '{con_name}'")
-
-    # if not check_table_exists(game_tablename, con_name):
-    if True:  # TODO
-        createTableQuery = QSqlQuery(db)
-        if not createTableQuery.exec(createGameTableQueryString):
-            logger.error(
-                f"Unable to create table {game_tablename}\n"
-                + createTableQuery.lastError().text()
-            )
-            utils.display_error("Database Error", f"Unable to create table {game_tablename}\n"
-                + createTableQuery.lastError().text())
+class GameState(NamedTuple):
+    """A snapshot of a game as stored in the database (see TypingGame.get_state)."""
+
+    # values in upsertGameQueryString order, see GAME_ROW_FIELDS
+    row: Tuple
+    # (character, count) pairs of incorrectly typed expected characters
+    errors: Tuple[Tuple[str, int], ...] = ()
+    # (expected, typed, count) triples of every keystroke
+    confusions: Tuple[Tuple[str, str, int], ...] = ()
+    # (n-gram, latency bucket, count) triples, see models.NgramLatencies
+    latencies: Tuple[Tuple[str, int, int], ...] = ()
+    # (word, milliseconds, error flag) of every completed word, see models.WordTimings
+    words: Tuple[Tuple[str, int, int], ...] = ()
+    # text of an unfinished game that cannot be regenerated from its seed
+    text: Optional[str] = None
+    # an unfinished game saved while typing: only the row and the text are
+    # written, the child rows are written once the game is saved in full
+    checkpoint: bool = False
 
-        logger.info(
-            f"Created/updated table '{game_tablename}' in {db.databaseName()}"
+
+def _write_game(con: sqlite3.Connection, state: GameState) -> int:
+    row = state.row
+    previous = con.execute(selectGameFinishedQueryString, (row[6],)).fetchone()
+    was_finished = bool(previous and previous[1])
+    if was_finished:
+        # take the old result out of the running statistics
+        con.execute(
+            removeUserStatsQueryString, {"wpm": previous[2], "accuracy": previous[3]}
+        )
+        con.executemany(
+            subtractErrorTotalQueryString,
+            (
+                (count, char) for char, count in
+                con.execute(selectGameErrorsQueryString, (previous[0],)).fetchall()
+            ),
+        )
+        con.executemany(
+            subtractConfusionTotalQueryString,
+            (
+                (count, expected, typed) for expected, typed, count in
+                con.execute(selectGameConfusionsQueryString, (previous[0],)).fetchall()
+            ),
         )
+        con.executemany(
+            subtractLatencyTotalQueryString,
+            (
+                (count, ngram, bucket) for ngram, bucket, count in
+                con.execute(selectGameLatenciesQueryString, (previous[0],)).fetchall()
+            ),
+        )
+        con.execute(addGameWordTotalsQueryString, {"sign": -1, "game_id": previous[0]})
+    if state.checkpoint and previous is None:
+        # only the latest interrupted game is offered for resuming
+        con.execute(deleteCheckpointsQueryString, (row[6],))
+    id, wpm, accuracy = con.execute(upsertGameQueryString, row).fetchone()
+    if not state.checkpoint:
+        con.execute(deleteGameErrorsQueryString, (id,))
+        con.executemany(
+            insertGameErrorQueryString,
+            ((id, char, count) for char, count in state.errors),
+        )
+        con.execute(deleteGameConfusionsQueryString, (id,))
+        con.executemany(
+            insertGameConfusionQueryString,
+            ((id, expected, typed, count) for expected, typed, count in state.confusions),
+        )
+        con.execute(deleteGameLatenciesQueryString, (id,))
+        con.executemany(
+            insertGameLatencyQueryString,
+            ((id, ngram, bucket, count) for ngram, bucket, count in state.latencies),
+        )
+        if state.words:
+            con.execute(
+                upsertGameWordsQueryString, (id, json.dumps(state.words, separators=(",", ":")))
+            )
+        else:
+            con.execute(deleteGameWordsQueryString, (id,))
+    if state.text is not None and not row[10]:
+        con.execute(upsertGameTextQueryString, (id, state.text))
+    else:
+        con.execute(deleteGameTextQueryString, (id,))
+    if row[10]:
+        _accumulate_finished_game(
+            con, id, wpm, accuracy, row[6], state.errors, state.confusions, state.latencies
+        )
+    if was_finished:
+        con.execute(refreshBestScoresQueryString)
+        con.execute(deleteEmptyErrorTotalsQueryString)
+        con.execute(deleteEmptyConfusionTotalsQueryString)
+        con.execute(deleteEmptyLatencyTotalsQueryString)
+        con.execute(deleteEmptyWordTotalsQueryString)
+    return id
 
-    insertGameQuery = QSqlQuery(db)
-    insertGameQuery.prepare(insertGameQueryString)
-    (
-        modes,
-        wordset_ids,
-        seeds,
-        poss,
-        incorrect_charss,
-        elapseds,
-        created_ats,
-        word_counts,
-        last_updateds
-    ) = ([], [], [], [], [], [], [], [], [])
+
+def _accumulate_finished_game(
+    con: sqlite3.Connection,
+    id: int,
+    wpm: Optional[float],
+    accuracy: Optional[float],
+    created_at: float,
+    errors: Iterable[Tuple[str, int]],
+    confusions: Iterable[Tuple[str, str, int]],
+    latencies: Iterable[Tuple[str, int, int]],
+) -> None:
+    """Fold a game that has just been finished into the running statistics."""
+    con.execute(
+        updateUserStatsQueryString,
+        {"wpm": wpm, "accuracy": accuracy, "created_at": created_at},
+    )
+    con.executemany(upsertErrorTotalQueryString, errors)
+    con.executemany(upsertConfusionTotalQueryString, confusions)
+    con.executemany(upsertLatencyTotalQueryString, latencies)
+    # the words are read from the stored game
+    con.execute(addGameWordTotalsQueryString, {"sign": 1, "game_id": id})
+
+
+def add_games_to_database(games: Iterable["models.TypingGame"]) -> bool:
+    """Save started games in bulk (see ingest_games)."""
+    records = []
     for game in games:
-        logger.debug(f"Preparing {game} for database insertion")
-        if not all((game.wordset, game.seed, game.elapsed)):
-            logger.warning(
-                "Ignoring partially initialized or corrupted game data"
-            )
+        if not game.start_time:
+            logger.warning(f"Ignoring game that has not been started: {game}")
             continue
-        modes.append(game.mode)
-        wordset_ids.append(game.wordset.id)
-        seeds.append(game.seed)
-        poss.append(game.pos)
-        incorrect_charss.append(game.incorrect_chars)
-        elapseds.append(game.elapsed)
-        created_ats.append(game.start_time)
-        word_counts.append(game.get_word_count())
-        last_updateds.append(game.last_paused)
-    if created_ats:
-        insertGameQuery.addBindValue(modes)
-        insertGameQuery.addBindValue(wordset_ids)
-        insertGameQuery.addBindValue(seeds)
-        insertGameQuery.addBindValue(poss)
-        insertGameQuery.addBindValue(incorrect_charss)
-        insertGameQuery.addBindValue(elapseds)
-        insertGameQuery.addBindValue(created_ats)
-        insertGameQuery.addBindValue(word_counts)
-        insertGameQuery.addBindValue(last_updateds)
-        if not insertGameQuery.execBatch():
-            logger.error(
-                f"Unable to insert values into table '{game_tablename}':\n"
-                + insertGameQuery.lastError().text()
-            )
-            utils.display_error("Database Error", f"Unable to insert values into table '{game_tablename}':\n"
-                + insertGameQuery.lastError().text())
+        state = game.get_state()
+        record = dict(zip(GAME_ROW_FIELDS, state.row))
+        record["errors"] = dict(state.errors)
+        record["confusions"] = state.confusions
+        record["latencies"] = state.latencies
+        record["words"] = state.words
+        records.append(record)
+    ingest_games(records)
+    return True
+
+
+def save_game(state: GameState) -> int:
+    """Save a game state (see TypingGame.get_state) with its errors; return the game id."""
+    con = get_connection()
+    try:
+        with con:
+            id = _write_game(con, state)
+    except sqlite3.Error as e:
+        _report_error(
+            f"Unable to save game in table '{config.GAME_TABLE}'", e
+        )
+        raise
+    logger.debug(f"Saved game {id} in table {_db_name}.{config.GAME_TABLE}")
+    return id
+
 
-        logger.info(f"Added game data to database {db.databaseName()}")
+def get_unfinished_game() -> Optional[Tuple[int, float]]:
+    """Retrieve (id, created_at) of the most recent checkpointed, unfinished game."""
+    return get_connection().execute(selectUnfinishedGameQueryString).fetchone()
+
+
+def finish_game(id: int) -> bool:
+    """Mark a checkpointed game as finished so it is counted in statistics."""
+    con = get_connection()
+    with con:
+        row = con.execute(finishGameQueryString, (id,)).fetchone()
+        if row is not None:
+            errors = con.execute(selectGameErrorsQueryString, (id,)).fetchall()
+            confusions = con.execute(selectGameConfusionsQueryString, (id,)).fetchall()
+            latencies = con.execute(selectGameLatenciesQueryString, (id,)).fetchall()
+            _accumulate_finished_game(con, *row, errors, confusions, latencies)
+            con.execute(deleteGameTextQueryString, (id,))
     return True
 
 
-def get_available_wordsets_ids() -> List[int]:
-    con_name = config.CON_NAME
-    wordset_tablename = config.WORDSET_TABLE
-    db = QSqlDatabase.database(con_name)
-    if not db.open():
-        logger.error(f"Could not open database connection {con_name}")
-        utils.display_error("Database Error", f"Could not open database connection '{con_name}'")
+def delete_game(created_at: float) -> bool:
+    """Remove a game (e.g. an abandoned checkpoint) from the database."""
+    con = get_connection()
+    with con:
+        con.execute(deleteGameQueryString, (created_at,))
+    return True
 
 
-    queryString = f"""
-        SELECT id FROM {wordset_tablename}
-    """
-    query = QSqlQuery(db)
-    if not query.exec(queryString):
+def delete_checkpoints(keep: Optional[float] = None) -> bool:
+    """Remove the unfinished games except the one created at keep (all of them by default)."""
+    con = get_connection()
+    with con:
+        con.execute(deleteCheckpointsQueryString, (keep,))
+    return True
+
+
+def get_wordset(
+    id: Optional[int] = None, name: Optional[str] = None
+) -> Optional[Tuple[int, str, str, int, Tuple[str]]]:
+    """Retrieve (id, name, language, difficulty, words) of a wordset."""
+    if id:
+        queryString, param = selectWordsetByIdQueryString, id
+    elif name:
+        queryString, param = selectWordsetByNameQueryString, name
+    else:
+        return None
+    try:
+        rows = get_connection().execute(queryString, (param,)).fetchall()
+    except sqlite3.Error as e:
         logger.warning(
-            f"Unable to get wordset ids from {wordset_tablename}\n"
-            + query.lastError().text()
+            f"Unable to retrieve wordset {id or name} from table {config.WORDSET_TABLE}:\n{e}"
         )
+        raise
+    if not rows:
+        return None
+    id, name, language, difficulty, _ = rows[0]
+    return (id, name, language, difficulty, tuple(row[4] for row in rows))
+
+
+def get_game(
+    id: Optional[int] = None, created_at: Optional[float] = None
+) -> Optional[Tuple]:
+    """Retrieve a game row by id or creation time."""
+    if id:
+        queryString, param = selectGameByIdQueryString, id
+    elif created_at:
+        queryString, param = selectGameByCreationTimeQueryString, created_at
+    else:
+        return None
+    try:
+        row = get_connection().execute(queryString, (param,)).fetchone()
+    except sqlite3.Error as e:
+        logger.error(
+            f"Unable to retrieve game from table {config.GAME_TABLE}:\n{e}"
+        )
+        return None
+    if row is None:
+        return None
+    return row[:5] + (json.loads(row[5]),) + row[6:]
+
+
+def get_game_confusions(id: int) -> List[Tuple[str, str, int]]:
+    """Retrieve (expected, typed, count) keystroke counts of a game."""
+    return get_connection().execute(selectGameConfusionsQueryString, (id,)).fetchall()
+
+
+def get_confusion_totals() -> List[Tuple[str, str, int]]:
+    """Retrieve (expected, typed, count) keystroke counts of all finished games."""
+    return get_connection().execute(selectConfusionTotalsQueryString).fetchall()
+
+
+def get_game_latencies(id: int) -> List[Tuple[str, int, int]]:
+    """Retrieve (n-gram, latency bucket, count) keystroke latencies of a game."""
+    return get_connection().execute(selectGameLatenciesQueryString, (id,)).fetchall()
+
+
+def get_latency_totals(min_count: int = 1) -> List[Tuple[str, int, int]]:
+    """Retrieve (n-gram, latency bucket, count) of finished games for n-grams typed at least min_count times."""
+    return get_connection().execute(selectLatencyTotalsQueryString, (min_count,)).fetchall()
+
+
+def get_game_words(id: int) -> List[Tuple[str, int, int]]:
+    """Retrieve (word, milliseconds, error flag) of the completed words of a game."""
+    row = get_connection().execute(selectGameWordsQueryString, (id,)).fetchone()
+    return [tuple(word) for word in json.loads(row[0])] if row else []
+
+
+def get_game_text(id: int) -> Optional[str]:
+    """Retrieve the stored text of an unfinished game, if it has one."""
+    row = get_connection().execute(selectGameTextQueryString, (id,)).fetchone()
+    return row[0] if row else None
+
 
-    ids = []
-    while query.next():
-        ids.append(query.value(0))
+def get_word_speed(wordset_id: int) -> Optional[float]:
+    """Retrieve the speed over all timed words of a wordset in words of 5 characters per minute."""
+    (speed,) = get_connection().execute(
+        selectWordSpeedQueryString, (wordset_id,)
+    ).fetchone()
+    return speed
+
+
+def get_slowest_words(
+    wordset_id: int, count: int = 5, min_count: int = 3
+) -> List[Tuple[str, float, int]]:
+    """Retrieve (word, mean milliseconds, times typed) of the words of a wordset typed slowest per character."""
+    return get_connection().execute(
+        selectSlowestWordsQueryString, (wordset_id, min_count, count)
+    ).fetchall()
+
+
+def get_error_prone_words(
+    wordset_id: int, count: int = 5, min_count: int = 3
+) -> List[Tuple[str, float, int]]:
+    """Retrieve (word, error rate, times typed) of the words of a wordset most often mistyped."""
+    return get_connection().execute(
+        selectErrorProneWordsQueryString, (wordset_id, min_count, count)
+    ).fetchall()
+
+
+def get_word_schedule(wordset_id: int) -> List[Tuple[str, int, float, float, float]]:
+    """Retrieve (word, repetitions, interval, ease, due) review entries of a wordset."""
+    return get_connection().execute(selectWordScheduleQueryString, (wordset_id,)).fetchall()
+
+
+def save_word_schedule(
+    wordset_id: int, entries: Iterable[Tuple[str, int, float, float, float]]
+) -> bool:
+    """Save changed (word, repetitions, interval, ease, due) review entries in one transaction."""
+    con = get_connection()
+    try:
+        with con:
+            con.executemany(
+                upsertWordScheduleQueryString,
+                ((wordset_id, *entry) for entry in entries),
+            )
+    except sqlite3.Error as e:
+        _report_error(f"Unable to save review schedule in table '{config.WORD_SCHEDULE_TABLE}'", e)
+        raise
+    return True
+
+
+def get_game_id(created_at: float) -> Optional[int]:
+    """Retrieve id of a game entry with a given creation time."""
+    row = get_connection().execute(
+        selectGameIdQueryString, (created_at,)
+    ).fetchone()
+    return row[0] if row else None
+
+
+def get_available_wordsets_ids() -> List[int]:
+    try:
+        rows = get_connection().execute(selectWordsetIdsQueryString).fetchall()
+    except sqlite3.Error as e:
+        logger.warning(
+            f"Unable to get wordset ids from {config.WORDSET_TABLE}\n{e}"
+        )
+        return []
+    ids = [row[0] for row in rows]
     logger.debug(f"Retrieved indices of wordsets in database: {ids}")
     return ids
 
+
+def get_wordset_names() -> List[Tuple[int, str]]:
+    """Retrieve (id, name) pairs of wordsets currently in database."""
+    try:
+        return get_connection().execute(selectWordsetNamesQueryString).fetchall()
+    except sqlite3.Error as e:
+        _report_error(f"Unable to get wordsets from {config.WORDSET_TABLE}", e)
+        raise
+
+
+def get_default_period() -> Tuple[float, float]:
+    """Return (end, start) of the default statistics period: from the last day of the previous month until now."""
+    start = datetime.date.today().replace(day=1) - datetime.timedelta(days=1)
+    return time.time(), time.mktime(start.timetuple())
+
+
 def get_game_data(
-    period: Tuple[float, float] = (time.time(), (datetime.date.today().replace(day=1) - datetime.timedelta(days=1)-datetime.date(1970,1,1)).total_seconds())
-) -> Optional[List[Tuple[float, float, float, str]]]:
-    con_name = config.CON_NAME
+    period: Optional[Tuple[float, float]] = None
+) -> Optional[List[Tuple[float, float, float, int]]]:
+    period = period or get_default_period()
     game_tablename = config.GAME_TABLE
-    db = QSqlDatabase.database(con_name)
-    if not db.open():
-        logger.error(f"Could not open database connection {con_name}")
-        utils.display_error("Database Error", f"Could not open database connection '{con_name}'")
-
-    if not check_table_exists(game_tablename, con_name):
+    try:
+        rows = get_connection().execute(
+            selectGameDataQueryString, (int(period[1]), int(period[0]))
+        ).fetchall()
+    except sqlite3.Error as e:
         logger.warning(
-                f"Table {game_tablename} does not exist"
-            )
+            f"Unable to get data stats from {game_tablename} for time period {int(period[1])}-{int(period[0])}\n{e}"
+        )
         return None
 
-    queryStr = f"""
-        SELECT incorrect_chars, elapsed, pos, last_updated, word_count from {game_tablename}
-        WHERE last_updated BETWEEN ? AND ?;
+    logger.debug(f"Retrieved game data {rows[:10]}...")
+    return rows
+
+
+def get_game_series(
+    period: Tuple[float, float]
+) -> Tuple[List[float], List[float], List[float]]:
+    """Retrieve (dates, wpm, accuracy) columns of finished games in a period (end, start), oldest first."""
+    try:
+        rows = get_connection().execute(
+            selectGameSeriesQueryString, (period[1], period[0])
+        ).fetchall()
+    except sqlite3.Error as e:
+        _report_error(
+            f"Unable to get game series from {config.GAME_TABLE} for time period {int(period[1])}-{int(period[0])}", e
+        )
+        raise
+    if not rows:
+        return [], [], []
+    dates, wpms, accuracies = zip(*rows)
+    return list(dates), list(wpms), list(accuracies)
+
+
+def get_top_error_chars(
+    period: Optional[Tuple[float, float]] = None,
+    count: int = 10
+) -> List[Tuple[str, int]]:
+    """Retrieve the most frequently mistyped characters in a period (end, start), by default get_default_period()."""
+    period = period or get_default_period()
+    return get_connection().execute(
+        selectTopErrorCharsQueryString, (int(period[1]), int(period[0]), count)
+    ).fetchall()
+
+
+def _mean_and_std(count: float, total: float, total_sq: float) -> Tuple[float, float]:
+    if not count:
+        return 0.0, 0.0
+    mean = total / count
+    return mean, math.sqrt(max(total_sq / count - mean * mean, 0.0))
+
+
+def get_period_summary(
+    period: Tuple[float, float]
+) -> Tuple[int, float, float, float, float]:
+    """Summarize finished games of the days within period from the daily rollups.
+
+    Return (game count, mean wpm, wpm standard deviation, mean accuracy,
+    accuracy standard deviation) without touching individual game rows.
+    """
+    try:
+        row = get_connection().execute(
+            selectPeriodSummaryQueryString, (int(period[1]), int(period[0]))
+        ).fetchone()
+    except sqlite3.Error as e:
+        _report_error(
+            f"Unable to summarize {config.DAILY_STATS_TABLE} for time period {int(period[1])}-{int(period[0])}", e
+        )
+        raise
+    game_count, *sums = row
+    wpm_mean, wpm_std = _mean_and_std(*sums[:3])
+    accuracy_mean, accuracy_std = _mean_and_std(*sums[3:])
+    return int(game_count), wpm_mean, wpm_std, accuracy_mean, accuracy_std
+
+
+class BucketStats(NamedTuple):
+    """Aggregates of the finished games of one time bucket (see get_bucketed_stats)."""
+
+    # first day of the bucket, as YYYY-MM-DD in local time
+    bucket: str
+    mode: Optional[str]
+    wordset_id: Optional[int]
+    games: int
+    wpm_mean: Optional[float]
+    wpm_std: Optional[float]
+    accuracy_mean: Optional[float]
+    accuracy_std: Optional[float]
+    elapsed: float
+    char_count: int
+    error_count: int
+
+
+@lru_cache(maxsize=None)
+def _bucketed_stats_query(
+    bucket: str, by_mode: bool, by_wordset: bool, mode: bool, wordset: bool
+) -> str:
+    group = ["1"]
+    if by_mode:
+        group.append("2")
+    if by_wordset:
+        group.append("3")
+    filters = []
+    if mode:
+        filters.append("mode = ?")
+    if wordset:
+        filters.append("wordset_id = ?")
+    return selectBucketedStatsQueryString.format(
+        bucket=BUCKET_EXPRESSIONS[bucket],
+        # the rollups store missing modes and wordsets as '' and 0
+        mode="NULLIF(mode, '')" if by_mode else "NULL",
+        wordset="NULLIF(wordset_id, 0)" if by_wordset else "NULL",
+        filters="".join(f" AND {f}" for f in filters),
+        group=", ".join(group),
+    )
+
+
+def get_bucketed_stats(
+    bucket: str = "day",
+    period: Optional[Tuple[float, float]] = None,
+    by_mode: bool = False,
+    by_wordset: bool = False,
+    mode: Optional[str] = None,
+    wordset_id: Optional[int] = None,
+) -> List[BucketStats]:
+    """Aggregate finished games by day, week or month (a key of BUCKET_EXPRESSIONS).
+
+    The aggregates are computed by SQLite from the daily rollups, so the
+    cost depends on the number of days in period (end, start; by default
+    get_default_period()) rather than on the number of games. Buckets are
+    split by mode and/or wordset if requested, and can be restricted to one
+    mode or wordset. Means and deviations are None when no game of a bucket
+    has a value (e.g. zero elapsed time).
+    """
+    period = period or get_default_period()
+    queryString = _bucketed_stats_query(
+        bucket, by_mode, by_wordset, mode is not None, wordset_id is not None
+    )
+    params: List = [int(period[1]), int(period[0])]
+    if mode is not None:
+        params.append(mode)
+    if wordset_id is not None:
+        params.append(wordset_id)
+    try:
+        rows = get_connection().execute(queryString, params).fetchall()
+    except sqlite3.Error as e:
+        _report_error(f"Unable to aggregate {config.DAILY_STATS_TABLE} by {bucket}", e)
+        raise
+    return [
+        BucketStats(
+            bucket, row_mode, row_wordset_id, int(games),
+            wpm_mean, None if wpm_var is None else math.sqrt(max(wpm_var, 0.0)),
+            accuracy_mean, None if accuracy_var is None else math.sqrt(max(accuracy_var, 0.0)),
+            elapsed, int(char_count), int(error_count),
+        )
+        for (
+            bucket, row_mode, row_wordset_id, games, wpm_mean, wpm_var,
+            accuracy_mean, accuracy_var, elapsed, char_count, error_count,
+        ) in rows
+    ]
+
+
+@lru_cache(maxsize=None)
+def _game_history_query(
+    sort: str, descending: bool, mode: bool, wordset: bool, period: bool, after: bool
+) -> str:
+    key, _ = HISTORY_SORT_KEYS[sort]
+    filters = []
+    if key != "G.created_at":
+        # games without a value (e.g. zero elapsed time) cannot be ranked
+        filters.append(f"{key} IS NOT NULL")
+    if mode:
+        filters.append("G.mode = ?")
+    if wordset:
+        filters.append("G.wordset_id = ?")
+    if period:
+        filters.append("G.created_at BETWEEN ? AND ?")
+    if after:
+        filters.append(f"({key}, G.created_at) {'<' if descending else '>'} (?, ?)")
+    return selectGameHistoryQueryString.format(
+        filters="".join(f" AND {f}" for f in filters),
+        key=key,
+        order="DESC" if descending else "ASC",
+    )
+
+
+def get_game_history(
+    after: Optional[Tuple] = None,
+    limit: int = config.HISTORY_PAGE_SIZE,
+    sort: str = "created_at",
+    descending: bool = True,
+    mode: Optional[str] = None,
+    wordset_id: Optional[int] = None,
+    period: Optional[Tuple[float, float]] = None,
+) -> List[Tuple]:
+    """Retrieve one page of finished games.
+
+    Rows are (id, created_at, mode, wordset name, wpm, accuracy, elapsed,
+    error count) ordered by sort (a key of HISTORY_SORT_KEYS), ties broken
+    by creation time. Pass the last row of a page as after to get the next
+    one; pages are located through the index, so the cost does not grow
+    with the page number. period is (end, start) as elsewhere.
+    """
+    queryString = _game_history_query(
+        sort, descending, mode is not None, wordset_id is not None,
+        period is not None, after is not None
+    )
+    params: List = []
+    if mode is not None:
+        params.append(mode)
+    if wordset_id is not None:
+        params.append(wordset_id)
+    if period is not None:
+        params.extend((period[1], period[0]))
+    if after is not None:
+        params.extend((after[HISTORY_SORT_KEYS[sort][1]], after[1]))
+    params.append(limit)
+    try:
+        return get_connection().execute(queryString, params).fetchall()
+    except sqlite3.Error as e:
+        _report_error(f"Unable to get game history from {config.GAME_TABLE}", e)
+        raise
+
+
+def iter_game_records(chunk_size: int = 1000) -> Iterator[Dict]:
+    """Yield every game as a dict keyed by GAME_RECORD_FIELDS, oldest first.
+
+    Rows are fetched chunk_size at a time, so memory use does not depend on
+    the number of games. Wordsets are referred to by name, which unlike ids
+    is meaningful in other databases.
+    """
+    cursor = get_connection().execute(selectGameRecordsQueryString)
+    try:
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                break
+            for row in rows:
+                record = dict(zip(GAME_RECORD_FIELDS, row))
+                record["errors"] = json.loads(record["errors"])
+                record["confusions"] = json.loads(record["confusions"])
+                record["latencies"] = json.loads(record["latencies"])
+                record["words"] = json.loads(record["words"]) if record["words"] else []
+                yield record
+    finally:
+        cursor.close()
+
+
+def _resolve_wordset_id(
+    con: sqlite3.Connection, name: Optional[str], cache: Dict[str, Optional[int]]
+) -> Optional[int]:
+    if name is None:
+        return None
+    if name not in cache:
+        row = con.execute(selectWordsetIdByNameQueryString, (name,)).fetchone()
+        cache[name] = row[0] if row else None
+    return cache[name]
+
+
+def _validate_game_record(record: Dict) -> Optional[str]:
+    """Return why a game record cannot be stored, or None if it can."""
+    def is_number(value) -> bool:
+        return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+    for field in ("created_at", "seed", "pos"):
+        if not is_number(record.get(field)):
+            return f"{field} is missing or not a number"
+    if record["pos"] < 0:
+        return "pos is negative"
+    for field in ("elapsed", "error_count", "word_count", "last_updated", "duration"):
+        value = record.get(field)
+        if value is not None and (not is_number(value) or value < 0):
+            return f"{field} is not a non-negative number"
+    if record.get("finished", 1) not in (0, 1):
+        return "finished is neither 0 nor 1"
+    errors = record.get("errors") or {}
+    if not isinstance(errors, dict) or not all(
+        isinstance(char, str) and len(char) == 1
+        and isinstance(count, int) and count > 0
+        for char, count in errors.items()
+    ):
+        return "errors are not a mapping of characters to positive counts"
+    confusions = record.get("confusions") or ()
+    if not all(
+        len(confusion) == 3
+        and all(isinstance(char, str) and len(char) == 1 for char in confusion[:2])
+        and isinstance(confusion[2], int) and confusion[2] > 0
+        for confusion in confusions
+    ):
+        return "confusions are not (expected, typed, positive count) triples"
+    if len({tuple(confusion[:2]) for confusion in confusions}) != len(confusions):
+        return "confusions contain duplicate (expected, typed) pairs"
+    latencies = record.get("latencies") or ()
+    if not all(
+        len(latency) == 3
+        and isinstance(latency[0], str) and 2 <= len(latency[0]) <= 3
+        and isinstance(latency[1], int)
+        and isinstance(latency[2], int) and latency[2] > 0
+        for latency in latencies
+    ):
+        return "latencies are not (n-gram, bucket, positive count) triples"
+    if len({tuple(latency[:2]) for latency in latencies}) != len(latencies):
+        return "latencies contain duplicate (n-gram, bucket) pairs"
+    words = record.get("words") or ()
+    if not all(
+        len(word) == 3
+        and isinstance(word[0], str) and word[0]
+        and isinstance(word[1], int) and word[1] >= 0
+        and word[2] in (0, 1)
+        for word in words
+    ):
+        return "words are not (word, milliseconds, error flag) triples"
+    return None
+
+
+def ingest_games(
+    records: Iterable[Dict], chunk_size: int = config.INGEST_CHUNK_SIZE
+) -> Tuple[int, int, int]:
+    """Validate game records and upsert them on created_at in chunked transactions.
+
+    Records are dicts with the fields of GAME_RECORD_FIELDS (as produced by
+    iter_game_records); a "wordset_id" field may be given instead of the
+    wordset name. Missing optional fields are stored as NULL, except
+    error_count, which defaults to the sum of errors, and last_updated,
+    which defaults to created_at + elapsed. Invalid records, and records the database
+    rejects, are skipped; a rejected record leaves nothing behind. Every
+    chunk of records is committed on its own.
+    Return the number of inserted, updated and skipped records.
+    """
+    con = get_connection()
+    records = iter(records)
+    wordset_ids: Dict[str, Optional[int]] = {}
+    inserted = updated = skipped = 0
+    while True:
+        chunk = list(islice(records, chunk_size))
+        if not chunk:
+            break
+        try:
+            with con:
+                # explicit, so the per-record savepoints do not commit
+                con.execute("BEGIN")
+                (last_id,) = con.execute(
+                    selectMaxIdQueryString.format(config.GAME_TABLE)
+                ).fetchone()
+                new_ids = set()
+                for record in chunk:
+                    reason = _validate_game_record(record)
+                    if reason is not None:
+                        logger.warning(f"Skipping invalid game record: {reason}")
+                        skipped += 1
+                        continue
+                    errors = record.get("errors") or {}
+                    if "wordset_id" in record:
+                        wordset_id = record["wordset_id"]
+                    else:
+                        wordset_id = _resolve_wordset_id(
+                            con, record.get("wordset"), wordset_ids
+                        )
+                    row = (
+                        record.get("mode"),
+                        wordset_id,
+                        record["seed"],
+                        record["pos"],
+                        record.get("error_count", sum(errors.values())),
+                        record.get("elapsed"),
+                        record["created_at"],
+                        record.get("word_count"),
+                        record.get(
+                            "last_updated",
+                            record["created_at"] + (record.get("elapsed") or 0),
+                        ),
+                        record.get("duration"),
+                        record.get("finished", 1),
+                    )
+                    con.execute("SAVEPOINT ingest_record")
+                    try:
+                        id = _write_game(con, GameState(
+                            row,
+                            tuple(errors.items()),
+                            tuple(map(tuple, record.get("confusions") or ())),
+                            tuple(map(tuple, record.get("latencies") or ())),
+                            tuple(map(tuple, record.get("words") or ())),
+                        ))
+                    except sqlite3.IntegrityError as e:
+                        logger.warning(f"Skipping game record rejected by the database: {e}")
+                        con.execute("ROLLBACK TO ingest_record")
+                        skipped += 1
+                        continue
+                    finally:
+                        con.execute("RELEASE ingest_record")
+                    if id > last_id and id not in new_ids:
+                        new_ids.add(id)
+                        inserted += 1
+                    else:
+                        updated += 1
+        except sqlite3.Error as e:
+            _report_error(f"Unable to ingest games into table '{config.GAME_TABLE}'", e)
+            raise
+    logger.info(
+        f"Ingested games into {_db_name}: {inserted} inserted, {updated} updated, {skipped} skipped"
+    )
+    return inserted, updated, skipped
+
+
+def apply_retention(max_age_days: Optional[int] = config.HISTORY_RETENTION_DAYS) -> int:
+    """Delete games older than max_age_days (None keeps everything); return their number.
+
+    Daily rollups of the deleted games are kept as they are, and their error
+    counts are folded into per-day totals first, so statistics over old
+    periods do not change.
+    """
+    if max_age_days is None:
+        return 0
+    cutoff = time.time() - max_age_days * 24 * 60 * 60
+    con = get_connection()
+    try:
+        with con:
+            con.execute(archiveGameErrorsQueryString, (cutoff,))
+            deleted = con.execute(deleteGamesBeforeQueryString, (cutoff,)).rowcount
+    except sqlite3.Error as e:
+        _report_error(f"Unable to remove old games from table '{config.GAME_TABLE}'", e)
+        raise
+    if deleted:
+        logger.info(f"Removed {deleted} games older than {max_age_days} days from {_db_name}")
+    return deleted
+
+
+def run_maintenance(
+    max_age_days: Optional[int] = config.HISTORY_RETENTION_DAYS, analyze: bool = False
+) -> None:
+    """Apply the retention policy and give free pages back to the file system.
+
+    Meant to run while the user is idle. The first run on a database created
+    without incremental auto-vacuum converts it with a full VACUUM. With
+    analyze, also refresh the query planner statistics.
     """
-    query = QSqlQuery(db)
-    query.prepare(queryStr)
-    query.addBindValue(int(period[1]))
-    query.addBindValue(int(period[0]))
-    if not query.exec():
+    apply_retention(max_age_days)
+    con = get_connection()
+    try:
+        (auto_vacuum,) = con.execute("PRAGMA auto_vacuum").fetchone()
+        if auto_vacuum != 2:  # INCREMENTAL
+            logger.info(f"Converting {_db_name} to incremental auto-vacuum")
+            con.execute("PRAGMA auto_vacuum = INCREMENTAL")
+            con.execute("VACUUM")
+        else:
+            # executescript steps the pragma until all requested pages are freed
+            con.executescript(
+                f"PRAGMA incremental_vacuum({int(config.MAINTENANCE_VACUUM_PAGES)})"
+            )
+        if analyze:
+            con.execute("ANALYZE")
+        else:
+            con.execute("PRAGMA optimize")
+    except sqlite3.Error as e:
+        _report_error(f"Unable to run maintenance on {_db_name}", e)
+        raise
+
+
+def merge_database(path: str) -> Tuple[int, int]:
+    """Merge wordsets and finished games of another database file into this one.
+
+    The other database is copied to a temporary file, which is upgraded to
+    the current schema and attached, so the file itself is never modified;
+    a missing file raises sqlite3.OperationalError. Everything is copied
+    with a few set-based statements in a single transaction. Wordsets are
+    matched by name and language and games by creation time, so merging
+    the same file again adds nothing. Return the number of added wordsets
+    and games.
+    """
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        copy_path = os.path.join(tmp_dir, "merged.sqlite")
+        try:
+            other = sqlite3.connect(
+                pathlib.Path(path).resolve().as_uri() + "?mode=rw", uri=True
+            )
+            try:
+                copy = sqlite3.connect(copy_path)
+                try:
+                    other.backup(copy)
+                    migrations.migrate(copy)
+                finally:
+                    copy.close()
+            finally:
+                other.close()
+        except sqlite3.Error as e:
+            _report_error(f"Unable to read database {path}", e)
+            raise
+        return _merge_attached(path, copy_path)
+
+
+def _merge_attached(path: str, copy_path: str) -> Tuple[int, int]:
+    con = get_connection()
+    con.execute("ATTACH DATABASE ? AS other", (copy_path,))
+    try:
+        with con:
+            last_wordset_id, = con.execute(
+                selectMaxIdQueryString.format(config.WORDSET_TABLE)
+            ).fetchone()
+            last_game_id, = con.execute(
+                selectMaxIdQueryString.format(config.GAME_TABLE)
+            ).fetchone()
+            wordsets = con.execute(mergeWordsetsQueryString).rowcount
+            con.execute(createWordsetMapQueryString)
+            con.execute(mergeWordsQueryString, (last_wordset_id,))
+            games = con.execute(mergeGamesQueryString).rowcount
+            con.execute(mergeGameErrorsQueryString, (last_game_id,))
+            con.executemany(updateUserStatsQueryString, (
+                {"wpm": wpm, "accuracy": accuracy, "created_at": created_at}
+                for wpm, accuracy, created_at in con.execute(
+                    selectNewGamesQueryString, (last_game_id,)
+                ).fetchall()
+            ))
+            con.execute(addNewErrorTotalsQueryString, (last_game_id,))
+            con.execute(mergeGameConfusionsQueryString, (last_game_id,))
+            con.execute(addNewConfusionTotalsQueryString, (last_game_id,))
+            con.execute(mergeGameLatenciesQueryString, (last_game_id,))
+            con.execute(addNewLatencyTotalsQueryString, (last_game_id,))
+            con.execute(mergeGameWordsQueryString, (last_game_id,))
+            con.execute(addNewWordTotalsQueryString, (last_game_id,))
+            con.execute("DROP TABLE temp.wordset_map")
+    except sqlite3.Error as e:
+        _report_error(f"Unable to merge database {path} into {_db_name}", e)
+        raise
+    finally:
+        con.execute("DETACH DATABASE other")
+    logger.info(f"Merged {wordsets} wordsets and {games} games from {path} into {_db_name}")
+    return wordsets, games
+
+
+def _user_stats_from_row(row: Tuple) -> Dict:
+    (
+        game_count, wpm_count, wpm_mean, wpm_m2, accuracy_count,
+        accuracy_mean, accuracy_m2, best_wpm, best_wpm_at, best_accuracy,
+        best_accuracy_at,
+    ) = row
+    return {
+        "games": game_count,
+        "wpm mean": wpm_mean,
+        "wpm std": math.sqrt(wpm_m2 / wpm_count) if wpm_count else 0.0,
+        "accuracy mean": accuracy_mean,
+        "accuracy std": math.sqrt(accuracy_m2 / accuracy_count) if accuracy_count else 0.0,
+        "best wpm": (best_wpm_at, best_wpm) if best_wpm is not None else None,
+        "best accuracy": (best_accuracy_at, best_accuracy) if best_accuracy is not None else None,
+    }
+
+
+def get_user_stats() -> Dict:
+    """Return the all-time statistics kept up to date on every finished game.
+
+    Reading them costs the same regardless of the number of games.
+    """
+    try:
+        row = get_connection().execute(selectUserStatsQueryString).fetchone()
+    except sqlite3.Error as e:
+        _report_error(f"Unable to read {config.USER_STATS_TABLE}", e)
+        raise
+    return _user_stats_from_row(row)
+
+
+def get_error_totals(count: int = 10) -> List[Tuple[str, int]]:
+    """Retrieve the most frequently mistyped characters of all time."""
+    return get_connection().execute(selectErrorTotalsQueryString, (count,)).fetchall()
+
+
+def _count_archived_games(con: sqlite3.Connection) -> int:
+    (count,) = con.execute(selectArchivedGameCountQueryString).fetchone()
+    return max(count, 0)
+
+
+def _merge_moments(
+    count: int, mean: float, m2: float, other_count: int, other_sum: float, other_sum_sq: float
+) -> Tuple[int, float, float]:
+    """Combine (count, mean, M2) of one set of values with the count, sum and sum of squares of another."""
+    if other_count <= 0:
+        return count, mean, m2
+    other_mean = other_sum / other_count
+    other_m2 = max(other_sum_sq - other_sum * other_mean, 0.0)
+    total = count + other_count
+    delta = other_mean - mean
+    return (
+        total,
+        mean + delta * other_count / total,
+        m2 + other_m2 + delta * delta * count * other_count / total,
+    )
+
+
+def _rebuild_user_stats(con: sqlite3.Connection, archived: int) -> None:
+    """Recompute the all-time accumulators and error totals from the finished games.
+
+    The archived games removed by the retention policy are added back from
+    the daily rollups (counts, means and M2) and the archived error counts;
+    a best score set by one of them is kept.
+    """
+    stored_best = con.execute(selectUserStatsQueryString).fetchone()
+    stored_best = stored_best[7:] if stored_best else (None, None, None, None)
+    (
+        game_count, wpm_count, wpm_mean, wpm_m2, wpm_sum, wpm_sum_sq,
+        accuracy_count, accuracy_mean, accuracy_m2, accuracy_sum, accuracy_sum_sq,
+    ) = con.execute(selectGameMomentsQueryString).fetchone()
+    if archived:
+        # the rollups hold every finished game; the archived ones are the difference
+        (
+            rollup_wpm_count, rollup_wpm_sum, rollup_wpm_sum_sq,
+            rollup_accuracy_count, rollup_accuracy_sum, rollup_accuracy_sum_sq,
+        ) = con.execute(selectRollupMomentsQueryString).fetchone()
+        game_count += archived
+        wpm_count, wpm_mean, wpm_m2 = _merge_moments(
+            wpm_count, wpm_mean, wpm_m2, rollup_wpm_count - wpm_count,
+            rollup_wpm_sum - wpm_sum, rollup_wpm_sum_sq - wpm_sum_sq,
+        )
+        accuracy_count, accuracy_mean, accuracy_m2 = _merge_moments(
+            accuracy_count, accuracy_mean, accuracy_m2, rollup_accuracy_count - accuracy_count,
+            rollup_accuracy_sum - accuracy_sum, rollup_accuracy_sum_sq - accuracy_sum_sq,
+        )
+    best = []
+    for column, stored in (("wpm", stored_best[:2]), ("accuracy", stored_best[2:])):
+        remaining = con.execute(selectBestScoresQueryString[column]).fetchone() or (None, None)
+        # keep a best score set by a game removed by the retention policy
+        if (
+            archived
+            and stored[0] is not None
+            and (remaining[0] is None or stored[0] >= remaining[0])
+            and con.execute(selectGameIdQueryString, (stored[1],)).fetchone() is None
+        ):
+            remaining = stored
+        best.extend(remaining)
+    con.execute(deleteUserStatsQueryString)
+    con.execute(
+        insertUserStatsQueryString,
+        (game_count, wpm_count, wpm_mean, wpm_m2, accuracy_count, accuracy_mean, accuracy_m2, *best),
+    )
+    con.execute(deleteErrorTotalsQueryString)
+    con.execute(rebuildErrorTotalsQueryString)
+
+
+def _rebuild_accumulators(con: sqlite3.Connection) -> None:
+    archived = _count_archived_games(con)
+    _rebuild_user_stats(con, archived)
+    if archived:
+        # only the games themselves hold their confusions, latencies and words
         logger.warning(
-            f"Unable to get data stats from {game_tablename} for time period {int(period[1])}-{int(period[0])}\n"
-            + query.lastError().text()
-        )
-
-    accs, wpms, dates, incorrect_charss = [], [], [], []
-    while query.next():
-        incorrect_chars = query.value(0)
-        elapsed = query.value(1)
-        pos = query.value(2)
-        last_updated = query.value(3)
-        word_count = query.value(4)
-        accs.append(1-len(incorrect_chars)/pos)
-        wpms.append(word_count/elapsed*60)
-        dates.append(last_updated)
-        incorrect_charss.append(incorrect_chars)
-    logger.debug(f"Retrieved game data {incorrect_charss[:10]}... {accs[:10]}... {wpms[:10]}... {dates[:10]}...")
-    return list(zip(accs, wpms, dates, incorrect_charss))
\ No newline at end of file
+            "Keeping confusion, latency and word totals: games were removed by the retention policy"
+        )
+        return
+    migrations.rebuild_confusion_totals(con)
+    migrations.rebuild_latency_totals(con)
+    migrations.rebuild_word_totals(con)
+
+
+def verify_user_stats() -> Dict:
+    """Compare the running statistics with the ones recomputed from the stored games.
+
+    Return {name: (stored, recomputed)} for every value that differs. Games
+    removed by the retention policy are counted from their daily rollups and
+    archived errors; confusion, latency and word totals cannot be recomputed
+    without the games, so they are only checked while none has been removed.
+    """
+    con = get_connection()
+    stored = get_user_stats()
+    stored_errors = dict(con.execute(selectErrorTotalsQueryString, (-1,)).fetchall())
+    stored_confusions = set(get_confusion_totals())
+    stored_latencies = set(get_latency_totals())
+    stored_words = set(con.execute(selectWordTotalsQueryString).fetchall())
+    try:
+        con.execute("SAVEPOINT verify_user_stats")
+        _rebuild_accumulators(con)
+        recomputed = get_user_stats()
+        recomputed_errors = dict(con.execute(selectErrorTotalsQueryString, (-1,)).fetchall())
+        recomputed_confusions = set(get_confusion_totals())
+        recomputed_latencies = set(get_latency_totals())
+        recomputed_words = set(con.execute(selectWordTotalsQueryString).fetchall())
+    finally:
+        con.execute("ROLLBACK TO verify_user_stats")
+        con.execute("RELEASE verify_user_stats")
+    differences = {}
+    for name, value in stored.items():
+        other = recomputed[name]
+        if isinstance(value, tuple) or isinstance(other, tuple) or value is None or other is None:
+            equal = value == other
+        else:
+            equal = math.isclose(value, other, rel_tol=1e-9, abs_tol=1e-9)
+        if not equal:
+            differences[name] = (value, other)
+    if stored_errors != recomputed_errors:
+        differences["error totals"] = (stored_errors, recomputed_errors)
+    if stored_confusions != recomputed_confusions:
+        differences["confusion totals"] = (
+            sorted(stored_confusions - recomputed_confusions),
+            sorted(recomputed_confusions - stored_confusions),
+        )
+    if stored_latencies != recomputed_latencies:
+        differences["latency totals"] = (
+            sorted(stored_latencies - recomputed_latencies),
+            sorted(recomputed_latencies - stored_latencies),
+        )
+    if stored_words != recomputed_words:
+        differences["word totals"] = (
+            sorted(stored_words - recomputed_words),
+            sorted(recomputed_words - stored_words),
+        )
+    return differences
+
+
+def recompute_user_stats() -> None:
+    """Rebuild the running statistics from the stored games (see verify_user_stats)."""
+    con = get_connection()
+    try:
+        with con:
+            _rebuild_accumulators(con)
+    except sqlite3.Error as e:
+        _report_error(f"Unable to recompute {config.USER_STATS_TABLE}", e)
+        raise
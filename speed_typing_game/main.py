@@ -14,9 +14,10 @@ import PyQt6.QtCore as QtCore
 from PyQt6.QtGui import QIcon, QGuiApplication
 from PyQt6.QtWidgets import QApplication
 
-from speed_typing_game import config
-from speed_typing_game.utils import (create_connection, get_color_palette,
+from speed_typing_game import config, database, worker
+from speed_typing_game.utils import (get_color_palette,
                                      get_color_palette_names,
+                                     get_palette_registry,
                                      get_supported_locale, set_stylesheet,
                                      setup_logging)
 from speed_typing_game.views import MainWindow
@@ -25,9 +26,13 @@ from speed_typing_game.views import MainWindow
 def configure_app(app: QApplication) -> None:
     setup_logging("console", config.LOGGING_LEVEL)
     logger = logging.getLogger(__name__)
-    if not create_connection(config.DB, config.CON_NAME):
+    if not database.init_database(config.DB):
         sys.exit(1)
 
+    palette_registry = get_palette_registry()
+    if config.WATCH_STYLES:
+        palette_registry.watch()
+
     translator = QtCore.QTranslator()
     # system_locale = QtCore.QLocale.system().name()
     # locale = get_supported_locale()[0]
@@ -70,6 +75,7 @@ def configure_app(app: QApplication) -> None:
     # w = models.Wordset.from_file(r"speed_typing_game\resources\words\easy_polish_word_base.txt")
     window = MainWindow(icon)
     window.show()
+    window.check_unfinished_game()
 
 def restart_app() -> None:
     app = QGuiApplication.instance()
@@ -80,6 +86,7 @@ def restart_app() -> None:
 
 def main() -> None:
     app = QApplication(sys.argv)
+    app.aboutToQuit.connect(worker.shutdown_database_worker)
     configure_app(app)
 
     sys.exit(app.exec())
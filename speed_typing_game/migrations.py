@@ -0,0 +1,577 @@
+"""
+Upgrade the game database schema in place.
+
+The schema version is stored in `PRAGMA user_version`. Every function in
+MIGRATIONS upgrades the schema by exactly one version and runs inside its
+own transaction, so a database is either fully upgraded to a version or
+left untouched. Migrations run once at startup (see database.init_database)
+and the rest of the application assumes the latest schema.
+
+Functions:
+
+    get_schema_version(sqlite3.Connection) -> int
+    migrate(sqlite3.Connection) -> int
+    rebuild_confusion_totals(sqlite3.Connection) -> None
+    rebuild_latency_totals(sqlite3.Connection) -> None
+    rebuild_word_totals(sqlite3.Connection) -> None
+
+"""
+
+import logging
+import sqlite3
+from collections import Counter
+from typing import Callable, List
+
+from speed_typing_game import config
+
+logger = logging.getLogger(__name__)
+
+
+def _table_columns(con: sqlite3.Connection, tablename: str) -> List[str]:
+    return [row[1] for row in con.execute(f"PRAGMA table_info({tablename})")]
+
+
+def _v1_initial_schema(con: sqlite3.Connection) -> None:
+    """Create the original tables; add columns missing in pre-release databases."""
+    con.execute(f"""
+        CREATE TABLE IF NOT EXISTS {config.WORDSET_TABLE} (
+            id INTEGER PRIMARY KEY AUTOINCREMENT UNIQUE NOT NULL,
+            name VARCHAR(40) NOT NULL,
+            language_code VARCHAR(6) NOT NULL,
+            difficulty INTEGER
+        )
+        """)
+    con.execute(f"""
+        CREATE TABLE IF NOT EXISTS {config.WORD_TABLE} (
+            id INTEGER PRIMARY KEY AUTOINCREMENT UNIQUE NOT NULL,
+            content VARCHAR(50) NOT NULL,
+            wordset_id INTEGER NOT NULL,
+            FOREIGN KEY (wordset_id)
+                REFERENCES {config.WORDSET_TABLE}(id)
+                ON DELETE CASCADE,
+            UNIQUE(content, wordset_id)
+        )
+        """)
+    con.execute(f"""
+        CREATE TABLE IF NOT EXISTS {config.GAME_TABLE} (
+            id INTEGER PRIMARY KEY AUTOINCREMENT UNIQUE NOT NULL,
+            mode VARCHAR(10),
+            wordset_id INTEGER,
+            seed INTEGER NOT NULL,
+            pos INTEGER NOT NULL,
+            incorrect_chars TEXT,
+            elapsed REAL,
+            created_at REAL NOT NULL UNIQUE,
+            word_count INTEGER,
+            last_updated REAL,
+            FOREIGN KEY (wordset_id)
+                REFERENCES {config.WORDSET_TABLE} (id)
+                ON DELETE SET NULL
+        )
+        """)
+    columns = _table_columns(con, config.GAME_TABLE)
+    if "word_count" not in columns:
+        con.execute(
+            f"ALTER TABLE {config.GAME_TABLE} ADD COLUMN word_count INTEGER"
+        )
+    if "last_updated" not in columns:
+        con.execute(
+            f"ALTER TABLE {config.GAME_TABLE} ADD COLUMN last_updated REAL"
+        )
+    con.execute(f"""
+        UPDATE {config.GAME_TABLE}
+        SET last_updated = created_at + IFNULL(elapsed, 0)
+        WHERE last_updated IS NULL
+        """)
+
+
+def _v2_lookup_indexes(con: sqlite3.Connection) -> None:
+    """Add covering indexes for the game period, word and wordset name lookups."""
+    con.execute(f"""
+        CREATE INDEX IF NOT EXISTS games_last_updated_idx
+        ON {config.GAME_TABLE} (last_updated, elapsed, pos, word_count, incorrect_chars)
+        """)
+    con.execute(f"""
+        CREATE INDEX IF NOT EXISTS words_wordset_id_idx
+        ON {config.WORD_TABLE} (wordset_id, content)
+        """)
+    con.execute(f"""
+        CREATE INDEX IF NOT EXISTS wordsets_name_idx
+        ON {config.WORDSET_TABLE} (name)
+        """)
+
+
+def _v3_game_checkpoints(con: sqlite3.Connection) -> None:
+    """Track unfinished (checkpointed) games and their duration."""
+    con.execute(
+        f"ALTER TABLE {config.GAME_TABLE} ADD COLUMN finished INTEGER NOT NULL DEFAULT 1"
+    )
+    con.execute(f"ALTER TABLE {config.GAME_TABLE} ADD COLUMN duration INTEGER")
+    con.execute("DROP INDEX IF EXISTS games_last_updated_idx")
+    con.execute(f"""
+        CREATE INDEX games_last_updated_idx
+        ON {config.GAME_TABLE} (
+            finished, last_updated, elapsed, pos, word_count, incorrect_chars
+        )
+        """)
+    con.execute(f"""
+        CREATE INDEX games_unfinished_idx
+        ON {config.GAME_TABLE} (created_at)
+        WHERE finished = 0
+        """)
+
+
+def _v4_game_errors(con: sqlite3.Connection) -> None:
+    """Move per-game incorrect characters into the normalized game_errors table."""
+    con.execute(f"""
+        CREATE TABLE {config.GAME_ERROR_TABLE} (
+            game_id INTEGER NOT NULL,
+            char TEXT NOT NULL,
+            count INTEGER NOT NULL,
+            PRIMARY KEY (game_id, char),
+            FOREIGN KEY (game_id)
+                REFERENCES {config.GAME_TABLE} (id)
+                ON DELETE CASCADE
+        ) WITHOUT ROWID
+        """)
+    con.execute(
+        f"ALTER TABLE {config.GAME_TABLE} ADD COLUMN error_count INTEGER NOT NULL DEFAULT 0"
+    )
+    rows = con.execute(f"""
+        SELECT id, incorrect_chars FROM {config.GAME_TABLE}
+        WHERE incorrect_chars <> ''
+        """).fetchall()
+    con.executemany(
+        f"INSERT INTO {config.GAME_ERROR_TABLE} (game_id, char, count) VALUES (?, ?, ?)",
+        (
+            (id, char, count)
+            for id, incorrect_chars in rows
+            for char, count in Counter(incorrect_chars).items()
+        ),
+    )
+    con.execute(f"""
+        UPDATE {config.GAME_TABLE}
+        SET error_count = length(IFNULL(incorrect_chars, ''))
+        """)
+    con.execute("DROP INDEX IF EXISTS games_last_updated_idx")
+    con.execute(f"ALTER TABLE {config.GAME_TABLE} DROP COLUMN incorrect_chars")
+    con.execute(f"""
+        CREATE INDEX games_last_updated_idx
+        ON {config.GAME_TABLE} (
+            finished, last_updated, elapsed, pos, word_count, error_count
+        )
+        """)
+
+
+def _daily_stats_upsert(ref: str, sign: str) -> str:
+    """Return a statement adding (sign '+') or removing (sign '-') a game row's rollup."""
+    return f"""
+        INSERT INTO {config.DAILY_STATS_TABLE} (
+            day, mode, wordset_id, game_count, elapsed_sum, word_count_sum,
+            char_count_sum, error_count_sum, wpm_count, wpm_sum, wpm_sum_sq,
+            accuracy_count, accuracy_sum, accuracy_sum_sq
+        )
+        VALUES (
+            date({ref}.created_at, 'unixepoch', 'localtime'),
+            IFNULL({ref}.mode, ''),
+            IFNULL({ref}.wordset_id, 0),
+            {sign}1,
+            {sign}IFNULL({ref}.elapsed, 0),
+            {sign}IFNULL({ref}.word_count, 0),
+            {sign}{ref}.pos,
+            {sign}{ref}.error_count,
+            {sign}({ref}.wpm IS NOT NULL),
+            {sign}IFNULL({ref}.wpm, 0),
+            {sign}IFNULL({ref}.wpm * {ref}.wpm, 0),
+            {sign}({ref}.accuracy IS NOT NULL),
+            {sign}IFNULL({ref}.accuracy, 0),
+            {sign}IFNULL({ref}.accuracy * {ref}.accuracy, 0)
+        )
+        ON CONFLICT (day, mode, wordset_id) DO UPDATE SET
+            game_count = game_count + excluded.game_count,
+            elapsed_sum = elapsed_sum + excluded.elapsed_sum,
+            word_count_sum = word_count_sum + excluded.word_count_sum,
+            char_count_sum = char_count_sum + excluded.char_count_sum,
+            error_count_sum = error_count_sum + excluded.error_count_sum,
+            wpm_count = wpm_count + excluded.wpm_count,
+            wpm_sum = wpm_sum + excluded.wpm_sum,
+            wpm_sum_sq = wpm_sum_sq + excluded.wpm_sum_sq,
+            accuracy_count = accuracy_count + excluded.accuracy_count,
+            accuracy_sum = accuracy_sum + excluded.accuracy_sum,
+            accuracy_sum_sq = accuracy_sum_sq + excluded.accuracy_sum_sq;
+        """
+
+
+def _v5_daily_stats(con: sqlite3.Connection) -> None:
+    """Maintain per-day, per-mode, per-wordset rollups of finished games."""
+    con.execute(f"""
+        ALTER TABLE {config.GAME_TABLE} ADD COLUMN wpm REAL
+        GENERATED ALWAYS AS (
+            CASE WHEN elapsed > 0 THEN IFNULL(word_count, 0) * 60.0 / elapsed END
+        ) VIRTUAL
+        """)
+    con.execute(f"""
+        ALTER TABLE {config.GAME_TABLE} ADD COLUMN accuracy REAL
+        GENERATED ALWAYS AS (
+            CASE WHEN pos > 0 THEN 1.0 - error_count * 1.0 / pos END
+        ) VIRTUAL
+        """)
+    con.execute(f"""
+        CREATE TABLE {config.DAILY_STATS_TABLE} (
+            day TEXT NOT NULL,
+            mode TEXT NOT NULL,
+            wordset_id INTEGER NOT NULL,
+            game_count INTEGER NOT NULL,
+            elapsed_sum REAL NOT NULL,
+            word_count_sum INTEGER NOT NULL,
+            char_count_sum INTEGER NOT NULL,
+            error_count_sum INTEGER NOT NULL,
+            wpm_count INTEGER NOT NULL,
+            wpm_sum REAL NOT NULL,
+            wpm_sum_sq REAL NOT NULL,
+            accuracy_count INTEGER NOT NULL,
+            accuracy_sum REAL NOT NULL,
+            accuracy_sum_sq REAL NOT NULL,
+            PRIMARY KEY (day, mode, wordset_id)
+        ) WITHOUT ROWID
+        """)
+    # Deleting games (e.g. by retention) intentionally keeps their rollups.
+    con.execute(f"""
+        CREATE TRIGGER games_daily_stats_insert
+        AFTER INSERT ON {config.GAME_TABLE} WHEN NEW.finished = 1
+        BEGIN {_daily_stats_upsert("NEW", "+")} END
+        """)
+    con.execute(f"""
+        CREATE TRIGGER games_daily_stats_update_old
+        AFTER UPDATE ON {config.GAME_TABLE} WHEN OLD.finished = 1
+        BEGIN {_daily_stats_upsert("OLD", "-")} END
+        """)
+    con.execute(f"""
+        CREATE TRIGGER games_daily_stats_update_new
+        AFTER UPDATE ON {config.GAME_TABLE} WHEN NEW.finished = 1
+        BEGIN {_daily_stats_upsert("NEW", "+")} END
+        """)
+    con.execute(f"""
+        INSERT INTO {config.DAILY_STATS_TABLE}
+        SELECT
+            date(created_at, 'unixepoch', 'localtime'),
+            IFNULL(mode, ''),
+            IFNULL(wordset_id, 0),
+            COUNT(*),
+            TOTAL(elapsed),
+            TOTAL(word_count),
+            TOTAL(pos),
+            TOTAL(error_count),
+            COUNT(wpm),
+            TOTAL(wpm),
+            TOTAL(wpm * wpm),
+            COUNT(accuracy),
+            TOTAL(accuracy),
+            TOTAL(accuracy * accuracy)
+        FROM {config.GAME_TABLE}
+        WHERE finished = 1
+        GROUP BY 1, 2, 3
+        """)
+
+
+def _v6_history_indexes(con: sqlite3.Connection) -> None:
+    """Index finished games by speed and accuracy for sorted history pages."""
+    con.execute(f"""
+        CREATE INDEX games_wpm_idx
+        ON {config.GAME_TABLE} (finished, wpm, created_at)
+        """)
+    con.execute(f"""
+        CREATE INDEX games_accuracy_idx
+        ON {config.GAME_TABLE} (finished, accuracy, created_at)
+        """)
+
+
+def _v7_archived_errors(con: sqlite3.Connection) -> None:
+    """Keep per-day error counts of games removed by the retention policy."""
+    con.execute(f"""
+        CREATE TABLE {config.ARCHIVED_ERROR_TABLE} (
+            day TEXT NOT NULL,
+            char TEXT NOT NULL,
+            count INTEGER NOT NULL,
+            PRIMARY KEY (day, char)
+        ) WITHOUT ROWID
+        """)
+
+
+def _v8_user_stats(con: sqlite3.Connection) -> None:
+    """Keep running all-time statistics updated whenever a game is finished."""
+    con.execute(f"""
+        CREATE TABLE {config.USER_STATS_TABLE} (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            game_count INTEGER NOT NULL,
+            wpm_count INTEGER NOT NULL,
+            wpm_mean REAL NOT NULL,
+            wpm_m2 REAL NOT NULL,
+            accuracy_count INTEGER NOT NULL,
+            accuracy_mean REAL NOT NULL,
+            accuracy_m2 REAL NOT NULL,
+            best_wpm REAL,
+            best_wpm_at REAL,
+            best_accuracy REAL,
+            best_accuracy_at REAL
+        )
+        """)
+    con.execute(f"""
+        CREATE TABLE {config.ERROR_TOTAL_TABLE} (
+            char TEXT PRIMARY KEY,
+            count INTEGER NOT NULL
+        ) WITHOUT ROWID
+        """)
+    # fill both from the finished games; later recomputes go through
+    # database.recompute_user_stats, which also counts removed games
+    con.execute(f"""
+        WITH A AS (
+            SELECT COUNT(*) AS n, COUNT(wpm) AS wpm_n, AVG(wpm) AS wpm_mean,
+                COUNT(accuracy) AS accuracy_n, AVG(accuracy) AS accuracy_mean
+            FROM {config.GAME_TABLE} WHERE finished = 1
+        ),
+        W AS (
+            SELECT wpm, created_at FROM {config.GAME_TABLE}
+            WHERE finished = 1 AND wpm IS NOT NULL
+            ORDER BY wpm DESC, created_at LIMIT 1
+        ),
+        C AS (
+            SELECT accuracy, created_at FROM {config.GAME_TABLE}
+            WHERE finished = 1 AND accuracy IS NOT NULL
+            ORDER BY accuracy DESC, created_at LIMIT 1
+        )
+        INSERT INTO {config.USER_STATS_TABLE}
+        SELECT
+            1, A.n,
+            A.wpm_n, IFNULL(A.wpm_mean, 0), (
+                SELECT TOTAL((G.wpm - A.wpm_mean) * (G.wpm - A.wpm_mean))
+                FROM {config.GAME_TABLE} G WHERE G.finished = 1
+            ),
+            A.accuracy_n, IFNULL(A.accuracy_mean, 0), (
+                SELECT TOTAL((G.accuracy - A.accuracy_mean) * (G.accuracy - A.accuracy_mean))
+                FROM {config.GAME_TABLE} G WHERE G.finished = 1
+            ),
+            W.wpm, W.created_at, C.accuracy, C.created_at
+        FROM A LEFT JOIN W LEFT JOIN C
+        """)
+    con.execute(f"""
+        INSERT INTO {config.ERROR_TOTAL_TABLE} (char, count)
+        SELECT E.char, SUM(E.count)
+        FROM {config.GAME_ERROR_TABLE} E
+        JOIN {config.GAME_TABLE} G ON G.id = E.game_id
+        WHERE G.finished = 1
+        GROUP BY E.char
+        """)
+
+
+def rebuild_confusion_totals(con: sqlite3.Connection) -> None:
+    """Recompute the all-time confusion matrix from the finished games in the database."""
+    con.execute(f"DELETE FROM {config.CONFUSION_TOTAL_TABLE}")
+    con.execute(f"""
+        INSERT INTO {config.CONFUSION_TOTAL_TABLE} (expected, typed, count)
+        SELECT C.expected, C.typed, SUM(C.count)
+        FROM {config.GAME_CONFUSION_TABLE} C
+        JOIN {config.GAME_TABLE} G ON G.id = C.game_id
+        WHERE G.finished = 1
+        GROUP BY C.expected, C.typed
+        """)
+
+
+def _v9_confusions(con: sqlite3.Connection) -> None:
+    """Store which character was typed for which expected one, per game and in total."""
+    con.execute(f"""
+        CREATE TABLE {config.GAME_CONFUSION_TABLE} (
+            game_id INTEGER NOT NULL,
+            expected TEXT NOT NULL,
+            typed TEXT NOT NULL,
+            count INTEGER NOT NULL,
+            PRIMARY KEY (game_id, expected, typed),
+            FOREIGN KEY (game_id)
+                REFERENCES {config.GAME_TABLE} (id)
+                ON DELETE CASCADE
+        ) WITHOUT ROWID
+        """)
+    con.execute(f"""
+        CREATE TABLE {config.CONFUSION_TOTAL_TABLE} (
+            expected TEXT NOT NULL,
+            typed TEXT NOT NULL,
+            count INTEGER NOT NULL,
+            PRIMARY KEY (expected, typed)
+        ) WITHOUT ROWID
+        """)
+
+
+def rebuild_latency_totals(con: sqlite3.Connection) -> None:
+    """Recompute the all-time n-gram latency sketches from the finished games in the database."""
+    con.execute(f"DELETE FROM {config.LATENCY_TOTAL_TABLE}")
+    con.execute(f"""
+        INSERT INTO {config.LATENCY_TOTAL_TABLE} (ngram, bucket, count)
+        SELECT L.ngram, L.bucket, SUM(L.count)
+        FROM {config.GAME_LATENCY_TABLE} L
+        JOIN {config.GAME_TABLE} G ON G.id = L.game_id
+        WHERE G.finished = 1
+        GROUP BY L.ngram, L.bucket
+        """)
+
+
+def _v10_latencies(con: sqlite3.Connection) -> None:
+    """Store log-bucketed inter-key latencies of bigrams and trigrams, per game and in total."""
+    con.execute(f"""
+        CREATE TABLE {config.GAME_LATENCY_TABLE} (
+            game_id INTEGER NOT NULL,
+            ngram TEXT NOT NULL,
+            bucket INTEGER NOT NULL,
+            count INTEGER NOT NULL,
+            PRIMARY KEY (game_id, ngram, bucket),
+            FOREIGN KEY (game_id)
+                REFERENCES {config.GAME_TABLE} (id)
+                ON DELETE CASCADE
+        ) WITHOUT ROWID
+        """)
+    con.execute(f"""
+        CREATE TABLE {config.LATENCY_TOTAL_TABLE} (
+            ngram TEXT NOT NULL,
+            bucket INTEGER NOT NULL,
+            count INTEGER NOT NULL,
+            PRIMARY KEY (ngram, bucket)
+        ) WITHOUT ROWID
+        """)
+
+
+def rebuild_word_totals(con: sqlite3.Connection) -> None:
+    """Recompute the all-time per-word times and errors from the finished games in the database."""
+    con.execute(f"DELETE FROM {config.WORD_TOTAL_TABLE}")
+    con.execute(f"""
+        INSERT INTO {config.WORD_TOTAL_TABLE} (wordset_id, word, count, total_time, error_count)
+        SELECT G.wordset_id, json_extract(W.value, '$[0]'), COUNT(*),
+            SUM(json_extract(W.value, '$[1]')), SUM(json_extract(W.value, '$[2]'))
+        FROM {config.GAME_WORD_TABLE} GW
+        JOIN {config.GAME_TABLE} G ON G.id = GW.game_id
+        JOIN json_each(GW.words) W
+        WHERE G.finished = 1 AND G.wordset_id IS NOT NULL
+        GROUP BY 1, 2
+        """)
+
+
+def _v11_word_timings(con: sqlite3.Connection) -> None:
+    """Store the time and error flag of every typed word, per game and per wordset word."""
+    # one row per game; words is a JSON array of [word, milliseconds, error] triples
+    con.execute(f"""
+        CREATE TABLE {config.GAME_WORD_TABLE} (
+            game_id INTEGER PRIMARY KEY,
+            words TEXT NOT NULL,
+            FOREIGN KEY (game_id)
+                REFERENCES {config.GAME_TABLE} (id)
+                ON DELETE CASCADE
+        )
+        """)
+    con.execute(f"""
+        CREATE TABLE {config.WORD_TOTAL_TABLE} (
+            wordset_id INTEGER NOT NULL,
+            word TEXT NOT NULL,
+            count INTEGER NOT NULL,
+            total_time INTEGER NOT NULL,
+            error_count INTEGER NOT NULL,
+            PRIMARY KEY (wordset_id, word),
+            FOREIGN KEY (wordset_id)
+                REFERENCES {config.WORDSET_TABLE} (id)
+                ON DELETE CASCADE
+        ) WITHOUT ROWID
+        """)
+
+
+def _v12_word_schedule(con: sqlite3.Connection) -> None:
+    """Store the spaced-repetition review schedule of problem words."""
+    con.execute(f"""
+        CREATE TABLE {config.WORD_SCHEDULE_TABLE} (
+            wordset_id INTEGER NOT NULL,
+            word TEXT NOT NULL,
+            repetitions INTEGER NOT NULL,
+            interval REAL NOT NULL,
+            ease REAL NOT NULL,
+            due REAL NOT NULL,
+            PRIMARY KEY (wordset_id, word),
+            FOREIGN KEY (wordset_id)
+                REFERENCES {config.WORDSET_TABLE} (id)
+                ON DELETE CASCADE
+        ) WITHOUT ROWID
+        """)
+
+
+def _v13_daily_stats_indexes(con: sqlite3.Connection) -> None:
+    """Index the daily rollups for aggregates of one wordset over long periods."""
+    con.execute(f"""
+        CREATE INDEX daily_stats_wordset_idx
+        ON {config.DAILY_STATS_TABLE} (wordset_id, day)
+        """)
+
+
+def _v14_game_texts(con: sqlite3.Connection) -> None:
+    """Store the text of unfinished games that cannot be regenerated from their seed."""
+    con.execute(f"""
+        CREATE TABLE {config.GAME_TEXT_TABLE} (
+            game_id INTEGER PRIMARY KEY,
+            text TEXT NOT NULL,
+            FOREIGN KEY (game_id)
+                REFERENCES {config.GAME_TABLE} (id)
+                ON DELETE CASCADE
+        )
+        """)
+
+
+def _v15_created_at_index(con: sqlite3.Connection) -> None:
+    """Cover period queries by creation time, the day games are counted on in daily_stats."""
+    con.execute("DROP INDEX IF EXISTS games_last_updated_idx")
+    con.execute(f"""
+        CREATE INDEX games_created_at_idx
+        ON {config.GAME_TABLE} (
+            finished, created_at, elapsed, pos, word_count, error_count
+        )
+        """)
+
+
+MIGRATIONS: List[Callable[[sqlite3.Connection], None]] = [
+    _v1_initial_schema,
+    _v2_lookup_indexes,
+    _v3_game_checkpoints,
+    _v4_game_errors,
+    _v5_daily_stats,
+    _v6_history_indexes,
+    _v7_archived_errors,
+    _v8_user_stats,
+    _v9_confusions,
+    _v10_latencies,
+    _v11_word_timings,
+    _v12_word_schedule,
+    _v13_daily_stats_indexes,
+    _v14_game_texts,
+    _v15_created_at_index,
+]
+
+
+def get_schema_version(con: sqlite3.Connection) -> int:
+    """Return the schema version stored in the database."""
+    return con.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate(con: sqlite3.Connection) -> int:
+    """Apply all pending migrations and return the resulting schema version."""
+    version = get_schema_version(con)
+    if version > len(MIGRATIONS):
+        logger.warning(
+            f"Database schema version {version} is newer than supported ({len(MIGRATIONS)})"
+        )
+        return version
+    for target, migration in enumerate(MIGRATIONS[version:], start=version + 1):
+        logger.info(f"Migrating database schema to version {target}: {migration.__doc__}")
+        try:
+            con.execute("BEGIN")
+            migration(con)
+            con.execute(f"PRAGMA user_version = {target}")
+            con.commit()
+        except sqlite3.Error:
+            con.rollback()
+            logger.error(f"Migration to schema version {target} failed")
+            raise
+        version = target
+    return version
@@ -2,29 +2,37 @@
 Classes:
 
     Wordset: contains words
+    ConfusionMatrix: counts typed characters per expected character
+    NgramLatencies: log-bucketed inter-key latencies of bigrams and trigrams
+    WordTimings: time and error flag of every completed word
+    ReviewScheduler: spaced-repetition schedule of problem words
     TypingGame: represents typing game state
 
 """
 
+import heapq
 import logging
+import math
 import random
 import sys
 import time
-from collections import Counter
+from array import array
+from collections import Counter, deque
 from functools import lru_cache
-from typing import Any, Dict, List, Optional, Tuple, Union
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple, Union
 from enum import Enum
 
-from PyQt6.QtSql import QSqlDatabase, QSqlQuery
 from PyQt6.QtCore import QAbstractListModel, QSettings, QCoreApplication
 
-from speed_typing_game import config, database, utils
+from speed_typing_game import config, database
 
 
 class Mode(str, Enum):
     LEARNING = QCoreApplication.translate("Enum", "Learning")
     CHALLENGE = QCoreApplication.translate("Enum", "Challenge")
     ZEN = QCoreApplication.translate("Enum", "Zen")
+    PRACTICE = QCoreApplication.translate("Enum", "Practice")
+    ADAPTIVE = QCoreApplication.translate("Enum", "Adaptive")
 
 class Wordset:
     """A named set with unique words from certain language and difficulty."""
@@ -44,6 +52,7 @@ class Wordset:
         self.difficulty = difficulty
         self.words = words
         self.id = id
+        self._bands: Optional[Tuple[Tuple[str], ...]] = None
         self.logger.info(f"Initializing {self}")
 
     def __str__(self) -> str:
@@ -64,6 +73,17 @@ class Wordset:
         indices = SeededRandom.choices(range(len(word_pool)), k=count)
         return tuple(word_pool[i] for i in indices)
 
+    def get_difficulty_bands(self, count: int = config.DIFFICULTY_BANDS) -> Tuple[Tuple[str], ...]:
+        """Split the words into count bands of increasing difficulty (longer words are harder)."""
+        if self._bands is None or len(self._bands) != count:
+            ordered = sorted(self.words, key=lambda word: (len(word), word))
+            size = len(ordered) / count
+            self._bands = tuple(
+                tuple(ordered[round(i * size):round((i + 1) * size)]) or tuple(ordered)
+                for i in range(count)
+            )
+        return self._bands
+
     @classmethod
     def from_file(cls, file_path: str) -> Union["Wordset", None]:
         """Initialize a wordset from a text file."""
@@ -91,65 +111,45 @@ class Wordset:
     def from_database(cls, id: Optional[int] = None, _name: Optional[str] = "") -> Union["Wordset", None]:
         """Initialize a wordset from database (use a cached version if possible)."""
         logger = logging.getLogger(__name__)
-        if id:
-            retrieveWordsetQueryString = f"""
-            SELECT id, name, language_code, difficulty FROM {config.WORDSET_TABLE}
-            WHERE ID = '{id}'
-            """
-        elif _name:
-            retrieveWordsetQueryString = f"""
-            SELECT id, name, language_code, difficulty FROM {config.WORDSET_TABLE}
-            WHERE NAME = '{_name}'
-            """
-        else:
+        if not id and not _name:
             logger.warning(
                 "Cannot retrieve wordset from database: no id or name provided"
             )
             return None
-        con_name = config.CON_NAME
-        wordset_tablename = config.WORDSET_TABLE
-        db = QSqlDatabase.database(con_name)
-        if not db.open():
-            logger.error(f"Could not open database connection {con_name}")
-            utils.display_error("Database Error", f"Could not open database connection '{con_name}'")
-        if not database.check_table_exists(wordset_tablename, con_name):
-            logger.warning(f"Table '{wordset_tablename}' does not exist.")
-            return None
-        query = QSqlQuery(db)
-        query.setForwardOnly(True)
-        if not query.exec(retrieveWordsetQueryString) or not query.next():
+        row = database.get_wordset(id, _name)
+        if row is None:
             logger.warning(
-                f"Unable to retrieve wordset {_name} from table {wordset_tablename}:\n"
-                + query.lastError().text()
+                f"Unable to retrieve wordset {id or _name} from table {config.WORDSET_TABLE}"
             )
             return None
-        id = int(query.value(0))
-        name = query.value(1)
-        language = query.value(2)
-        difficulty = int(query.value(3))
+        id, name, language, difficulty, words = row
         logger.debug(f"{id} {name} {language} {difficulty}")
-
-        query = QSqlQuery(db)
-        retrieveWordQueryString = f"""
-            SELECT W.content FROM {config.WORD_TABLE} W
-            WHERE W.wordset_id = '{id}'
-            """
-        if not query.exec(retrieveWordQueryString):
-            logger.warning(
-                f"Unable to retrieve words from table {config.WORD_TABLE}:\n"
-                + query.lastError().text()
-            )
-            return None
-        words: List[str] = []
-        while query.next():
-            words.append(query.value(0))
-        if not words:
-            logger.warning(f"Received empty wordset with id {id}")
-            return None
         logger.debug(
-            f"Retrieved wordset with {len(words)} words from table {db.databaseName()}.{wordset_tablename}"
+            f"Retrieved wordset with {len(words)} words from table {config.WORDSET_TABLE}"
         )
-        return cls(name, language, difficulty, tuple(words), id)
+        return cls(name, language, int(difficulty), words, id)
+
+    @classmethod
+    def load_default(
+        cls, id: Optional[int] = None, name: Optional[str] = None
+    ) -> "Wordset":
+        """Load the wordset with id, or with name, or the first one in the database.
+
+        Reads the database, so call it off the GUI thread; raise LookupError
+        if no wordset can be loaded.
+        """
+        wordset = None
+        if id:
+            wordset = cls.from_database(id)
+        elif name:
+            wordset = cls.from_database(_name=name)
+        else:
+            ids = cls.get_available_ids()
+            if ids:
+                wordset = cls.from_database(ids[0])
+        if wordset is None:
+            raise LookupError(f"No wordset {id or name or ''} available in database")
+        return wordset
 
     def save(self) -> bool:
         """Save wordset to database."""
@@ -161,6 +161,277 @@ class Wordset:
         return database.get_available_wordsets_ids()
 
 
+class ConfusionMatrix:
+    """Counts of (expected character, typed character) keystrokes.
+
+    Characters of the wordset alphabet index a dense array of counters, so
+    recording a keystroke while typing is a single increment; characters
+    outside the alphabet fall back to a Counter.
+    """
+
+    def __init__(
+        self, alphabet: Iterable[str] = "", counts: Iterable[Tuple[str, str, int]] = ()
+    ) -> None:
+        self.alphabet = "".join(sorted(set(alphabet) | {" "}))
+        self.index = {char: i for i, char in enumerate(self.alphabet)}
+        self.size = len(self.alphabet)
+        self.counts = array("I", [0]) * (self.size * self.size)
+        self.overflow: Counter = Counter()
+        for expected, typed, count in counts:
+            self.record(expected, typed, count)
+
+    @classmethod
+    def for_wordset(
+        cls, wordset: Wordset, counts: Iterable[Tuple[str, str, int]] = ()
+    ) -> "ConfusionMatrix":
+        return cls("".join(wordset.words), counts)
+
+    def record(self, expected: str, typed: str, count: int = 1) -> None:
+        """Count a keystroke of typed where expected was the correct character."""
+        i = self.index.get(expected)
+        j = self.index.get(typed)
+        if i is None or j is None:
+            self.overflow[expected, typed] += count
+        else:
+            self.counts[i * self.size + j] += count
+
+    def items(self) -> Iterator[Tuple[str, str, int]]:
+        """Yield (expected, typed, count) for every non-zero count."""
+        for k, count in enumerate(self.counts):
+            if count:
+                i, j = divmod(k, self.size)
+                yield self.alphabet[i], self.alphabet[j], count
+        for (expected, typed), count in self.overflow.items():
+            if count:
+                yield expected, typed, count
+
+
+class NgramLatencies:
+    """Inter-key latencies of the bigrams and trigrams typed in a game.
+
+    Latencies are kept as a sketch: counts of logarithmic buckets, each
+    spanning a relative error of config.LATENCY_SKETCH_ACCURACY, so any
+    quantile can be estimated within that error and sketches of different
+    games merge by adding counts. The latency of an n-gram is the time from
+    the keystroke of its first character to the one of its last; n-grams
+    with a mistake or a longer pause inside are not counted.
+    """
+
+    GAMMA = (1 + config.LATENCY_SKETCH_ACCURACY) / (1 - config.LATENCY_SKETCH_ACCURACY)
+    LOG_GAMMA = math.log(GAMMA)
+
+    def __init__(self, latencies: Iterable[Tuple[str, int, int]] = ()) -> None:
+        self.counts: Counter = Counter()
+        for ngram, bucket, count in latencies:
+            self.counts[ngram, bucket] += count
+        # (character, time) of the last correct keystrokes in a row
+        self.keystrokes: deque = deque(maxlen=3)
+
+    @classmethod
+    def bucket(cls, latency: float) -> int:
+        """Return the bucket of a latency in milliseconds."""
+        return math.ceil(math.log(max(latency, 1.0)) / cls.LOG_GAMMA)
+
+    @classmethod
+    def bucket_value(cls, bucket: int) -> float:
+        """Return the latency in milliseconds that represents a bucket."""
+        return 2 * cls.GAMMA ** bucket / (cls.GAMMA + 1)
+
+    def record(self, char: str, correct: bool, timestamp: float) -> None:
+        """Count the n-grams ending with a keystroke made at timestamp (in seconds)."""
+        if not correct:
+            self.keystrokes.clear()
+            return
+        if self.keystrokes and timestamp - self.keystrokes[-1][1] > config.MAX_KEYSTROKE_INTERVAL:
+            self.keystrokes.clear()
+        self.keystrokes.append((char, timestamp))
+        for n in (2, 3):
+            if len(self.keystrokes) >= n:
+                keystrokes = list(self.keystrokes)[-n:]
+                ngram = "".join(c for c, _ in keystrokes)
+                self.counts[ngram, self.bucket((timestamp - keystrokes[0][1]) * 1000)] += 1
+
+    def reset(self) -> None:
+        """Forget the previous keystrokes (e.g. after a pause)."""
+        self.keystrokes.clear()
+
+    def items(self) -> Iterator[Tuple[str, int, int]]:
+        """Yield (n-gram, bucket, count) for every non-zero count."""
+        for (ngram, bucket), count in self.counts.items():
+            if count:
+                yield ngram, bucket, count
+
+
+class WordTimings:
+    """Time taken by and error flag of every word completed in a game.
+
+    A word is completed when the space after it is typed; its time runs from
+    the completion of the previous word (or the first keystroke of the word)
+    to that moment. A word interrupted by a pause is not timed.
+    """
+
+    def __init__(self, words: Iterable[Tuple[str, int, int]] = ()) -> None:
+        # (word, milliseconds, error flag)
+        self.words: List[Tuple[str, int, int]] = [tuple(word) for word in words]
+        self.start: Optional[float] = None
+        self.word_start = 0
+        self.error = False
+
+    def record(self, text: str, pos: int, correct: bool, advances: bool, timestamp: float) -> None:
+        """Process a keystroke at pos of text made at timestamp (in seconds)."""
+        if self.start is None and (pos == 0 or text[pos - 1] == " "):
+            self.start = timestamp
+            self.word_start = pos
+            self.error = False
+        self.error = self.error or not correct
+        if advances and text[pos] == " ":
+            if self.start is not None and pos > self.word_start:
+                self.words.append(
+                    (text[self.word_start:pos], round((timestamp - self.start) * 1000), int(self.error))
+                )
+            self.start = timestamp
+            self.word_start = pos + 1
+            self.error = False
+
+    def reset(self) -> None:
+        """Stop timing the current word (e.g. after a pause)."""
+        self.start = None
+
+    def items(self) -> Iterator[Tuple[str, int, int]]:
+        """Yield (word, milliseconds, error flag) of every completed word."""
+        return iter(self.words)
+
+
+class ReviewScheduler:
+    """Spaced-repetition (SM-2) schedule of the problem words of a wordset.
+
+    Words enter the schedule when they are mistyped or typed slowly and are
+    reviewed every time they are typed again. Entries are kept in a heap
+    keyed by the next review time, so picking due words costs O(log n) per
+    word; superseded heap items are skipped when popped.
+    """
+
+    SECONDS_PER_DAY = 24 * 60 * 60
+    MIN_EASE = 1.3
+    # number of words taken from the history of a wordset without a schedule
+    SEED_SIZE = 50
+
+    def __init__(
+        self, wordset_id: int, entries: Iterable[Tuple[str, int, float, float, float]] = ()
+    ) -> None:
+        self.logger = logging.getLogger(__name__)
+        self.wordset_id = wordset_id
+        # word -> [repetitions, interval (days), ease, due (timestamp)]
+        self.entries: Dict[str, List] = {
+            word: [repetitions, interval, ease, due]
+            for word, repetitions, interval, ease, due in entries
+        }
+        self.heap = [(entry[3], word) for word, entry in self.entries.items()]
+        heapq.heapify(self.heap)
+        self.changed: set = set()
+
+    @classmethod
+    def for_wordset(cls, wordset_id: int) -> "ReviewScheduler":
+        """Load the schedule of a wordset; not cached, as imports, merges and recomputes also change it."""
+        entries = database.get_word_schedule(wordset_id)
+        scheduler = cls(wordset_id, entries)
+        if not entries:
+            # start with the words that were hardest so far
+            now = time.time()
+            for word, *_ in (
+                database.get_error_prone_words(wordset_id, cls.SEED_SIZE, 1)
+                + database.get_slowest_words(wordset_id, cls.SEED_SIZE, 1)
+            ):
+                if word not in scheduler.entries:
+                    scheduler.add(word, now)
+        return scheduler
+
+    @classmethod
+    def load_due_words(cls, wordset_id: int, count: int) -> List[str]:
+        """Return up to count words of a wordset due for review (reads the database)."""
+        return cls.for_wordset(wordset_id).due_words(count)
+
+    @classmethod
+    def record_game(
+        cls, wordset_id: int, words: Iterable[Tuple[str, int, int]]
+    ) -> int:
+        """Review the (word, milliseconds, error) timings of a game and save the changed entries; return their number."""
+        scheduler = cls.for_wordset(wordset_id)
+        scheduler.review_game(words)
+        entries = scheduler.flush()
+        if entries:
+            database.save_word_schedule(wordset_id, entries)
+        return len(entries)
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def add(self, word: str, now: float) -> None:
+        """Start tracking a word, due immediately."""
+        self.entries[word] = [0, 0.0, 2.5, now]
+        heapq.heappush(self.heap, (now, word))
+        self.changed.add(word)
+
+    def due_words(self, count: int, now: Optional[float] = None) -> List[str]:
+        """Return up to count words due for review at now, most overdue first."""
+        now = time.time() if now is None else now
+        words = []
+        while self.heap and len(words) < count and self.heap[0][0] <= now:
+            due, word = heapq.heappop(self.heap)
+            entry = self.entries.get(word)
+            if entry is not None and entry[3] == due and word not in words:
+                words.append(word)
+        # the words stay due until they are reviewed
+        for word in words:
+            heapq.heappush(self.heap, (self.entries[word][3], word))
+        return words
+
+    def review(self, word: str, quality: int, now: float) -> None:
+        """Reschedule a word after it was typed with quality from 0 (worst) to 5 (best)."""
+        entry = self.entries.get(word)
+        if entry is None:
+            if quality >= 4:
+                return
+            self.add(word, now)
+            entry = self.entries[word]
+        repetitions, interval, ease, _ = entry
+        if quality < 3:
+            repetitions, interval = 0, 1.0
+        else:
+            repetitions += 1
+            interval = 1.0 if repetitions == 1 else 6.0 if repetitions == 2 else interval * ease
+        ease = max(self.MIN_EASE, ease + 0.1 - (5 - quality) * (0.08 + (5 - quality) * 0.02))
+        entry[:] = [repetitions, interval, ease, now + interval * self.SECONDS_PER_DAY]
+        heapq.heappush(self.heap, (entry[3], word))
+        self.changed.add(word)
+        if len(self.heap) > 2 * len(self.entries) + 64:
+            self.heap = [(entry[3], word) for word, entry in self.entries.items()]
+            heapq.heapify(self.heap)
+
+    def review_game(self, words: Iterable[Tuple[str, int, int]], now: Optional[float] = None) -> None:
+        """Review the (word, milliseconds, error flag) of a game; speed is judged against the game median."""
+        now = time.time() if now is None else now
+        words = list(words)
+        if not words:
+            return
+        per_char = sorted(ms / len(word) for word, ms, _ in words)
+        median = per_char[len(per_char) // 2] or 1
+        # a word typed several times in a game is reviewed once, by its worst attempt
+        qualities: Dict[str, int] = {}
+        for word, ms, error in words:
+            ratio = ms / len(word) / median
+            quality = 2 if error else 5 if ratio <= 0.8 else 4 if ratio <= 1.2 else 3
+            qualities[word] = min(quality, qualities.get(word, quality))
+        for word, quality in qualities.items():
+            self.review(word, quality, now)
+
+    def flush(self) -> List[Tuple[str, int, float, float, float]]:
+        """Return the entries changed since the last flush, as stored in the database."""
+        entries = [(word, *self.entries[word]) for word in self.changed]
+        self.changed.clear()
+        return entries
+
+
 class TypingGame:
     def __init__(
         self,
@@ -168,47 +439,53 @@ class TypingGame:
         seed: float = time.time(),
         mode: Mode = Mode.CHALLENGE,
         pos: int = 0,
-        incorrect_chars: str = "",
+        incorrect_chars: Union[str, Dict[str, int]] = "",
         elapsed: float = 0,
         created_at: float = 0,
         id: Optional[int] = None,
         last_updated: float = 0,
         duration: int = 30 * 1000,
-        wordset: Wordset = None
+        wordset: Wordset = None,
+        confusions: Iterable[Tuple[str, str, int]] = (),
+        latencies: Iterable[Tuple[str, int, int]] = (),
+        words: Iterable[Tuple[str, int, int]] = (),
     ) -> None:
         self.logger = logging.getLogger(__name__)
         self.seed = seed if seed else time.time()
-        wordset_name = None
         settings = QSettings("AGHTech", config.PROJECT_NAME)
-        if wordset:
-            self.wordset = wordset
-        else:
-            if wordset_id:
-                self.wordset = Wordset.from_database(wordset_id)
-            elif settings.contains("game/options/wordset/id"):
-                wordset_id = settings.value("game/options/wordset/id")
-            elif settings.contains("game/options/wordset/name"):
-                wordset_name = settings.value("game/options/wordset/name")
-            else:
-                ids = Wordset.get_available_ids()
-                if not ids:
-                    self.logger.error("Found no available wordsets in database")
-                    utils.display_error("Database Error", f"No available wordsets in database")
-
-                wordset_id = ids[0]
-            wordset = Wordset.from_database(id=wordset_id, _name=wordset_name)
-            self.logger.debug(Wordset.from_database.cache_info())
-        if wordset is not None:
-            self.wordset = wordset
-            self.logger.info(f"Using wordset {self.wordset}")
-        else:
-            self.logger.error("No wordset provided.")
-            utils.display_error("Value Error", "No wordset provided.")
+        if wordset is None:
+            # reads the database: games without a wordset are built off the GUI thread
+            wordset = Wordset.load_default(
+                wordset_id or settings.value("game/options/wordset/id"),
+                settings.value("game/options/wordset/name"),
+            )
+        self.wordset = wordset
+        self.logger.info(f"Using wordset {self.wordset}")
 
-        self.text = " ".join(
-            self.wordset.get_subset_with_repetitions(100, self.seed)
-        )
+        try:
+            practice_ratio = float(
+                settings.value("game/options/practice_ratio", config.PRACTICE_RATIO)
+            )
+            if math.isnan(practice_ratio):
+                raise ValueError(practice_ratio)
+        except (TypeError, ValueError):
+            self.logger.warning("Invalid practice ratio in settings, using the default")
+            practice_ratio = config.PRACTICE_RATIO
+        self.practice_ratio = min(max(practice_ratio, 0.0), 1.0)
+        # practice mode: words due for review, loaded off the GUI thread (see set_review_words)
+        self.review_due: List[str] = []
+        # adaptive mode: current difficulty band and the number of timed words when it was chosen
+        self.band = config.DIFFICULTY_BANDS // 2
+        self.band_chosen_at = 0
+        # usual speed in words of 5 characters per minute (see database.get_word_speed)
+        self.baseline_wpm: Optional[float] = None
+        self.random = random.Random(self.seed)
         self.pos = pos
+        # words before _counted_pos, which always follows whitespace (see get_word_count)
+        self._counted_pos = 0
+        self._counted_words = 0
+        # errors restored from a checkpoint, which does not save them per character
+        self.checkpoint_errors = 0
         if mode:
             self.mode = mode
             self.logger.debug(f"Setting mode to {self.mode} from provided value")
@@ -227,7 +504,11 @@ class TypingGame:
         if self.mode == Mode.LEARNING or self.mode == Mode.ZEN:
             self.duration = -1
         self.logger.debug(f"Mode {self.mode} {self.mode==Mode.ZEN} {Mode.ZEN}: setting duration to {self.duration}")
+        self.text = " ".join(self.generate_words(100))
         self.incorrect_chars = Counter(incorrect_chars)
+        self.confusion = ConfusionMatrix.for_wordset(self.wordset, confusions)
+        self.latencies = NgramLatencies(latencies)
+        self.word_timings = WordTimings(words)
         self.in_progress: bool = False
         self.start_time = created_at
         self.elapsed = elapsed
@@ -247,65 +528,64 @@ class TypingGame:
     ) -> Union["TypingGame", None]:
         """Initialize game from a database (used to resume game)."""
         logger = logging.getLogger(__name__)
-        if id:
-            retrieveGameQueryString = f"""
-            SELECT id, mode, wordset_id, seed, pos, incorrect_chars, elapsed, created_at, word_count, last_updated
-            FROM {config.GAME_TABLE} 
-            WHERE ID = '{id}'
-            """
-        elif created_at:
-            retrieveGameQueryString = f"""
-            SELECT id, mode, wordset_id, seed, pos, incorrect_chars, elapsed, created_at, word_count, last_updated
-            FROM {config.GAME_TABLE}
-            WHERE created_at = '{created_at}'
-            """
-        else:
+        if not id and not created_at:
             logger.warning(
                 "Cannot retrieve game from database: no id or created_at provided"
             )
             return None
-        con_name = config.CON_NAME
-        game_tablename = config.GAME_TABLE
-        db = QSqlDatabase.database(con_name)
-        if not db.open():
-            logger.error(f"Could not open database connection {con_name}")
-            utils.display_error("Database Error", f"Could not open database connection '{con_name}'")
-        if not database.check_table_exists(game_tablename, con_name):
-            logger.error("Game table does not exist.")
-            return None
-        query = QSqlQuery(db)
-        if not query.exec(retrieveGameQueryString) or not query.next():
+        row = database.get_game(id, created_at)
+        if row is None:
             logger.error(
-                f"Unable to retrieve game from table {game_tablename}:\n"
-                + query.lastError().text()
+                f"Unable to retrieve game from table {config.GAME_TABLE}"
             )
             return None
-
-        id = int(query.value(0))
-        mode = query.value(1)
-        wordset_id = int(query.value(2))
-        seed = float(query.value(3))
-        pos = int(query.value(4))
-        incorrect_chars = query.value(5)
-        elapsed = float(query.value(6))
-        created_at = float(query.value(7))
-        word_count = int(query.value(8))
-        last_updated = float(query.value(9))
+        (
+            id,
+            mode,
+            wordset_id,
+            seed,
+            pos,
+            incorrect_chars,
+            elapsed,
+            created_at,
+            word_count,
+            last_updated,
+            duration,
+            error_count,
+        ) = row
 
         logger.debug(
-            f"Retrieved game created at {created_at} from table {db.databaseName()}.{game_tablename}"
+            f"Retrieved game created at {created_at} from table {config.GAME_TABLE}"
         )
-        return cls(
+        text = database.get_game_text(id)
+        game = cls(
             wordset_id,
             seed,
             mode,
             pos,
-            incorrect_chars,
-            elapsed,
+            incorrect_chars or {},
+            elapsed or 0,
             created_at,
             id,
-            last_updated
+            last_updated or 0,
+            duration,
+            confusions=database.get_game_confusions(id),
+            latencies=database.get_game_latencies(id),
+            words=database.get_game_words(id),
         )
+        if text is not None:
+            # adaptive and practice texts do not follow from the seed alone
+            game.text = text
+        # checkpoints keep the error count but not the characters
+        game.checkpoint_errors = max((error_count or 0) - sum(game.incorrect_chars.values()), 0)
+        if game.mode == Mode.ADAPTIVE and game.wordset.id is not None:
+            game.baseline_wpm = database.get_word_speed(game.wordset.id)
+        # long Zen/Learning games were extended while typing; rebuild the text up to pos
+        while len(game.text) <= game.pos:
+            length = len(game.text)
+            if len(game.extend_text()) == length:
+                break
+        return game
 
     def start_or_resume(self) -> bool:
         """Resume game if it has been paused or start otherwise."""
@@ -316,7 +596,9 @@ class TypingGame:
             return False
         if not self.start_time:
             self.start_time = time.time()
-            self.last_paused = self.start_time
+        self.last_paused = time.time()
+        self.latencies.reset()
+        self.word_timings.reset()
         self.in_progress = True
         self.logger.info(f"Started/resumed game {self}")
         return True
@@ -338,9 +620,35 @@ class TypingGame:
         else:
             return True
 
+    def record_keystroke(self, typed: str, timestamp: float) -> bool:
+        """Count a keystroke of typed at the current position in the game analytics; return whether it was correct.
+
+        Call before advancing the position; timestamp is in seconds (e.g. time.perf_counter()).
+        """
+        expected = self.text[self.pos]
+        correct = expected == typed
+        self.confusion.record(expected, typed)
+        self.latencies.record(expected, correct, timestamp)
+        self.word_timings.record(
+            self.text, self.pos, correct, correct or self.mode != Mode.LEARNING, timestamp
+        )
+        return correct
+
     def get_word_count(self) -> int:
-        """Calculate number of words entered by this time in a game."""
-        return len(self.text[: self.pos].split())
+        """Calculate number of words entered by this time in a game, counting only the text typed since the last call."""
+        if self.pos < self._counted_pos:
+            self._counted_pos = self._counted_words = 0
+        tail = self.text[self._counted_pos : self.pos]
+        boundary = max(tail.rfind(" "), tail.rfind("\n"))
+        if boundary >= 0:
+            self._counted_words += len(tail[:boundary].split())
+            self._counted_pos += boundary + 1
+            tail = tail[boundary + 1 :]
+        return self._counted_words + len(tail.split())
+
+    def get_error_count(self) -> int:
+        """Calculate number of incorrect characters entered by this time in a game."""
+        return sum(self.incorrect_chars.values()) + self.checkpoint_errors
 
     def get_wpm(self) -> float:
         """Calculate average typing speed (WPM)."""
@@ -352,7 +660,7 @@ class TypingGame:
     def get_accuracy(self) -> float:
         """Calculate accuracy as (1 - number of incorrect characters / number of entered characters)."""
         if self.pos > 0:
-            return (self.pos - sum(self.incorrect_chars.values())) / self.pos
+            return (self.pos - self.get_error_count()) / self.pos
         else:
             return None
 
@@ -378,12 +686,70 @@ class TypingGame:
             "last character position": self.pos,
         }
 
+    def generate_words(self, count: int) -> Tuple[str]:
+        """Randomly pick words to type; in practice mode, mix in words due for review."""
+        if self.mode == Mode.ADAPTIVE:
+            band = self.wordset.get_difficulty_bands()[self.band]
+            return tuple(self.random.choices(band, k=count)) if band else ()
+        words = self.wordset.get_subset_with_repetitions(count, self.seed)
+        if self.mode != Mode.PRACTICE or not self.review_due or not words:
+            return words
+        due = self.review_due[:round(count * self.practice_ratio)]
+        words = list(words)
+        for i, word in zip(random.Random(self.seed).sample(range(count), len(due)), due):
+            words[i] = word
+        return tuple(words)
+
+    def adapt_difficulty(self, visible_end: int) -> bool:
+        """Choose a difficulty band from the recent words and re-sample the text after visible_end.
+
+        Meant to be called at word boundaries. The speed of the last
+        config.ADAPTIVE_WINDOW words, in words of 5 characters per minute so
+        that longer words do not count as slower, is compared with
+        baseline_wpm (or with the first words of the game) and their share
+        of mistakes is checked. Only the words after visible_end are
+        replaced; return whether the text changed.
+        """
+        words = self.word_timings.words
+        if self.mode != Mode.ADAPTIVE or len(words) - self.band_chosen_at < config.ADAPTIVE_WINDOW:
+            return False
+        recent = words[-config.ADAPTIVE_WINDOW:]
+        minutes = sum(ms for _, ms, _ in recent) / 60000
+        # every word is timed together with the space after it
+        wpm = sum(len(word) + 1 for word, *_ in recent) / 5 / minutes if minutes else 0.0
+        accuracy = 1 - sum(error for *_, error in recent) / len(recent)
+        self.band_chosen_at = len(words)
+        if self.baseline_wpm is None:
+            self.baseline_wpm = wpm
+            return False
+        band = self.band
+        if accuracy >= 0.9 and wpm >= 1.05 * self.baseline_wpm:
+            band = min(band + 1, config.DIFFICULTY_BANDS - 1)
+        elif accuracy < 0.7 or wpm < 0.85 * self.baseline_wpm:
+            band = max(band - 1, 0)
+        if band == self.band:
+            return False
+        self.logger.info(f"Adaptive difficulty: band {self.band} -> {band} ({wpm:.0f} wpm, {accuracy:.0%})")
+        self.band = band
+        cut = self.text.find(" ", max(visible_end, self.pos))
+        if cut < 0:
+            return False
+        tail_count = len(self.text[cut + 1:].split())
+        self.text = self.text[:cut + 1] + " ".join(self.generate_words(max(tail_count, 1)))
+        return True
+
+    def set_review_words(self, words: List[str]) -> bool:
+        """Mix words due for review into a practice game that has not started; return whether the text changed."""
+        if self.mode != Mode.PRACTICE or self.start_time or not words:
+            return False
+        self.review_due = list(words)
+        self.text = " ".join(self.generate_words(100))
+        return True
+
     def extend_text(self, count: int = 100) -> str:
         """Generate additional text to type."""
         self.logger.info(f"Game: extending text by {count} words")
-        self.text += " ".join(
-            self.wordset.get_subset_with_repetitions(count, self.seed)
-        )
+        self.text += " ".join(self.generate_words(count))
         return self.text
 
     def get_database_id(self) -> Optional[int]:
@@ -391,69 +757,58 @@ class TypingGame:
         if not self.start_time:
             self.logger.warning("Cannot access game entry: game not started")
             return None
-        """Return id of game entry if it exists in database."""
-        retrieveGameQueryString = f"""
-            SELECT id
-            FROM {config.GAME_TABLE} 
-            WHERE created_at = '{self.start_time}'
-            """
-        con_name = config.CON_NAME
-        game_tablename = config.GAME_TABLE
-        db = QSqlDatabase.database(con_name)
-        if not db.open():
-            self.logger.error(f"Could not open database connection {con_name}")
-            utils.display_error("Database Error", f"Could not open database connection '{con_name}'")
-        if not database.check_table_exists(game_tablename, con_name):
-            self.logger.error("Game table does not exist.")
-            return None
-        query = QSqlQuery(db)
-        if not query.exec(retrieveGameQueryString) or not query.next():
-            self.logger.error(
-                f"Unable to retrieve game data from table {game_tablename}:\n"
-                + query.lastError().text()
-            )
-            return None
-        id = query.value(0)
-        return id
-
-    def save(self) -> bool:
-        """Save game state to database."""
-        id = self.get_database_id()
-        if id:
-            # if game exists, update
-            self.id = id
-            return self._update_database_entry()
-        else:
-            # create new entry
-            return database.add_games_to_database([self])
-
-    def _update_database_entry(self) -> bool:
-        """Update game in a database."""
-        con_name = config.CON_NAME
-        game_tablename = config.GAME_TABLE
-        db = QSqlDatabase.database(con_name)
-        if not db.open():
-            self.logger.error(f"Could not open database connection {con_name}")
-            return False
-        if not database.check_table_exists(game_tablename, con_name):
-            self.logger.error("Game table does not exist.")
-            return False
-        updateGameQueryStr = f"""
-            UPDATE {game_tablename}
-            SET pos={self.pos}, incorrect_chars='{''.join(self.incorrect_chars.elements())}', elapsed={self.elapsed}
-            WHERE id={self.id};
-        """
-        query = QSqlQuery(db)
-        if not query.exec(updateGameQueryStr):
-            self.logger.error(
-                f"Unable to update game {self.id} in table {game_tablename}:\n"
-                + query.lastError().text()
-            )
-            utils.display_error("Database Error", f"Unable to update game {self.id} in table {game_tablename}:\n"
-                + query.lastError().text())
+        return database.get_game_id(self.start_time)
+
+    def get_row(self, finished: bool = True) -> Tuple:
+        """Capture the game as a database row (see database.GameState)."""
+        elapsed = self.elapsed
+        last_updated = self.last_paused
+        if self.in_progress:
+            last_updated = time.time()
+            elapsed += last_updated - self.last_paused
+        return (
+            self.mode,
+            self.wordset.id,
+            self.seed,
+            self.pos,
+            self.get_error_count(),
+            elapsed,
+            self.start_time,
+            self.get_word_count(),
+            last_updated,
+            self.duration // 1000 if self.duration > 0 else None,
+            int(finished),
+        )
 
+    def get_saved_text(self, finished: bool = True) -> Optional[str]:
+        """Return the text to save with an unfinished adaptive or practice game, which does not follow from the seed."""
+        if not finished and self.mode in (Mode.ADAPTIVE, Mode.PRACTICE):
+            return self.text
+        return None
+
+    def get_state(self, finished: bool = True) -> "database.GameState":
+        """Capture the game as a database row with its error and keystroke counts."""
+        return database.GameState(
+            self.get_row(finished),
+            tuple(self.incorrect_chars.items()),
+            tuple(self.confusion.items()),
+            tuple(self.latencies.items()),
+            tuple(self.word_timings.items()),
+            self.get_saved_text(finished),
+        )
 
-        self.logger.debug(
-            f"Updated game {self.id} in table {db.databaseName()}.{game_tablename}"
+    def get_checkpoint(self) -> "database.GameState":
+        """Capture an unfinished game as its database row and text only; cheap enough to call while typing."""
+        return database.GameState(
+            self.get_row(finished=False),
+            text=self.get_saved_text(finished=False),
+            checkpoint=True,
         )
+
+    def save(self, finished: bool = True) -> bool:
+        """Save game state to database (insert or update in one statement)."""
+        if not self.start_time:
+            self.logger.warning("Cannot save game: game not started")
+            return False
+        self.id = database.save_game(self.get_state(finished))
         return True
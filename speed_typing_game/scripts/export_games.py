@@ -0,0 +1,10 @@
+import sys
+
+from speed_typing_game import config, database, transfer
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        sys.exit(f"Usage: {sys.argv[0]} OUTPUT.ndjson|OUTPUT.csv")
+    if not database.init_database(config.DB):
+        sys.exit(1)
+    print(f"Exported {transfer.export_games(sys.argv[1])} games")
@@ -0,0 +1,12 @@
+import sys
+
+from speed_typing_game import config, database, transfer
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        sys.exit(f"Usage: {sys.argv[0]} INPUT.ndjson|INPUT.csv ...")
+    if not database.init_database(config.DB):
+        sys.exit(1)
+    for path in sys.argv[1:]:
+        inserted, updated, skipped = transfer.import_games(path)
+        print(f"{path}: {inserted} games inserted, {updated} updated, {skipped} invalid")
@@ -0,0 +1,12 @@
+import sys
+
+from speed_typing_game import config, database
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        sys.exit(f"Usage: {sys.argv[0]} OTHER_DB ...")
+    if not database.init_database(config.DB):
+        sys.exit(1)
+    for path in sys.argv[1:]:
+        wordsets, games = database.merge_database(path)
+        print(f"{path}: added {wordsets} wordsets and {games} games")
@@ -0,0 +1,18 @@
+import sys
+
+from speed_typing_game import config, database
+
+if __name__ == "__main__":
+    if not database.init_database(config.DB):
+        sys.exit(1)
+    differences = database.verify_user_stats()
+    for name, (stored, recomputed) in differences.items():
+        print(f"{name}: stored {stored}, recomputed {recomputed}")
+    if not differences:
+        print("Running statistics match the stored games")
+    elif "--fix" in sys.argv[1:]:
+        database.recompute_user_stats()
+        print("Running statistics recomputed")
+    else:
+        print("Run with --fix to replace them with the recomputed values")
+        sys.exit(1)
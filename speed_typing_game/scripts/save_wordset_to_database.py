@@ -1,10 +1,10 @@
 import sys
 
-from speed_typing_game import config, database, models, utils
+from speed_typing_game import config, database, models
 
 if __name__ == "__main__":
-    if not utils.create_connection(config.DB, config.CON_NAME):
+    if not database.init_database(config.DB):
         sys.exit(1)
-    database.delete_wordset_table()
+    database.clear_wordset_tables()
     wordsets = [models.Wordset.from_file(i) for i in sys.argv[1:]]
     database.add_wordsets_to_database(wordsets)
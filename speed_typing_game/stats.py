@@ -0,0 +1,259 @@
+"""
+Compute statistics over series of games.
+
+Series are plain sequences of numbers ordered by time. When NumPy is
+installed the computations are vectorized; otherwise an equivalent
+pure-Python implementation is used, so NumPy stays an optional dependency.
+
+Functions:
+
+    rolling_mean(Sequence[float], int) -> List[float]
+    percentiles(Sequence[float], Sequence[float]) -> List[float]
+    personal_best(Sequence[float], Sequence[float]) -> Optional[Tuple[float, float]]
+    linear_trend(Sequence[float], Sequence[float]) -> Tuple[float, float]
+    summarize(Sequence[float], Sequence[float], Sequence[float], int) -> Dict
+    get_period_stats(Tuple[float, float], int) -> Dict
+    sketch_quantile(Sequence[Tuple[int, int]], float) -> float
+    slowest_ngrams(Iterable[Tuple[str, int, int]], int, float) -> List[Tuple[str, float, int]]
+    get_slowest_ngrams(int, float, int) -> List[Tuple[str, float, int]]
+    lttb(Sequence[float], Sequence[float], int) -> List[int]
+    get_history_series(Tuple[float, float], int) -> Dict
+
+"""
+
+import datetime
+import itertools
+import logging
+import math
+import time
+from operator import itemgetter
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from speed_typing_game import database
+from speed_typing_game.models import NgramLatencies
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+logger = logging.getLogger(__name__)
+
+HAS_NUMPY = np is not None
+SECONDS_PER_DAY = 24 * 60 * 60
+
+
+def rolling_mean(values: Sequence[float], window: int) -> List[float]:
+    """Return the mean of every window of consecutive values (len(values) - window + 1 items)."""
+    if window < 1 or len(values) < window:
+        return []
+    if HAS_NUMPY:
+        sums = np.cumsum(np.asarray(values, dtype=float))
+        sums[window:] = sums[window:] - sums[:-window]
+        return (sums[window - 1:] / window).tolist()
+    means = []
+    total = math.fsum(values[:window])
+    means.append(total / window)
+    for i in range(window, len(values)):
+        total += values[i] - values[i - window]
+        means.append(total / window)
+    return means
+
+
+def percentiles(values: Sequence[float], qs: Sequence[float]) -> List[float]:
+    """Return the qs percentiles (0-100) of values, interpolating linearly between ranks."""
+    if not len(values):
+        return [math.nan for _ in qs]
+    if HAS_NUMPY:
+        return np.percentile(np.asarray(values, dtype=float), qs).tolist()
+    ordered = sorted(values)
+    result = []
+    for q in qs:
+        rank = (len(ordered) - 1) * q / 100
+        low = math.floor(rank)
+        high = min(low + 1, len(ordered) - 1)
+        result.append(ordered[low] + (ordered[high] - ordered[low]) * (rank - low))
+    return result
+
+
+def personal_best(
+    dates: Sequence[float], values: Sequence[float]
+) -> Optional[Tuple[float, float]]:
+    """Return (date, value) of the highest value, or None for an empty series."""
+    if not len(values):
+        return None
+    if HAS_NUMPY:
+        i = int(np.argmax(np.asarray(values, dtype=float)))
+    else:
+        i = max(range(len(values)), key=values.__getitem__)
+    return float(dates[i]), float(values[i])
+
+
+def linear_trend(x: Sequence[float], y: Sequence[float]) -> Tuple[float, float]:
+    """Fit y = slope * x + intercept by least squares; return (slope, intercept)."""
+    n = len(x)
+    if n == 0:
+        return 0.0, math.nan
+    if HAS_NUMPY:
+        x_arr = np.asarray(x, dtype=float)
+        y_arr = np.asarray(y, dtype=float)
+        x_mean, y_mean = x_arr.mean(), y_arr.mean()
+        dx = x_arr - x_mean
+        var = float(dx @ dx)
+        slope = float(dx @ (y_arr - y_mean)) / var if var else 0.0
+        return slope, float(y_mean - slope * x_mean)
+    x_mean = math.fsum(x) / n
+    y_mean = math.fsum(y) / n
+    var = math.fsum((xi - x_mean) ** 2 for xi in x)
+    cov = math.fsum((xi - x_mean) * (yi - y_mean) for xi, yi in zip(x, y))
+    slope = cov / var if var else 0.0
+    return slope, y_mean - slope * x_mean
+
+
+def summarize(
+    dates: Sequence[float],
+    wpms: Sequence[float],
+    accuracies: Sequence[float],
+    window: int = 10,
+) -> Dict:
+    """Compute the statistics shown to the user for one series of games."""
+    if HAS_NUMPY:
+        # convert once instead of in every function
+        dates, wpms, accuracies = (
+            np.asarray(column, dtype=float) for column in (dates, wpms, accuracies)
+        )
+    wpm_median, wpm_p90 = percentiles(wpms, (50, 90))
+    slope, _ = linear_trend(dates, wpms)
+    return {
+        "games": len(wpms),
+        "wpm rolling mean": rolling_mean(wpms, window),
+        "accuracy rolling mean": rolling_mean(accuracies, window),
+        "wpm median": wpm_median,
+        "wpm 90th percentile": wpm_p90,
+        "best wpm": personal_best(dates, wpms),
+        "best accuracy": personal_best(dates, accuracies),
+        "wpm trend per day": slope * SECONDS_PER_DAY,
+    }
+
+
+def get_period_stats(period: Tuple[float, float], window: int = 10) -> Dict:
+    """Load the games of a period (end, start) from the database and summarize them."""
+    return summarize(*database.get_game_series(period), window=window)
+
+
+def sketch_quantile(buckets: Sequence[Tuple[int, int]], q: float) -> float:
+    """Estimate the q percentile (0-100) of a latency sketch given as sorted (bucket, count) pairs."""
+    total = sum(count for _, count in buckets)
+    if not total:
+        return math.nan
+    rank = (total - 1) * q / 100
+    seen = 0
+    for bucket, count in buckets:
+        seen += count
+        if seen > rank:
+            break
+    return NgramLatencies.bucket_value(bucket)
+
+
+def slowest_ngrams(
+    latencies: Iterable[Tuple[str, int, int]], count: int = 5, q: float = 50
+) -> List[Tuple[str, float, int]]:
+    """Return (n-gram, q percentile latency in ms, keystrokes) of the count slowest n-grams.
+
+    latencies are (n-gram, bucket, count) rows ordered by n-gram and bucket,
+    as returned by database.get_latency_totals.
+    """
+    result = []
+    for ngram, rows in itertools.groupby(latencies, key=itemgetter(0)):
+        buckets = [(bucket, n) for _, bucket, n in rows]
+        result.append((ngram, sketch_quantile(buckets, q), sum(n for _, n in buckets)))
+    result.sort(key=itemgetter(1), reverse=True)
+    return result[:count]
+
+
+def get_slowest_ngrams(
+    count: int = 5, q: float = 50, min_count: int = 10
+) -> List[Tuple[str, float, int]]:
+    """Load the all-time latency sketches and return the slowest n-grams typed at least min_count times."""
+    return slowest_ngrams(database.get_latency_totals(min_count), count, q)
+
+
+# (bucket, minimum period length in days): history charts of long periods are
+# drawn from per-bucket means instead of individual games
+HISTORY_BUCKETS = (("month", 3 * 365), ("week", 365), ("day", 60))
+
+
+def lttb(x: Sequence[float], y: Sequence[float], threshold: int) -> List[int]:
+    """Pick at most threshold points of a series that keep its visual shape.
+
+    Largest-Triangle-Three-Buckets: the first and last points are kept and
+    from every bucket in between the point forming the largest triangle with
+    the previously picked point and the mean of the next bucket. Return the
+    indices of the picked points, in order.
+    """
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return list(range(n))
+    every = (n - 2) / (threshold - 2)
+    if HAS_NUMPY:
+        x = np.asarray(x, dtype=float)
+        y = np.asarray(y, dtype=float)
+    indices = [0]
+    a = 0
+    for i in range(threshold - 2):
+        start = int(i * every) + 1
+        end = int((i + 1) * every) + 1
+        next_end = min(int((i + 2) * every) + 1, n)
+        if HAS_NUMPY:
+            avg_x = x[end:next_end].mean()
+            avg_y = y[end:next_end].mean()
+            areas = np.abs(
+                (x[a] - avg_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avg_y - y[a])
+            )
+            a = start + int(np.argmax(areas))
+        else:
+            avg_x = math.fsum(x[end:next_end]) / (next_end - end)
+            avg_y = math.fsum(y[end:next_end]) / (next_end - end)
+            a = max(
+                range(start, end),
+                key=lambda j: abs((x[a] - avg_x) * (y[j] - y[a]) - (x[a] - x[j]) * (avg_y - y[a])),
+            )
+        indices.append(a)
+    indices.append(n - 1)
+    return indices
+
+
+def get_history_series(period: Tuple[float, float], max_points: int = 500) -> Dict:
+    """Load the wpm and accuracy history of a period (end, start) for a chart.
+
+    Long periods are read as day, week or month means (see HISTORY_BUCKETS)
+    and short ones as individual games; either way each series is reduced to
+    at most max_points points with lttb. Return {"bucket": str, "period":
+    period, "wpm": (dates, values), "accuracy": (dates, values)}.
+    """
+    end, start = period
+    days = (end - start) / SECONDS_PER_DAY
+    bucket = next((name for name, min_days in HISTORY_BUCKETS if days > min_days), None)
+    series: Dict = {"bucket": bucket or "game", "period": period}
+    if bucket is None:
+        dates, wpms, accuracies = database.get_game_series(period)
+        columns = {"wpm": (dates, wpms), "accuracy": (dates, accuracies)}
+    else:
+        rows = database.get_bucketed_stats(bucket, period)
+        # buckets are plotted at their middle
+        offset = {"day": 0.5, "week": 3.5, "month": 15}[bucket] * SECONDS_PER_DAY
+        starts = [
+            time.mktime(datetime.date.fromisoformat(row.bucket).timetuple()) + offset
+            for row in rows
+        ]
+        columns = {
+            name: (
+                [date for date, row in zip(starts, rows) if getattr(row, field) is not None],
+                [getattr(row, field) for row in rows if getattr(row, field) is not None],
+            )
+            for name, field in (("wpm", "wpm_mean"), ("accuracy", "accuracy_mean"))
+        }
+    for name, (dates, values) in columns.items():
+        picked = lttb(dates, values, max_points)
+        series[name] = ([dates[i] for i in picked], [values[i] for i in picked])
+    return series
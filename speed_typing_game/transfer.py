@@ -0,0 +1,103 @@
+"""
+Export and import game history as NDJSON or CSV files.
+
+Records are streamed in chunks in both directions, so memory use stays
+constant regardless of the size of the history. The format is chosen by
+file extension: ".csv" for CSV, anything else for NDJSON (one JSON object
+per line). In CSV files the error counts of a game are stored as a JSON
+object in the "errors" column and its keystroke counts as a JSON array of
+[expected, typed, count] triples in the "confusions" column; keystroke
+latencies and word timings are stored the same way in the "latencies"
+and "words" columns.
+
+Functions:
+
+    get_format(str) -> str
+    write_records(Iterable[Dict], TextIO, str) -> int
+    read_records(TextIO, str) -> Iterator[Dict]
+    export_games(str, int) -> int
+    import_games(str, int) -> Tuple[int, int, int]
+
+"""
+
+import csv
+import json
+import logging
+import os
+from typing import Dict, Iterable, Iterator, TextIO, Tuple
+
+from speed_typing_game import database
+
+logger = logging.getLogger(__name__)
+
+CSV_FORMAT = "csv"
+NDJSON_FORMAT = "ndjson"
+
+# text columns of a CSV file; the others hold numbers or JSON and are parsed as JSON
+_CSV_TEXT_FIELDS = ("mode", "wordset")
+
+
+def get_format(path: str) -> str:
+    """Return the record format implied by a file name."""
+    if os.path.splitext(path)[1].lower() == ".csv":
+        return CSV_FORMAT
+    return NDJSON_FORMAT
+
+
+def write_records(records: Iterable[Dict], file: TextIO, format: str) -> int:
+    """Write game records to an open text file; return the number written."""
+    count = 0
+    if format == CSV_FORMAT:
+        writer = csv.DictWriter(file, fieldnames=database.GAME_RECORD_FIELDS)
+        writer.writeheader()
+        for record in records:
+            writer.writerow({
+                **record,
+                "errors": json.dumps(record["errors"]),
+                "confusions": json.dumps(record.get("confusions") or []),
+                "latencies": json.dumps(record.get("latencies") or []),
+                "words": json.dumps(record.get("words") or []),
+            })
+            count += 1
+    else:
+        for record in records:
+            file.write(json.dumps(record))
+            file.write("\n")
+            count += 1
+    return count
+
+
+def read_records(file: TextIO, format: str) -> Iterator[Dict]:
+    """Lazily read game records from an open text file."""
+    if format == CSV_FORMAT:
+        for row in csv.DictReader(file):
+            yield {
+                field: (
+                    None if row.get(field, "") == ""
+                    else row[field] if field in _CSV_TEXT_FIELDS
+                    else json.loads(row[field])
+                )
+                for field in database.GAME_RECORD_FIELDS
+            }
+    else:
+        for line in file:
+            if line.strip():
+                yield json.loads(line)
+
+
+def export_games(path: str, chunk_size: int = 1000) -> int:
+    """Write all games of the current database to path; return the number exported."""
+    with open(path, "w", newline="", encoding="utf-8") as file:
+        count = write_records(
+            database.iter_game_records(chunk_size), file, get_format(path)
+        )
+    logger.info(f"Exported {count} games to {path}")
+    return count
+
+
+def import_games(path: str, chunk_size: int = 1000) -> Tuple[int, int, int]:
+    """Import games from path, updating those already present; return (inserted, updated, skipped)."""
+    with open(path, newline="", encoding="utf-8") as file:
+        return database.ingest_games(
+            read_records(file, get_format(path)), chunk_size
+        )
@@ -1,13 +1,19 @@
 """
 Define utility functions.
 
+Classes:
+
+    PaletteRegistry: index of the color palettes by theme
+
 Functions:
 
+    get_stylesheet_template() -> str
+    get_stylesheet(str, str) -> Tuple[str, Dict, str]
     set_stylesheet(QApplication, str, str) -> None
+    get_palette_registry() -> PaletteRegistry
     get_color_palette_names(List[str]) -> List[str]
     get_color_palette(str, str) -> Dict
     setup_logging(str, Union[int, str]) -> None
-    create_connection(str) -> bool
     detect_dark_theme_os() -> str
 
 """
@@ -15,14 +21,14 @@ Functions:
 import json
 import logging
 import os
+import re
 import sys
 from datetime import datetime as dt
 from typing import Dict, List, Tuple, Union, Optional
 from functools import lru_cache
 
 from PyQt6.QtGui import QColor, QPalette
-from PyQt6.QtSql import QSqlDatabase
-from PyQt6.QtCore import QObject, QLocale
+from PyQt6.QtCore import QFileSystemWatcher, QObject, QLocale
 from PyQt6.QtWidgets import QMessageBox
 
 import speed_typing_game.config as config
@@ -30,25 +36,34 @@ import speed_typing_game.config as config
 logger = logging.getLogger(__name__)
 
 
-def set_stylesheet(
-    object: QObject, theme: str, palette_name: Optional[str] = None
-) -> None:
-    """Set stylesheet with a given palette on the widget."""
-    palette_name, palette = get_color_palette(theme, palette_name)
-    logger.debug(
-        f"Attempting to set color palette of {object} to '{palette_name}' ({theme})"
-    )
+STYLESHEET_VARIABLE_PATTERN = re.compile(r"var\((--[\w-]+)\)")
+
+# (theme, palette name) -> QPalette built by set_stylesheet
+_qpalettes: Dict[Tuple[str, str], QPalette] = {}
+
+
+@lru_cache(maxsize=1)
+def get_stylesheet_template() -> str:
+    """Read the stylesheet template (once)."""
     template_path = os.path.join(
         config.RESOURCES_DIR, "styles", "template.css"
     )
-    with open(template_path, "r") as main_f:
-        style_sheet = main_f.read()
-        for color_var in palette.keys():
-            style_sheet = style_sheet.replace(
-                f"var({color_var})", '"' + palette[color_var] + '"'
-            )
-        logger.info(f"Set palette: {palette_name}")
-        object.setStyleSheet(style_sheet)
+    with open(template_path, "r") as f:
+        return f.read()
+
+
+@lru_cache(maxsize=16)
+def get_stylesheet(theme: str, palette_name: Optional[str] = None) -> Tuple[str, Dict, str]:
+    """Return (palette name, colors, stylesheet) of a palette, substituting all colors in one pass."""
+    palette_name, palette = get_color_palette(theme, palette_name)
+    style_sheet = STYLESHEET_VARIABLE_PATTERN.sub(
+        lambda match: '"' + palette[match[1]] + '"' if match[1] in palette else match[0],
+        get_stylesheet_template(),
+    )
+    return palette_name, palette, style_sheet
+
+
+def _build_qpalette(base: QPalette, palette: Dict) -> QPalette:
     window_color = QColor(palette["--background-color"])
     window_text_color = QColor(palette["--foreground-color"])
     button_color = QColor(palette["--background-color"])
@@ -57,7 +72,7 @@ def set_stylesheet(
     highlight_color = QColor(palette["--error-color"])
     button_text_color = QColor(palette["--foreground-selected-color"])
 
-    current_palette = object.palette()
+    current_palette = QPalette(base)
     current_palette.setColorGroup(
         current_palette.currentColorGroup(),
         window_text_color,
@@ -80,51 +95,173 @@ def set_stylesheet(
         QPalette.ColorRole.ButtonText,
         button_text_color,
     )
-    object.setPalette(current_palette)
+    return current_palette
+
+
+def set_stylesheet(
+    object: QObject, theme: str, palette_name: Optional[str] = None
+) -> None:
+    """Set stylesheet with a given palette on the widget.
+
+    Stylesheets and palettes are computed once per (theme, palette) and
+    only applied if they differ from the current ones, since every change
+    makes Qt re-polish the widgets.
+    """
+    palette_name, palette, style_sheet = get_stylesheet(theme, palette_name)
+    logger.debug(
+        f"Attempting to set color palette of {object} to '{palette_name}' ({theme})"
+    )
+    if object.styleSheet() != style_sheet:
+        object.setStyleSheet(style_sheet)
+        logger.info(f"Set palette: {palette_name}")
+    key = (theme, palette_name)
+    if key not in _qpalettes:
+        _qpalettes[key] = _build_qpalette(object.palette(), palette)
+    if object.palette() != _qpalettes[key]:
+        object.setPalette(_qpalettes[key])
+
+
+REQUIRED_PALETTE_COLORS = (
+    "--background-color",
+    "--foreground-color",
+    "--standout-color",
+    "--foreground-selected-color",
+    "--error-color",
+)
+
+
+class PaletteRegistry:
+    """Index of the color palettes in a styles directory.
+
+    The directory holds one subdirectory per theme with one subdirectory
+    per palette, each containing a colors.json file. Everything is read
+    once, so lookups never touch the filesystem; palettes missing one of
+    REQUIRED_PALETTE_COLORS are skipped. After watch() the index is rebuilt
+    whenever palettes are added or removed.
+    """
+
+    def __init__(self, styles_dir: str) -> None:
+        self.styles_dir = styles_dir
+        # theme -> palette name -> colors
+        self.palettes: Dict[str, Dict[str, Dict]] = {}
+        # palette name -> theme
+        self.themes: Dict[str, str] = {}
+        self.watcher: Optional[QFileSystemWatcher] = None
+        self.reload()
+
+    def reload(self) -> None:
+        """Rebuild the index from the styles directory."""
+        palettes: Dict[str, Dict[str, Dict]] = {}
+        for theme_dir in sorted(os.scandir(self.styles_dir), key=lambda d: d.name):
+            if not theme_dir.is_dir():
+                continue
+            palettes[theme_dir.name] = {}
+            for palette_dir in sorted(os.scandir(theme_dir.path), key=lambda d: d.name):
+                colors = self._read_palette(os.path.join(palette_dir.path, "colors.json"))
+                if colors is not None:
+                    palettes[theme_dir.name][palette_dir.name] = colors
+        self.palettes = palettes
+        self.themes = {
+            palette_name: theme
+            for theme, theme_palettes in palettes.items()
+            for palette_name in theme_palettes
+        }
+        # stylesheets rendered from the previous index may be stale
+        get_stylesheet.cache_clear()
+        _qpalettes.clear()
+        logger.debug(f"Indexed palettes: {self.themes}")
+
+    @staticmethod
+    def _read_palette(path: str) -> Optional[Dict]:
+        try:
+            with open(path, "r") as f:
+                colors = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Skipping palette {path}: {e}")
+            return None
+        missing = [key for key in REQUIRED_PALETTE_COLORS if key not in colors]
+        if missing:
+            logger.warning(f"Skipping palette {path}: missing colors {missing}")
+            return None
+        return colors
+
+    def watch(self) -> None:
+        """Rebuild the index when the styles directory changes."""
+        if self.watcher is not None:
+            return
+        self.watcher = QFileSystemWatcher()
+        self.watcher.directoryChanged.connect(self._on_directory_changed)
+        self._watch_directories()
+
+    def _watch_directories(self) -> None:
+        directories = [self.styles_dir] + [
+            os.path.join(self.styles_dir, theme) for theme in self.palettes
+        ]
+        new_directories = [d for d in directories if d not in self.watcher.directories()]
+        if new_directories:
+            self.watcher.addPaths(new_directories)
+
+    def _on_directory_changed(self, path: str) -> None:
+        logger.debug(f"Styles directory changed: {path}")
+        self.reload()
+        self._watch_directories()
+
+    def get_palette_names(self, themes: Optional[List[str]] = None) -> List[str]:
+        return [
+            palette_name
+            for theme, theme_palettes in self.palettes.items()
+            if themes is None or theme in themes
+            for palette_name in theme_palettes
+        ]
+
+    def get_theme(self, palette_name: str) -> Optional[str]:
+        return self.themes.get(palette_name)
+
+    def get_palette(
+        self, theme: str, palette_name: Optional[str] = ""
+    ) -> Optional[Tuple[str, Dict]]:
+        theme_palettes = self.palettes.get(theme, {})
+        if palette_name not in theme_palettes:
+            if not theme_palettes:
+                return None
+            default_palette_name = next(iter(theme_palettes))
+            logger.debug(
+                f"Palette {palette_name} with theme {theme} does not exist. "
+                f"Using default palette {default_palette_name} ({theme})."
+            )
+            palette_name = default_palette_name
+        return palette_name, theme_palettes[palette_name]
+
+
+_palette_registry: Optional[PaletteRegistry] = None
+
+
+def get_palette_registry() -> PaletteRegistry:
+    """Return the palette registry of resources/styles, building it on first use."""
+    global _palette_registry
+    if _palette_registry is None:
+        _palette_registry = PaletteRegistry(
+            os.path.join(config.RESOURCES_DIR, "styles")
+        )
+    return _palette_registry
+
 
-# @lru_cache(maxsize=4)
 def get_color_palette_names(themes: List[str] = None) -> List[str]:
     """Retrieve available palette names for given themes."""
-    palette_names = []
-    for dir in os.scandir(os.path.join(config.RESOURCES_DIR, "styles")):
-        if dir.is_dir() and (themes is None or dir.name in themes):
-            palette_names.extend([file.name for file in os.scandir(dir.path)])
+    palette_names = get_palette_registry().get_palette_names(themes)
     logger.debug(f"Palette names for {themes} : {palette_names}")
     return palette_names
 
+
 def get_theme_by_palette_name(palette_name: str) -> Optional[str]:
-    for dir in os.scandir(os.path.join(config.RESOURCES_DIR, "styles")):
-        if dir.is_dir() and palette_name in [d.name for d in os.scandir(dir)]:
-            logger.debug(f"Theme for {palette_name} : {dir.name}")
-            return dir.name
-    logger.debug(f"Could not retrieve theme for {palette_name}")
-    return None
-
-# @lru_cache(maxsize=10)
+    theme = get_palette_registry().get_theme(palette_name)
+    logger.debug(f"Theme for {palette_name} : {theme}")
+    return theme
+
+
 def get_color_palette(theme: str, palette_name: Optional[str] = "") -> Tuple[str, Dict]:
     """Retrieve a dict with colors for a given palette name."""
-    if not palette_name or not os.path.exists(
-        os.path.join(
-            config.RESOURCES_DIR, "styles", theme, palette_name, "colors.json"
-        )
-    ):
-        logger.debug(f"Trying to set theme {theme}")
-
-        palette_names = get_color_palette_names([theme])
-        if palette_names:
-            default_palette_name = palette_names[0]
-        else:
-            return None
-        logger.debug(
-            f"Palette {palette_name} with theme {theme} does not exist.\n\
-                Using default palette {default_palette_name} ({theme})."
-        )
-        palette_name = default_palette_name
-    palette_path = os.path.join(
-        config.RESOURCES_DIR, "styles", theme, palette_name, "colors.json"
-    )
-    with open(palette_path, "r") as f:
-        return (palette_name, json.load(f))
+    return get_palette_registry().get_palette(theme, palette_name)
 
 
 def setup_logging(log_destination: str, log_level: Union[int, str]) -> None:
@@ -159,16 +296,6 @@ def display_error(text: str, text_verbose: str, critical: bool = True) -> None:
     if critical:
         sys.exit(1)
 
-def create_connection(db_name: str, con_name: str) -> bool:
-    """Create and open a SQLite database connection."""
-    con = QSqlDatabase.addDatabase("QSQLITE", con_name)
-    con.setDatabaseName(db_name)
-    logger.info(f"Trying to open database connection {db_name}")
-    if not con.open():
-        logger.error(f"Database Error: {con.lastError().databaseText()}")
-        display_error("Database Error", f"Could not open database {db_name}: {con.lastError().databaseText()}")
-    return True
-
 @lru_cache
 def get_supported_locale() -> List[str]:
     translation_path = os.path.join(config.RESOURCES_DIR, "translate")
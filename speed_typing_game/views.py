@@ -4,13 +4,18 @@ Classes:
     MainTypingArea(QLineEdit)
     TranslucentWidget(QWidget)
     TypingHintLabel(QLabel)
+    KeyboardHeatmap(QWidget)
+    HistoryChart(QWidget)
+    GameHistoryModel(QAbstractTableModel)
     MainWindow(QWidget)
 
 """
+import functools
 import logging
 import sys
-from typing import Dict, List, Tuple, Optional
+from typing import Any, Callable, Dict, List, Tuple, Optional
 from collections import Counter
+import datetime
 import time
 
 import PyQt6.QtCore as QtCore
@@ -22,9 +27,8 @@ from PyQt6.QtWidgets import (QButtonGroup, QFileDialog, QGridLayout, QGroupBox,
                              QHBoxLayout, QLabel, QLineEdit, QListView,
                              QPushButton, QVBoxLayout, QWidget, QAbstractButton)
 from PyQt6 import QtWidgets
-from PyQt6 import QtSql
 
-from speed_typing_game import config, models, database, utils
+from speed_typing_game import config, models, database, stats, utils, worker
 from speed_typing_game.models import TypingGame
 from speed_typing_game.utils import set_stylesheet
 from speed_typing_game import main
@@ -62,6 +66,9 @@ class MainTypingArea(QLineEdit):
         char = text[-1]
         pos = game.pos
         char_correct = game.text[pos]
+        game.record_keystroke(char, time.perf_counter())
+        if char_correct == " ":
+            game.adapt_difficulty(self.label.max_char_pos())
         # self.logger.debug(
             # f"Typed in '{char}' - correct answer'{char_correct}'\
 #  - position {pos}"
@@ -124,6 +131,9 @@ class MainTypingArea(QLineEdit):
             return
         elif key in config.TAKEBACK_KEYS or is_cutpaste_event:
             self.logger.debug("Takeback")
+        if not window.game.text:
+            # the wordset of the game is still loading
+            return
         if not window.game.in_progress:
             window.start_game()
         self.setReadOnly(False)
@@ -177,7 +187,7 @@ class PopupWidget(QWidget):
     def show(self) -> None:
         self.fillColor = self.palette().window().color().lighter(120)
         self.penColor = self.palette().windowText().color().darker(120)
-        self.setStyleSheet(f"""PopupWidget {{
+        style_sheet = f"""PopupWidget {{
                                         border: 4px solid {self.palette().text().color().name()};
                                         border-radius: 5px;
                                         background: {self.fillColor.name()};
@@ -185,7 +195,10 @@ class PopupWidget(QWidget):
         }}
         QWidget {{
             background: {self.fillColor.name()}
-        }}""")
+        }}"""
+        # re-applying an identical stylesheet still re-polishes every child
+        if self.styleSheet() != style_sheet:
+            self.setStyleSheet(style_sheet)
         return super().show()
 
 
@@ -462,15 +475,9 @@ class WordsetMenu(PopupWidget):
 
     def initUI(self) -> None:
         self.setLayout(QVBoxLayout())
-        con_name = config.CON_NAME
-        wordset_tablename = config.WORDSET_TABLE
-        self.db = QtSql.QSqlDatabase.database(con_name)
-        if not self.db.open():
-            self.logger.error(f"Could not open database connection {con_name}")
-            utils.display_error("Database Error", f"Could not open database connection '{con_name}'")
-
-        self.model = QtSql.QSqlQueryModel()
-        self.model.setQuery("SELECT name, id FROM wordsets", self.db)
+        self.wordset_ids: List[int] = []
+        self.model = QtCore.QStringListModel()
+        self.load_wordsets()
         self.view = QtWidgets.QListView()
         self.view.setItemAlignment(Qt.AlignmentFlag.AlignVCenter | Qt.AlignmentFlag.AlignHCenter)
         self.view.setModel(self.model)
@@ -500,6 +507,16 @@ class WordsetMenu(PopupWidget):
         self.view.adjustSize()
         self.retranslateUI()
 
+    def load_wordsets(self) -> None:
+        """Request wordset names from the database worker."""
+        self.parent().database_worker.submit(
+            database.get_wordset_names, callback=self._set_wordsets
+        )
+
+    def _set_wordsets(self, wordsets: List[Tuple[int, str]]) -> None:
+        self.wordset_ids = [id for id, _ in wordsets]
+        self.model.setStringList([name for _, name in wordsets])
+
     def set_wordset(self, wordset: models.Wordset, add_to_database: bool = False) -> None:
         settings = QSettings()
         set_wordset = False
@@ -514,7 +531,9 @@ class WordsetMenu(PopupWidget):
         if set_wordset:
             self.logger.info(f"Set default wordset {wordset}")
             if add_to_database:
-                wordset.save()
+                self.parent().database_worker.submit(
+                    wordset.save, callback=lambda _: self.load_wordsets()
+                )
         else:
             self.logger.error(f"Could not set wordset: wordset {wordset} has incomplete data")
         self._onclose()
@@ -523,11 +542,14 @@ class WordsetMenu(PopupWidget):
 
     def select_wordset_from_list(self) -> None:
         ix = self.view.selectionModel().currentIndex().row()
-        wordset_id = self.model.record(ix).value("id")
+        wordset_id = self.wordset_ids[ix]
         QSettings().setValue("game/options/wordset/id", wordset_id)
         self.logger.info(f"Set default wordset {wordset_id}")
         self._onclose()
-        self.parent().init_game()
+        self.parent().database_worker.submit(
+            models.Wordset.from_database, wordset_id,
+            callback=lambda wordset: self.parent().init_game(wordset=wordset)
+        )
 
     def retranslateUI(self) -> None:
         pass
@@ -601,36 +623,319 @@ Contributors
         )
 
 
+class KeyboardHeatmap(QWidget):
+    """A QWERTY keyboard with keys colored by how often they were mistyped."""
+
+    ROWS = ("1234567890", "qwertyuiop", "asdfghjkl", "zxcvbnm")
+    KEY_SIZE = 22
+
+    def __init__(self, parent: QWidget = None) -> None:
+        super().__init__(parent)
+        self.error_rates: Dict[str, float] = {}
+        self.max_rate = 0.0
+        self.setMinimumSize(self.sizeHint())
+
+    def sizeHint(self) -> QtCore.QSize:
+        columns = max(len(row) + i / 2 for i, row in enumerate(self.ROWS))
+        return QtCore.QSize(
+            int(columns * self.KEY_SIZE) + 1, (len(self.ROWS) + 1) * self.KEY_SIZE + 1
+        )
+
+    def set_confusions(self, confusions: List[Tuple[str, str, int]]) -> None:
+        """Compute the error rate of every expected key from (expected, typed, count) triples."""
+        typed: Counter = Counter()
+        mistyped: Counter = Counter()
+        for expected, char, count in confusions:
+            key = expected.lower()
+            typed[key] += count
+            if char != expected:
+                mistyped[key] += count
+        self.error_rates = {key: mistyped[key] / typed[key] for key in typed}
+        self.max_rate = max(self.error_rates.values(), default=0.0)
+        self.update()
+
+    def paintEvent(self, event: QtGui.QPaintEvent) -> None:
+        painter = QtGui.QPainter(self)
+        painter.setRenderHint(QtGui.QPainter.RenderHint.Antialiasing)
+        base = self.palette().button().color()
+        hot = self.palette().highlight().color()
+        painter.setPen(self.palette().buttonText().color())
+        size = self.KEY_SIZE
+        rows = [(i * size / 2, row) for i, row in enumerate(self.ROWS)]
+        # the space bar spans the columns of "c" to "m"
+        rows.append((len(self.ROWS) * size / 2 + 2 * size, " "))
+        for i, (offset, keys) in enumerate(rows):
+            for j, key in enumerate(keys):
+                width = 5 * size if key == " " else size
+                rect = QtCore.QRectF(offset + j * size, i * size, width, size).adjusted(1, 1, -1, -1)
+                rate = self.error_rates.get(key, 0.0)
+                weight = rate / self.max_rate if self.max_rate else 0.0
+                color = QtGui.QColor.fromRgbF(
+                    base.redF() + (hot.redF() - base.redF()) * weight,
+                    base.greenF() + (hot.greenF() - base.greenF()) * weight,
+                    base.blueF() + (hot.blueF() - base.blueF()) * weight,
+                )
+                painter.setBrush(color)
+                painter.drawRoundedRect(rect, 3, 3)
+                painter.drawText(rect, Qt.AlignmentFlag.AlignCenter, key)
+
+
+class HistoryChart(QWidget):
+    """A chart of wpm and accuracy over time; the wheel zooms, a double click shows all.
+
+    Series come downsampled from stats.get_history_series, so the number
+    of drawn points is bounded by the chart width; every zoom re-queries the
+    visible period, which switches to finer buckets as it gets shorter.
+    """
+
+    MIN_PERIOD = 24 * 60 * 60
+    MARGIN = 24
+
+    def __init__(self, database_worker: worker.DatabaseWorker, parent: QWidget = None) -> None:
+        super().__init__(parent)
+        self.logger = logging.getLogger(__name__)
+        self.database_worker = database_worker
+        self.series: Dict = {}
+        self.period: Optional[Tuple[float, float]] = None
+        # date of the first point of the whole history, the limit of zooming out
+        self.first_date: Optional[float] = None
+        self.setMinimumSize(300, 140)
+
+    def full_period(self) -> Tuple[float, float]:
+        return time.time(), 0.0
+
+    def max_points(self) -> int:
+        return max(self.width() - 2 * self.MARGIN, 3)
+
+    def load(self, period: Optional[Tuple[float, float]] = None) -> None:
+        """Request the series of period (end, start), by default the whole history."""
+        self.period = period or self.full_period()
+        self.database_worker.submit(
+            stats.get_history_series, self.period, self.max_points(), callback=self.set_series
+        )
+
+    def set_series(self, series: Dict) -> None:
+        if series["period"] != self.period:
+            return  # superseded by a later zoom
+        self.series = series
+        if series["period"][1] == 0.0:
+            dates = series.get("wpm", ((), ()))[0]
+            self.first_date = dates[0] if dates else None
+        self.update()
+
+    def is_zoomed(self) -> bool:
+        return self.period is not None and self.period[1] != 0.0
+
+    def x_range(self) -> Tuple[float, float]:
+        end, start = self.period or self.full_period()
+        if start == 0.0:
+            # the whole history: fit the data
+            dates = self.series.get("wpm", ((), ()))[0]
+            if dates:
+                return dates[0], max(dates[-1], dates[0] + self.MIN_PERIOD)
+            return end - self.MIN_PERIOD, end
+        return start, end
+
+    def wheelEvent(self, event: QtGui.QWheelEvent) -> None:
+        start, end = self.x_range()
+        width = max(self.width() - 2 * self.MARGIN, 1)
+        ratio = min(max((event.position().x() - self.MARGIN) / width, 0.0), 1.0)
+        anchor = start + (end - start) * ratio
+        factor = 0.5 if event.angleDelta().y() > 0 else 2.0
+        span = max((end - start) * factor, self.MIN_PERIOD)
+        # keep the range within [first game, now]
+        first, now = self.first_date or 1.0, time.time()
+        if span >= now - first:
+            self.load()
+        else:
+            new_start = min(max(anchor - span * ratio, first), now - span)
+            self.load((new_start + span, new_start))
+        event.accept()
+
+    def mouseDoubleClickEvent(self, event: QMouseEvent) -> None:
+        self.load()
+
+    def paintEvent(self, event: QtGui.QPaintEvent) -> None:
+        painter = QtGui.QPainter(self)
+        painter.setRenderHint(QtGui.QPainter.RenderHint.Antialiasing)
+        area = QtCore.QRectF(self.rect()).adjusted(self.MARGIN, self.MARGIN / 2, -self.MARGIN, -self.MARGIN)
+        text_color = self.palette().buttonText().color()
+        painter.setPen(text_color)
+        painter.drawRect(area)
+        wpm_dates, wpms = self.series.get("wpm", ((), ()))
+        accuracy_dates, accuracies = self.series.get("accuracy", ((), ()))
+        start, end = self.x_range()
+        max_wpm = max(wpms, default=0) * 1.1 or 1
+        for dates, values, top, color in (
+            (accuracy_dates, accuracies, 1.0, text_color),
+            (wpm_dates, wpms, max_wpm, self.palette().highlight().color()),
+        ):
+            points = QtGui.QPolygonF([
+                QtCore.QPointF(
+                    area.left() + (date - start) / (end - start) * area.width(),
+                    area.bottom() - value / top * area.height(),
+                )
+                for date, value in zip(dates, values)
+            ])
+            painter.setPen(QtGui.QPen(color, 1.5))
+            painter.drawPolyline(points)
+        painter.setPen(text_color)
+        painter.drawText(
+            QtCore.QRectF(area.left(), area.bottom(), area.width(), self.MARGIN),
+            Qt.AlignmentFlag.AlignLeft | Qt.AlignmentFlag.AlignVCenter,
+            datetime.date.fromtimestamp(start).isoformat(),
+        )
+        painter.drawText(
+            QtCore.QRectF(area.left(), area.bottom(), area.width(), self.MARGIN),
+            Qt.AlignmentFlag.AlignRight | Qt.AlignmentFlag.AlignVCenter,
+            datetime.date.fromtimestamp(end).isoformat(),
+        )
+        if self.series:
+            painter.drawText(
+                area.adjusted(4, 2, -4, -2),
+                Qt.AlignmentFlag.AlignLeft | Qt.AlignmentFlag.AlignTop,
+                f"{max_wpm:.0f} wpm / 100% ("
+                + QCoreApplication.translate("QLabel", self.series["bucket"]) + ")",
+            )
+
+
 class UserStatsWindow(PopupWidget):
     def __init__(self, parent: "MainWindow") -> None:
         super().__init__(parent)
-        self.game_data = None
+        self.summary = None
+        # results of the requests in _update; valid until a game is saved
+        self.cache: Dict[Any, Any] = {}
+        self.cache_generation = 0
+        self.cache_period_start: Optional[float] = None
         self.initUI()
 
     def _update(self) -> None:
-        self.game_data = self.get_game_data()
-        
+        period = self.get_period()
+        if period[1] != self.cache_period_start:
+            # a new month started since the results were cached
+            self.invalidate()
+            self.cache_period_start = period[1]
+            self.history_chart.period = None
+        # headline numbers first, then the heavier breakdowns; the worker runs them in order
+        requests = [
+            ("summary", database.get_period_summary, (period,), self.set_summary),
+            ("user stats", database.get_user_stats, (), self.set_user_stats),
+            ("period stats", stats.get_period_stats, (period,), self.set_period_stats),
+            ("error chars", database.get_top_error_chars, (period,), self.set_error_chars),
+            ("confusions", database.get_confusion_totals, (), self.set_confusions),
+            ("slowest ngrams", stats.get_slowest_ngrams, (), self.set_slowest_ngrams),
+        ]
+        wordset_id = self.parent().game.wordset.id
+        if wordset_id is not None:
+            requests += [
+                (("slowest words", wordset_id), database.get_slowest_words, (wordset_id,), self.set_slowest_words),
+                (("error prone words", wordset_id), database.get_error_prone_words, (wordset_id,), self.set_error_prone_words),
+            ]
+        # zooming queries the chart's own periods; only the overview is cached
+        requests.append((
+            "history", stats.get_history_series,
+            (self.history_chart.full_period(), self.history_chart.max_points()),
+            self.set_history,
+        ))
+        for key, function, args, callback in requests:
+            if key in self.cache:
+                callback(self.cache[key])
+            else:
+                self.parent().database_worker.submit(
+                    function, *args,
+                    callback=functools.partial(self._cache_result, self.cache_generation, key, callback),
+                )
+
+    def _cache_result(self, generation: int, key: Any, callback: Callable, result: Any) -> None:
+        if generation == self.cache_generation:
+            self.cache[key] = result
+        callback(result)
+
+    def invalidate(self) -> None:
+        """Forget the cached results (call when a game is saved)."""
+        self.cache.clear()
+        self.cache_generation += 1
+
     def show(self) -> None:
         self._update()
-        # self.wpm_plot = pg.PlotWidget()
-        self.most_inaccurate_letters = [()]
-        self.avg_stats = []
-        self.animal_speed_comparison = None
-        if self.game_data:
-            accs, wpms, dates, incorrect_charss = list(zip(*self.game_data))
-        # self.wpm_plot.plot(dates, wpms)
-            counter = Counter()
-            for chars in incorrect_charss:
-                counter.update(chars)
-            self.most_inaccurate_letters = counter.most_common(10)
-            self.avg_stats = [sum(i)/len(i) for i in [accs, wpms]]
-            self.logger.debug(f"{self.avg_stats}")
-        # TODO
-        if self.avg_stats:
-            self.acc_data.setText(f"{self.avg_stats[0]:.2f}%")
-            self.wpm_data.setText(f"{self.avg_stats[1]:.2f} wpm")
         self.adjustSize()
-        super().show()        
+        super().show()
+
+    def get_period(self) -> Tuple[float, float]:
+        """Return (end, start) of the period covered by the statistics."""
+        return database.get_default_period()
+
+    def set_summary(self, summary: Tuple[int, float, float, float, float]) -> None:
+        self.summary = summary
+        game_count, wpm_mean, _, accuracy_mean, _ = summary
+        self.logger.debug(f"User stats summary: {summary}")
+        if game_count:
+            self.acc_data.setText(f"{accuracy_mean*100:.2f}%")
+            self.wpm_data.setText(f"{wpm_mean:.2f} wpm")
+        self.adjustSize()
+
+    def set_user_stats(self, user_stats: Dict) -> None:
+        self.user_stats = user_stats
+        if user_stats["games"]:
+            self.all_time_data.setText(
+                f"{user_stats['games']} " + QCoreApplication.translate("QLabel", "games")
+                + f", {user_stats['wpm mean']:.0f} wpm, {user_stats['accuracy mean']*100:.0f}%"
+            )
+        self.adjustSize()
+
+    def set_period_stats(self, period_stats: Dict) -> None:
+        self.period_stats = period_stats
+        if period_stats["games"]:
+            _, best_wpm = period_stats["best wpm"]
+            self.best_wpm_data.setText(
+                f"{best_wpm:.0f} wpm (" + QCoreApplication.translate("QLabel", "median")
+                + f" {period_stats['wpm median']:.0f})"
+            )
+            self.trend_data.setText(
+                f"{period_stats['wpm trend per day']:+.2f} wpm/"
+                + QCoreApplication.translate("QLabel", "day")
+            )
+        self.adjustSize()
+
+    def set_confusions(self, confusions: List[Tuple[str, str, int]]) -> None:
+        self.heatmap.set_confusions(confusions)
+        self.adjustSize()
+
+    def set_history(self, series: Dict) -> None:
+        if self.history_chart.is_zoomed():
+            # keep the zoomed range, refreshed with the latest games
+            self.history_chart.load(self.history_chart.period)
+            return
+        self.history_chart.period = series["period"]
+        self.history_chart.set_series(series)
+
+    def set_slowest_ngrams(self, slowest_ngrams: List[Tuple[str, float, int]]) -> None:
+        self.slowest_ngrams = slowest_ngrams
+        self.slowest_ngrams_data.setText(
+            " ".join(f"'{ngram}' ({latency:.0f} ms)" for ngram, latency, _ in slowest_ngrams)
+        )
+        self.adjustSize()
+
+    def set_slowest_words(self, slowest_words: List[Tuple[str, float, int]]) -> None:
+        self.slowest_words = slowest_words
+        self.slowest_words_data.setText(
+            " ".join(f"{word} ({time / 1000:.1f} s)" for word, time, _ in slowest_words)
+        )
+        self.adjustSize()
+
+    def set_error_prone_words(self, error_prone_words: List[Tuple[str, float, int]]) -> None:
+        self.error_prone_words = error_prone_words
+        self.error_prone_words_data.setText(
+            " ".join(f"{word} ({rate*100:.0f}%)" for word, rate, _ in error_prone_words)
+        )
+        self.adjustSize()
+
+    def set_error_chars(self, most_inaccurate_letters: List[Tuple[str, int]]) -> None:
+        self.most_inaccurate_letters = most_inaccurate_letters
+        self.incorrect_chars_data.setText(
+            " ".join(f"'{char}' ({count})" for char, count in most_inaccurate_letters[:5])
+        )
+        self.adjustSize()
 
     def initUI(self) -> None:
         self.setLayout(QGridLayout())
@@ -638,26 +943,224 @@ class UserStatsWindow(PopupWidget):
         self.title.setProperty("class", "heading")
         self.acc_label = QLabel(QCoreApplication.translate("QLabel", "Average accuracy"))
         self.wpm_label = QLabel(QCoreApplication.translate("QLabel", "Average speed"))
+        self.incorrect_chars_label = QLabel(
+            QCoreApplication.translate("QLabel", "Most frequent incorrect characters")
+        )
         self.acc_data = QLabel()
         self.wpm_data = QLabel()
+        self.incorrect_chars_data = QLabel()
+        self.best_wpm_label = QLabel(QCoreApplication.translate("QLabel", "Best speed"))
+        self.best_wpm_data = QLabel()
+        self.trend_label = QLabel(QCoreApplication.translate("QLabel", "Speed trend"))
+        self.trend_data = QLabel()
+        self.all_time_label = QLabel(QCoreApplication.translate("QLabel", "All time"))
+        self.all_time_data = QLabel()
+        self.slowest_ngrams_label = QLabel(
+            QCoreApplication.translate("QLabel", "Slowest letter sequences")
+        )
+        self.slowest_ngrams_data = QLabel()
+        self.slowest_ngrams: List[Tuple[str, float, int]] = []
+        self.slowest_words_label = QLabel(QCoreApplication.translate("QLabel", "Slowest words"))
+        self.slowest_words_data = QLabel()
+        self.slowest_words: List[Tuple[str, float, int]] = []
+        self.error_prone_words_label = QLabel(
+            QCoreApplication.translate("QLabel", "Most often mistyped words")
+        )
+        self.error_prone_words_data = QLabel()
+        self.error_prone_words: List[Tuple[str, float, int]] = []
+        self.heatmap = KeyboardHeatmap()
+        self.history_chart = HistoryChart(self.parent().database_worker)
+        self.most_inaccurate_letters: List[Tuple[str, int]] = []
+        self.period_stats: Dict = {}
+        self.user_stats: Dict = {}
+        self.history_window = GameHistoryWindow(self.parent())
+        self.history_button = QPushButton()
+        self.history_button.setCursor(QCursor(Qt.CursorShape.PointingHandCursor))
+        self.history_button.clicked.connect(lambda: self.parent().show_popup(self.history_window))
         for i, widgets in enumerate([
             (self.title, ),
             (self.acc_label, self.acc_data),
-            (self.wpm_label, self.wpm_data)
+            (self.wpm_label, self.wpm_data),
+            (self.best_wpm_label, self.best_wpm_data),
+            (self.trend_label, self.trend_data),
+            (self.incorrect_chars_label, self.incorrect_chars_data),
+            (self.slowest_ngrams_label, self.slowest_ngrams_data),
+            (self.slowest_words_label, self.slowest_words_data),
+            (self.error_prone_words_label, self.error_prone_words_data),
+            (self.all_time_label, self.all_time_data),
+            (self.history_button, )
         ]):
             for j, widget in enumerate(widgets):
                 widget.setMaximumWidth(200)
                 self.layout().addWidget(widget, i, j, Qt.AlignmentFlag.AlignLeft)
+        # all-time error rates per key, below the period statistics
+        self.layout().addWidget(self.heatmap, i + 1, 0, 1, 2, Qt.AlignmentFlag.AlignCenter)
+        self.layout().addWidget(self.history_chart, i + 2, 0, 1, 2)
         self.retranslateUI()
         self.layout().setSpacing(10)
 
-    def get_game_data(self) -> Optional[List[Tuple[float, float, float, str]]]:
-        return database.get_game_data()
-
     def retranslateUI(self) -> None:
         self.title.setText(
             QCoreApplication.translate("QLabel", "User statistics")
         )
+        self.history_button.setText(
+            QCoreApplication.translate("QPushButton", "History")
+        )
+
+
+class GameHistoryModel(QtCore.QAbstractTableModel):
+    """Finished games fetched page by page from the database as the view scrolls."""
+
+    # column -> sort key understood by database.get_game_history
+    SORT_KEYS = {0: "created_at", 3: "wpm", 4: "accuracy"}
+
+    def __init__(self, database_worker: worker.DatabaseWorker, parent: QtCore.QObject = None) -> None:
+        super().__init__(parent)
+        self.logger = logging.getLogger(__name__)
+        self.database_worker = database_worker
+        self.rows: List[Tuple] = []
+        self.sort_key = "created_at"
+        self.descending = True
+        self.filters: Dict = {}
+        self._exhausted = False
+        self._pending = False
+        self._generation = 0
+
+    def headers(self) -> List[str]:
+        return [
+            QCoreApplication.translate("QTableView", "Date"),
+            QCoreApplication.translate("QTableView", "Mode"),
+            QCoreApplication.translate("QTableView", "Wordset"),
+            QCoreApplication.translate("QTableView", "Speed"),
+            QCoreApplication.translate("QTableView", "Accuracy"),
+            QCoreApplication.translate("QTableView", "Time"),
+            QCoreApplication.translate("QTableView", "Errors"),
+        ]
+
+    def rowCount(self, parent: QtCore.QModelIndex = QtCore.QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(self.rows)
+
+    def columnCount(self, parent: QtCore.QModelIndex = QtCore.QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(self.headers())
+
+    def data(self, index: QtCore.QModelIndex, role: int = Qt.ItemDataRole.DisplayRole):
+        if not index.isValid() or role != Qt.ItemDataRole.DisplayRole:
+            return None
+        _, created_at, mode, wordset_name, wpm, accuracy, elapsed, error_count = self.rows[index.row()]
+        return [
+            datetime.datetime.fromtimestamp(created_at).strftime("%Y-%m-%d %H:%M"),
+            mode,
+            wordset_name,
+            f"{wpm:.0f} wpm" if wpm is not None else "-",
+            f"{accuracy*100:.0f}%" if accuracy is not None else "-",
+            f"{elapsed:.0f} s" if elapsed is not None else "-",
+            str(error_count),
+        ][index.column()]
+
+    def headerData(self, section: int, orientation: Qt.Orientation, role: int = Qt.ItemDataRole.DisplayRole):
+        if orientation == Qt.Orientation.Horizontal and role == Qt.ItemDataRole.DisplayRole:
+            return self.headers()[section]
+        return None
+
+    def canFetchMore(self, parent: QtCore.QModelIndex = QtCore.QModelIndex()) -> bool:
+        return not parent.isValid() and not self._exhausted and not self._pending
+
+    def fetchMore(self, parent: QtCore.QModelIndex = QtCore.QModelIndex()) -> None:
+        if not self.canFetchMore(parent):
+            return
+        self._pending = True
+        generation = self._generation
+        self.database_worker.submit(
+            database.get_game_history,
+            self.rows[-1] if self.rows else None,
+            sort=self.sort_key,
+            descending=self.descending,
+            **self.filters,
+            callback=lambda page: self._append_page(generation, page),
+            errback=lambda error: self._page_failed(generation, error),
+        )
+
+    def _page_failed(self, generation: int, error: BaseException) -> None:
+        if generation == self._generation:
+            # allow the view to ask for the page again
+            self._pending = False
+        utils.display_error("Database Error", str(error), critical=False)
+
+    def _append_page(self, generation: int, page: List[Tuple]) -> None:
+        if generation != self._generation:
+            # the model was reset while the page was loading
+            return
+        self._pending = False
+        self._exhausted = len(page) < config.HISTORY_PAGE_SIZE
+        if not page:
+            return
+        self.beginInsertRows(QtCore.QModelIndex(), len(self.rows), len(self.rows) + len(page) - 1)
+        self.rows.extend(page)
+        self.endInsertRows()
+
+    def sort(self, column: int, order: Qt.SortOrder = Qt.SortOrder.AscendingOrder) -> None:
+        if column not in self.SORT_KEYS:
+            return
+        self.sort_key = self.SORT_KEYS[column]
+        self.descending = order == Qt.SortOrder.DescendingOrder
+        self.refresh()
+
+    def set_filters(self, **filters) -> None:
+        """Show only games matching filters (see database.get_game_history)."""
+        self.filters = {key: value for key, value in filters.items() if value is not None}
+        self.refresh()
+
+    def refresh(self) -> None:
+        """Drop loaded rows and fetch the first page again."""
+        self.beginResetModel()
+        self.rows = []
+        self._exhausted = False
+        self._pending = False
+        self._generation += 1
+        self.endResetModel()
+        self.fetchMore()
+
+
+class GameHistoryWindow(PopupWidget):
+    def __init__(self, parent: "MainWindow") -> None:
+        super().__init__(parent)
+        self.initUI()
+
+    def show(self) -> None:
+        self.model.refresh()
+        super().show()
+
+    def initUI(self) -> None:
+        self.setLayout(QVBoxLayout())
+        self.title = QLabel()
+        self.title.setProperty("class", "heading")
+        self.mode_box = QtWidgets.QComboBox()
+        self.mode_box.addItem("", None)
+        for mode in models.Mode:
+            self.mode_box.addItem(mode.value, mode.value)
+        self.mode_box.currentIndexChanged.connect(
+            lambda: self.model.set_filters(mode=self.mode_box.currentData())
+        )
+        self.model = GameHistoryModel(self.parent().database_worker, self)
+        self.view = QtWidgets.QTableView()
+        self.view.setModel(self.model)
+        self.view.horizontalHeader().setSortIndicator(0, Qt.SortOrder.DescendingOrder)
+        self.view.setSortingEnabled(True)
+        self.view.verticalHeader().hide()
+        self.view.setMinimumWidth(600)
+        self.view.setMaximumHeight(int(self.parent().height()*0.6))
+        for widget in [self.title, self.mode_box, self.view]:
+            self.layout().addWidget(widget)
+        self.layout().setSpacing(10)
+        self.retranslateUI()
+
+    def retranslateUI(self) -> None:
+        self.title.setText(
+            QCoreApplication.translate("QLabel", "Game history")
+        )
+        self.mode_box.setItemText(
+            0, QCoreApplication.translate("QComboBox", "All modes")
+        )
 
 
 class GameStatsWindow(PopupWidget):
@@ -938,16 +1441,33 @@ class MainWindow(QWidget):
         self.timer.timeout.connect(self.finish_game)
         self.update_timer = QtCore.QTimer()
         self.update_timer.timeout.connect(self.update_timer_label)
+        self.autosave_timer = QtCore.QTimer()
+        self.autosave_timer.timeout.connect(self.autosave_game)
+        self.maintenance_timer = QtCore.QTimer()
+        self.maintenance_timer.setSingleShot(True)
+        self.maintenance_timer.timeout.connect(self.run_maintenance)
+        self._last_checkpoint: Optional[Tuple] = None
+        # an interrupted game is waiting for the user to resume, save or discard it
+        self._resume_pending = False
         self.icon = icon
         self.timer_id = 0
+        self.database_worker = worker.get_database_worker()
         self.settings = QSettings()
+        # an empty game until init_game has loaded the wordset
         self.game = TypingGame(
-            wordset_id=self.settings.value("game/options/wordset/id"),
             duration=self.settings.value("game/options/duration"),
-            mode=self.settings.value("game/options/mode")
+            mode=self.settings.value("game/options/mode"),
+            wordset=models.Wordset("", "", 0, ()),
         )
         self.remaining_time = self.game.duration
         self.init_window()
+        self.init_game()
+        self.autosave_timer.start(config.AUTOSAVE_INTERVAL)
+        # maintenance waits until the user has stopped typing for a while
+        self.words_input.textEdited.connect(
+            lambda: self.maintenance_timer.start(config.MAINTENANCE_IDLE_DELAY)
+        )
+        self.maintenance_timer.start(config.MAINTENANCE_IDLE_DELAY)
 
     def init_window(self) -> None:
         """Initialize main window GUI"""
@@ -1135,7 +1655,16 @@ class MainWindow(QWidget):
         self.remaining_time = 0
         self.button_pause.hide()
 
-        self.game.finish_or_pause(save=False)
+        self.game.finish_or_pause()
+        if self.game.start_time:
+            if self.game.duration < 0:
+                # unlimited games end with Finish; keep their results
+                self.database_worker.submit(database.save_game, self.game.get_state())
+                self.stats_popup.invalidate()
+                self.review_words()
+            else:
+                # discard checkpoints of an abandoned timed game
+                self.database_worker.submit(database.delete_game, self.game.start_time)
         self.words_to_type_label.formattedCharList.clear()
         self.words_to_type_label.line_pos = 0
         self.words_to_type_label.min_char_pos = 0
@@ -1215,19 +1744,179 @@ class MainWindow(QWidget):
                 options[option] = settings.value(f"game/options/{option}")
                 self.logger.debug(f"Retrieved '{option}' from settings: {val}")
         self.logger.debug(f"Received wordset: {wordset}")
+        if wordset is None:
+            # the game is built once its wordset has been read on the database thread
+            self.database_worker.submit(
+                models.Wordset.load_default,
+                options["wordset/id"],
+                options["wordset/name"],
+                callback=lambda wordset: self._new_game(wordset, options),
+                errback=self._wordset_failed,
+            )
+            return None
+        self._new_game(wordset, options)
+
+    def _wordset_failed(self, error: BaseException) -> None:
+        self.logger.error(f"Unable to load a wordset: {error!r}")
+        # without any game to fall back on there is nothing to play
+        utils.display_error("Database Error", str(error), critical=not self.game.text)
 
+    def _new_game(self, wordset: models.Wordset, options: Dict) -> None:
         self.game = TypingGame(
-            wordset_id=options["wordset/id"] if not wordset else None, 
-            mode=options["mode"], 
-            duration=options["duration"], 
+            mode=options["mode"],
+            duration=options["duration"],
             seed=options["seed"],
             wordset=wordset)
         self.words_to_type_label.min_char_pos = self.game.pos
         self.logger.debug(f"Setting starting label position {self.game.pos}")
         self.words_to_type_label.setCharList()
         self.remaining_time = self.game.duration
+        if self.game.mode == models.Mode.PRACTICE and self.game.wordset.id is not None:
+            game = self.game
+            self.database_worker.submit(
+                models.ReviewScheduler.load_due_words,
+                game.wordset.id,
+                round(100 * game.practice_ratio),
+                callback=lambda words: self._set_review_words(game, words),
+            )
+        elif self.game.mode == models.Mode.ADAPTIVE and self.game.wordset.id is not None:
+            game = self.game
+            self.database_worker.submit(
+                database.get_word_speed,
+                game.wordset.id,
+                callback=lambda speed: self._set_baseline_wpm(game, speed),
+            )
+        self.set_focus()
+
+    def _set_baseline_wpm(self, game: TypingGame, speed: Optional[float]) -> None:
+        if speed is not None:
+            game.baseline_wpm = speed
+
+    def _set_review_words(self, game: TypingGame, words: List[str]) -> None:
+        if game is self.game and game.set_review_words(words):
+            self.words_to_type_label.setCharList()
+
+    def review_words(self) -> None:
+        """Reschedule the words typed in the current game on the database thread."""
+        if self.game.wordset.id is None or not self.game.word_timings.words:
+            return None
+        self.database_worker.submit(
+            models.ReviewScheduler.record_game,
+            self.game.wordset.id,
+            tuple(self.game.word_timings.items()),
+        )
+
+    def resume_game(self, game: Optional[TypingGame]) -> None:
+        """Continue a game restored from its last checkpoint."""
+        if game is None:
+            self.logger.warning("Unable to resume game: could not load checkpoint")
+            return None
+        self.game = game
+        color = self.words_input.palette().buttonText().color().name()
+        self.words_to_type_label.formattedCharList = [
+            self.words_input.set_html_color(char, color)
+            for char in self.game.text[: self.game.pos]
+        ]
+        self.words_to_type_label.line_pos = 0
+        self.words_to_type_label.min_char_pos = self.game.pos
+        self.words_to_type_label.setCharList()
+        if self.game.duration > 0:
+            self.remaining_time = max(int(self.game.duration - self.game.elapsed * 1000), 0)
+        else:
+            self.remaining_time = self.game.duration
+        self._last_checkpoint = None
+        self.logger.info(f"Resumed game {self.game}")
         self.set_focus()
 
+    def check_unfinished_game(self) -> None:
+        """Offer to resume a game interrupted by a crash (see autosave_game)."""
+        self.database_worker.submit(
+            database.get_unfinished_game, callback=self._prompt_resume
+        )
+
+    def _prompt_resume(self, unfinished: Optional[Tuple[int, float]]) -> None:
+        if unfinished is None:
+            return None
+        id, created_at = unfinished
+        started = QtCore.QDateTime.fromSecsSinceEpoch(int(created_at)).toString()
+        prompt = QtWidgets.QMessageBox(self)
+        prompt.setWindowTitle(
+            QCoreApplication.translate("QMessageBox", "Unfinished game")
+        )
+        prompt.setText(
+            QCoreApplication.translate(
+                "QMessageBox", "A game started on {} was interrupted. Resume it?"
+            ).format(started)
+        )
+        buttons = QtWidgets.QMessageBox.StandardButton
+        prompt.setStandardButtons(buttons.Yes | buttons.Save | buttons.Discard)
+        prompt.setDefaultButton(buttons.Yes)
+        self._resume_pending = True
+        answer = prompt.exec()
+        self._resume_pending = False
+        if answer == buttons.Yes:
+            self.database_worker.submit(
+                TypingGame.from_database, id, callback=self.resume_game
+            )
+            self.database_worker.submit(database.delete_checkpoints, created_at)
+        elif answer == buttons.Save:
+            self.database_worker.submit(database.finish_game, id)
+            self.database_worker.submit(database.delete_checkpoints)
+            self.stats_popup.invalidate()
+        else:
+            self.database_worker.submit(database.delete_checkpoints)
+
+    def autosave_game(self) -> None:
+        """Checkpoint the current game on the database thread."""
+        if not self.game.start_time:
+            return None
+        state = self.game.get_checkpoint()
+        if state.row == self._last_checkpoint:
+            return None
+        self.database_worker.submit(
+            database.save_game,
+            state,
+            callback=lambda _: self._checkpoint_saved(state.row),
+            errback=self._checkpoint_failed,
+        )
+
+    def _checkpoint_saved(self, row: Tuple) -> None:
+        self._last_checkpoint = row
+
+    def _checkpoint_failed(self, error: BaseException) -> None:
+        # the next autosave tick writes the checkpoint again
+        self.logger.error(f"Unable to checkpoint the game: {error!r}")
+
+    def run_maintenance(self) -> None:
+        """Apply history retention and compact the database on the database thread."""
+        paused = self.game.elapsed > 0 and not self.game.is_finished()
+        if self.game.in_progress or paused or self._resume_pending:
+            self.maintenance_timer.start(config.MAINTENANCE_IDLE_DELAY)
+            return None
+        settings = QSettings()
+        analyze = time.time() - float(
+            settings.value("database/last_analyzed", 0)
+        ) > config.ANALYZE_INTERVAL
+        # history is only removed once the user picks a retention period
+        retention_days = settings.value("database/retention_days", config.HISTORY_RETENTION_DAYS)
+        try:
+            retention_days = int(retention_days) if retention_days else None
+        except ValueError:
+            self.logger.warning(f"Ignoring invalid retention period {retention_days!r}")
+            retention_days = None
+        self.database_worker.submit(
+            database.run_maintenance, retention_days, analyze,
+            callback=functools.partial(self._maintenance_done, analyze),
+            errback=self._maintenance_failed,
+        )
+
+    def _maintenance_done(self, analyzed: bool, _: None) -> None:
+        if analyzed:
+            QSettings().setValue("database/last_analyzed", time.time())
+
+    def _maintenance_failed(self, error: BaseException) -> None:
+        self.logger.error(f"Database maintenance failed: {error!r}")
+
     def start_game(self) -> None:
         for button in [
             self.button_about,
@@ -1242,8 +1931,8 @@ class MainWindow(QWidget):
         # self.timer_label.show()
 
         if self.game.duration != -1:
-            self.logger.debug(f"Setting timer for {self.game.duration//1000} s")
-            self.timer.start(self.game.duration)
+            self.logger.debug(f"Setting timer for {self.remaining_time//1000} s")
+            self.timer.start(self.remaining_time)
             self.update_timer.start(100)
         else:
             # pass
@@ -1280,8 +1969,12 @@ class MainWindow(QWidget):
         self.remaining_time = 0
         self.button_pause.hide()
 
-        if not self.game.finish_or_pause(save=save):
+        if not self.game.finish_or_pause():
             return None
+        if save:
+            self.database_worker.submit(database.save_game, self.game.get_state())
+            self.stats_popup.invalidate()
+            self.review_words()
         self.words_to_type_label.formattedCharList.clear()
         self.words_to_type_label.line_pos = 0
         self.words_to_type_label.min_char_pos = 0
@@ -1336,4 +2029,5 @@ class MainWindow(QWidget):
         
 
     def close(self) -> None:
+        worker.shutdown_database_worker()
         sys.exit()
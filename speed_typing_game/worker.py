@@ -0,0 +1,94 @@
+"""
+Run database requests off the GUI thread.
+
+Classes:
+
+    DatabaseWorker(QObject): executes requests on a single database thread
+
+Functions:
+
+    get_database_worker() -> DatabaseWorker
+    shutdown_database_worker() -> None
+
+"""
+
+import logging
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+from PyQt6.QtCore import QObject, pyqtSignal
+
+from speed_typing_game import database, utils
+
+logger = logging.getLogger(__name__)
+
+
+class DatabaseWorker(QObject):
+    """Execute database requests one at a time on a dedicated thread.
+
+    Requests are queued in submission order and return a Future. An optional
+    callback receives the result on the thread that owns the worker (the GUI
+    thread), so it may safely touch widgets. A failed request is reported to
+    the user, unless an errback is given: it then receives the exception on
+    the same thread instead.
+    """
+
+    _done = pyqtSignal(object, object, object)
+
+    def __init__(self, parent: QObject = None) -> None:
+        super().__init__(parent)
+        self.logger = logging.getLogger(__name__)
+        self._executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="database"
+        )
+        self._done.connect(self._dispatch)
+
+    def submit(
+        self,
+        fn: Callable,
+        *args: Any,
+        callback: Optional[Callable[[Any], None]] = None,
+        errback: Optional[Callable[[BaseException], None]] = None,
+        **kwargs: Any,
+    ) -> Future:
+        """Queue a call to fn on the database thread."""
+        future = self._executor.submit(fn, *args, **kwargs)
+        future.add_done_callback(lambda f: self._done.emit(f, callback, errback))
+        return future
+
+    def _dispatch(
+        self, future: Future, callback: Optional[Callable], errback: Optional[Callable]
+    ) -> None:
+        error = future.exception()
+        if error is not None:
+            self.logger.error(f"Database request failed: {error!r}")
+            if errback is not None:
+                errback(error)
+            else:
+                utils.display_error("Database Error", str(error), critical=False)
+        elif callback is not None:
+            callback(future.result())
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Finish queued requests and stop the database thread."""
+        self._executor.submit(database.close_connection)
+        self._executor.shutdown(wait=wait)
+
+
+_worker: Optional[DatabaseWorker] = None
+
+
+def get_database_worker() -> DatabaseWorker:
+    """Return the application-wide database worker (create it on first use)."""
+    global _worker
+    if _worker is None:
+        _worker = DatabaseWorker()
+    return _worker
+
+
+def shutdown_database_worker() -> None:
+    """Flush pending requests of the application-wide database worker."""
+    global _worker
+    if _worker is not None:
+        _worker.shutdown()
+        _worker = None
@@ -1,115 +1,478 @@
+import datetime
+import sqlite3
+import threading
+import time
+
 import pytest
-from PyQt6.QtSql import QSqlDatabase, QSqlQuery
 
 from .context import speed_typing_game
+from speed_typing_game import database, models
 
 
 @pytest.fixture(scope="module")
-def session():
-    con = QSqlDatabase.addDatabase("QSQLITE", "test_con")
-    con.setDatabaseName("test_db")
-    assert con.open()
-    yield con
-    con.close()
+def db_path(tmp_path_factory):
+    path = str(tmp_path_factory.mktemp("db") / "test_db.sqlite")
+    assert database.init_database(path)
+    yield path
+    database.close_connection()
 
 
 @pytest.fixture(scope="module")
-def setup_db(con):
-    db = con.database()
-    createQuery = QSqlQuery(db)
-    assert createQuery.exec(
-        """
-            CREATE TABLE wordsets (
-                id INTEGER PRIMARY KEY AUTOINCREMENT UNIQUE NOT NULL,
-                name VARCHAR(40) NOT NULL,
-                language_code VARCHAR(6) NOT NULL,
-                difficulty INTEGER
-            )
-            """
+def setup_db(db_path):
+    wordset = models.Wordset("test_name", "en", 1, ("test_word", "other_word"))
+    assert database.add_wordsets_to_database([wordset])
+    yield database.get_available_wordsets_ids()[-1]
+
+
+def test_get_wordset(setup_db):
+    wordset = models.Wordset.from_database(setup_db)
+    assert wordset.name == "test_name"
+    assert sorted(wordset.words) == ["other_word", "test_word"]
+
+
+def test_load_default_wordset(setup_db):
+    assert models.Wordset.load_default(setup_db).id == setup_db
+    assert models.Wordset.load_default(name="test_name").id == setup_db
+    assert models.Wordset.load_default().id == database.get_available_wordsets_ids()[0]
+    with pytest.raises(LookupError):
+        models.Wordset.load_default(10**6)
+
+
+def test_add_wordsets_is_atomic(setup_db):
+    ids = database.get_available_wordsets_ids()
+    valid = models.Wordset("valid", "en", 0, ("a", "b"))
+    duplicated = models.Wordset("duplicated", "en", 0, ("c", "c"))
+    with pytest.raises(sqlite3.IntegrityError):
+        database.add_wordsets_to_database([valid, duplicated])
+    assert database.get_available_wordsets_ids() == ids
+    assert valid.id is None
+
+    assert database.add_wordsets_to_database([valid])
+    assert database.get_available_wordsets_ids() == ids + [valid.id]
+
+
+def test_save_game_round_trip(setup_db):
+    wordset = models.Wordset.from_database(setup_db)
+    game = models.TypingGame(
+        seed=42, mode=models.Mode.CHALLENGE, wordset=wordset,
+        pos=10, incorrect_chars="ab", elapsed=5, created_at=1000.5,
+        last_updated=1005.5
     )
-    assert createQuery.exec(
-        """
-            CREATE TABLE words (
-                id INTEGER PRIMARY KEY AUTOINCREMENT UNIQUE NOT NULL,
-                content VARCHAR(50) NOT NULL,
-                wordset_id INTEGER NOT NULL,
-                FOREIGN KEY (wordset_id) 
-                    REFERENCES wordsets(id)
-                    ON DELETE CASCADE,
-                UNIQUE(content, wordset_id)
-            )
-            """
+    assert game.save()
+    first_id = game.id
+    game.pos = 20
+    assert game.save()
+    assert game.id == first_id
+
+    restored = models.TypingGame.from_database(created_at=1000.5)
+    assert restored.id == first_id
+    assert restored.pos == 20
+    assert restored.incorrect_chars == game.incorrect_chars
+    assert sorted(database.get_top_error_chars((2000, 0))) == [("a", 1), ("b", 1)]
+
+
+def test_checkpoint_and_resume(setup_db):
+    wordset = models.Wordset.from_database(setup_db)
+    game = models.TypingGame(
+        seed=7, mode=models.Mode.CHALLENGE, wordset=wordset, duration=60,
+        pos=5, elapsed=12, created_at=2000.0, last_updated=2012.0
     )
-    assert createQuery.exec(
-        """
-            CREATE TABLE games (
-                id INTEGER PRIMARY KEY AUTOINCREMENT UNIQUE NOT NULL,
-                mode VARCHAR(10),
-                wordset_id INTEGER,
-                seed INTEGER NOT NULL,
-                pos INTEGER NOT NULL,
-                incorrect_chars TEXT,
-                elapsed REAL,
-                created_at REAL NOT NULL UNIQUE,
-                FOREIGN KEY (wordset_id)
-                    REFERENCES wordsets (id)
-                    ON DELETE SET NULL
-            );
-            """
+    finished_games = len(database.get_game_data((3000, 0)))
+    assert game.save(finished=False)
+    assert database.get_unfinished_game() == (game.id, 2000.0)
+    assert len(database.get_game_data((3000, 0))) == finished_games
+
+    restored = models.TypingGame.from_database(game.id)
+    assert restored.text == game.text
+    assert (restored.pos, restored.elapsed, restored.duration) == (5, 12, 60 * 1000)
+
+    assert database.finish_game(game.id)
+    assert database.get_unfinished_game() is None
+    assert len(database.get_game_data((3000, 0))) == finished_games + 1
+
+
+def test_resume_extended_game(setup_db):
+    wordset = models.Wordset.from_database(setup_db)
+    game = models.TypingGame(
+        seed=8, mode=models.Mode.ZEN, wordset=wordset, created_at=2500.0, last_updated=2600.0
     )
-    assert createQuery.prepare(
-        """
-        INSERT INTO wordsets (
-            name,
-            language_code,
-            difficulty
-        )
-        VALUES (?, ?, ?)
-        """
+    while len(game.text) <= 3000:
+        game.extend_text()
+    game.pos = 3000
+    assert game.save(finished=False)
+
+    restored = models.TypingGame.from_database(game.id)
+    assert len(restored.text) > restored.pos == 3000
+    assert restored.text[:3001] == game.text[:3001]
+    assert database.delete_game(2500.0)
+
+
+def test_resume_adaptive_game_text(setup_db):
+    wordset = models.Wordset.from_database(setup_db)
+    game = models.TypingGame(
+        seed=9, mode=models.Mode.ADAPTIVE, wordset=wordset, created_at=2700.0, last_updated=2710.0
     )
-    for val in ["test_name", "en", 1]:
-        createQuery.addBindValue(val)
-    assert createQuery.exec()
-    fetchIdQuery = QSqlQuery(db)
-    assert fetchIdQuery.exec(
-        """
-            SELECT seq FROM sqlite_sequence WHERE name = 'wordsets'
-        """
+    game.text = game.text[:30] + " re-sampled words"
+    game.pos = 35
+    assert game.save(finished=False)
+    assert models.TypingGame.from_database(game.id).text == game.text
+
+    assert database.finish_game(game.id)
+    assert database.get_game_text(game.id) is None
+
+
+def test_checkpoint_keeps_error_count(setup_db):
+    wordset = models.Wordset.from_database(setup_db)
+    game = models.TypingGame(
+        seed=4, mode=models.Mode.CHALLENGE, wordset=wordset, pos=12,
+        incorrect_chars="abb", created_at=2800.0, last_updated=2810.0
     )
-    fetchIdQuery.next()
-    wordset_id = fetchIdQuery.value(0)
-    createQuery.prepare(
-        """
-        INSERT INTO words (
-            content,
-            wordset_id
+    game.record_keystroke("x", 1.0)
+    id = database.save_game(game.get_checkpoint())
+    assert database.get_game_confusions(id) == []
+
+    resumed = models.TypingGame.from_database(id)
+    assert resumed.get_error_count() == 3
+    assert resumed.get_accuracy() == game.get_accuracy()
+    assert resumed.get_word_count() == game.get_word_count()
+
+
+def test_new_checkpoint_replaces_older_ones(setup_db):
+    wordset = models.Wordset.from_database(setup_db)
+    for created_at in (2900.0, 2950.0):
+        game = models.TypingGame(
+            seed=5, mode=models.Mode.CHALLENGE, wordset=wordset, pos=4,
+            created_at=created_at, last_updated=created_at + 5
         )
-        VALUES (?, ?, ?)
-        """
+        id = database.save_game(game.get_checkpoint())
+    assert database.save_game(game.get_checkpoint()) == id
+    con = database.get_connection()
+    assert con.execute("SELECT id FROM games WHERE finished = 0").fetchall() == [(id,)]
+
+    assert database.delete_checkpoints()
+    assert database.get_unfinished_game() is None
+
+
+def test_daily_stats_follow_games(setup_db):
+    wordset = models.Wordset.from_database(setup_db)
+    game = models.TypingGame(
+        seed=3, mode=models.Mode.CHALLENGE, wordset=wordset,
+        pos=8, incorrect_chars="a", elapsed=20, created_at=86400.0 * 400,
+        last_updated=86400.0 * 400 + 20
     )
-    for val in ["test_word", wordset_id]:
-        createQuery.addBindValue(val)
-    assert createQuery.exec()
+    period = (86400.0 * 401, 86400.0 * 399)
+    assert game.save(finished=False)
+    assert database.get_period_summary(period)[0] == 0
+    assert game.save()
+    game.pos, game.elapsed = 16, 30
+    assert game.save()
 
-    createQuery.prepare(
+    con = database.get_connection()
+    expected = con.execute(
         """
-        INSERT INTO games (
-            mode,
-            wordset_id,
-            seed,
-            pos,
-            incorrect_chars,
-            elapsed,
-            created_at
+        SELECT COUNT(*), AVG(wpm), AVG(accuracy) FROM games
+        WHERE finished = 1 AND created_at BETWEEN ? AND ?
+        """, (period[1], period[0])
+    ).fetchone()
+    game_count, wpm_mean, wpm_std, accuracy_mean, accuracy_std = (
+        database.get_period_summary(period)
+    )
+    assert game_count == expected[0] == 1
+    assert wpm_mean == pytest.approx(expected[1])
+    assert accuracy_mean == pytest.approx(expected[2]) == pytest.approx(1 - 1 / 16)
+    assert wpm_std == pytest.approx(0) and accuracy_std == pytest.approx(0)
+
+
+def test_periods_follow_creation_day(setup_db):
+    wordset = models.Wordset.from_database(setup_db)
+    midnight = time.mktime(datetime.date(1971, 6, 2).timetuple())
+    # started before midnight, finished on the next day
+    game = models.TypingGame(
+        seed=6, mode=models.Mode.CHALLENGE, wordset=wordset,
+        pos=10, incorrect_chars="~", elapsed=30, created_at=midnight - 10,
+        last_updated=midnight + 20
+    )
+    assert game.save()
+    period = (midnight - 1, midnight - 86400)
+    assert database.get_period_summary(period)[0] == 1
+    assert [row[2] for row in database.get_game_data(period)] == [midnight - 10]
+    assert database.get_game_series(period)[0] == [midnight - 10]
+    assert ("~", 1) in database.get_top_error_chars(period, 100)
+
+    con = database.get_connection()
+    con.execute(database.archiveGameErrorsQueryString, (midnight,))
+    assert con.execute(
+        "SELECT day FROM archived_errors WHERE char = '~'"
+    ).fetchall() == [("1971-06-01",)]
+    con.rollback()
+
+
+@pytest.mark.parametrize("sort", ["created_at", "wpm", "accuracy"])
+@pytest.mark.parametrize("descending", [True, False])
+def test_game_history_pages(setup_db, sort, descending):
+    wordset = models.Wordset.from_database(setup_db)
+    if not database.get_game_history(period=(5100, 5000)):
+        for i in range(7):
+            models.TypingGame(
+                seed=i, mode=models.Mode.CHALLENGE, wordset=wordset,
+                pos=10 + i, incorrect_chars="a" * (i % 3), elapsed=30 - i,
+                created_at=5000.0 + i, last_updated=5030.0
+            ).save()
+    filters = dict(sort=sort, descending=descending, period=(5100, 5000))
+    expected = database.get_game_history(limit=100, **filters)
+    pages, after = [], None
+    while True:
+        page = database.get_game_history(after, limit=3, **filters)
+        if not page:
+            break
+        pages.extend(page)
+        after = page[-1]
+    assert len(expected) == 7
+    assert pages == expected
+    index = database.HISTORY_SORT_KEYS[sort][1]
+    keys = [(row[index], row[1]) for row in expected]
+    assert keys == sorted(keys, reverse=descending)
+    assert database.get_game_history(mode=models.Mode.ZEN, **filters) == []
+
+
+def test_ingest_games(setup_db):
+    records = [
+        {"created_at": 7000.0 + i, "seed": i, "pos": 10, "elapsed": 5.0,
+         "wordset_id": setup_db, "errors": {"x": 1}}
+        for i in range(5)
+    ]
+    invalid = [
+        {"created_at": 7100.0, "pos": 10},
+        {"created_at": 7101.0, "seed": 1, "pos": -1},
+        {"created_at": 7102.0, "seed": 1, "pos": 1, "errors": {"xy": 1}},
+        {"created_at": 7103.0, "seed": 1, "pos": 1, "wordset_id": 10**6},
+    ]
+    assert database.ingest_games(records + invalid, chunk_size=2) == (5, 0, 4)
+    records[0]["pos"] = 20
+    assert database.ingest_games(records[:1] + [dict(records[1])] * 2) == (0, 3, 0)
+    game = database.get_game(created_at=7000.0)
+    assert (game[3], game[4], game[5]) == (0, 20, {"x": 1})
+
+
+def test_ingest_rejected_record_leaves_nothing(setup_db, monkeypatch):
+    record = {"created_at": 7200.0, "seed": 0, "pos": 10, "elapsed": 5.0,
+              "wordset_id": setup_db, "errors": {"x": 1},
+              "confusions": [["a", "b", 1], ["a", "b", 2]]}
+    assert database.ingest_games([record]) == (0, 0, 1)
+    # a record the database rejects after the game row has been written
+    monkeypatch.setattr(database, "_validate_game_record", lambda record: None)
+    daily_stats = database.get_bucketed_stats("day", (8000, 7000))
+    assert database.ingest_games([record]) == (0, 0, 1)
+    assert database.get_game(created_at=7200.0) is None
+    assert database.get_bucketed_stats("day", (8000, 7000)) == daily_stats
+    assert database.verify_user_stats() == {}
+
+
+def test_user_stats_accumulate(setup_db):
+    before = database.get_user_stats()
+    record = {"created_at": 8000.0, "seed": 0, "pos": 40, "elapsed": 10.0,
+              "word_count": 8, "wordset_id": setup_db, "errors": {"q": 2}}
+    database.ingest_games([dict(record, finished=0)])
+    assert database.get_user_stats() == before
+    (id,) = database.get_connection().execute(
+        "SELECT id FROM games WHERE created_at = 8000"
+    ).fetchone()
+    assert database.finish_game(id)
+    assert database.finish_game(id)
+    database.ingest_games([record])
+    stats = database.get_user_stats()
+    assert stats["games"] == before["games"] + 1
+    assert stats["best wpm"][1] >= 48
+    assert ("q", 2) in database.get_error_totals()
+    assert database.verify_user_stats() == {}
+
+
+def test_confusion_totals_follow_games(setup_db):
+    record = {"created_at": 8500.0, "seed": 0, "pos": 3, "elapsed": 10.0,
+              "word_count": 1, "wordset_id": setup_db, "errors": {"e": 1},
+              "confusions": [("e", "r", 1), ("t", "t", 2)]}
+    before = dict(((e, t), c) for e, t, c in database.get_confusion_totals())
+    database.ingest_games([dict(record, finished=0)])
+    assert dict(((e, t), c) for e, t, c in database.get_confusion_totals()) == before
+    database.ingest_games([dict(record, finished=1)])
+    database.ingest_games([dict(record, finished=1, confusions=[("t", "t", 3)])])
+    totals = dict(((e, t), c) for e, t, c in database.get_confusion_totals())
+    assert totals.get(("e", "r"), 0) == before.get(("e", "r"), 0)
+    assert totals[("t", "t")] == before.get(("t", "t"), 0) + 3
+    (id,) = database.get_connection().execute(
+        "SELECT id FROM games WHERE created_at = 8500"
+    ).fetchone()
+    assert database.get_game_confusions(id) == [("t", "t", 3)]
+    assert database.verify_user_stats() == {}
+
+
+def test_word_totals_follow_games(setup_db):
+    record = {"created_at": 8700.0, "seed": 0, "pos": 12, "elapsed": 10.0,
+              "word_count": 3, "wordset_id": setup_db, "errors": {},
+              "words": [("test", 800, 0), ("word", 1200, 1), ("test", 600, 1)]}
+    database.ingest_games([record])
+    assert database.get_slowest_words(setup_db, min_count=1)[:2] == [
+        ("word", 1200.0, 1), ("test", 700.0, 2)
+    ]
+    assert database.get_error_prone_words(setup_db, min_count=2) == [("test", 0.5, 2)]
+    database.ingest_games([dict(record, words=[("test", 500, 0)])])
+    assert database.get_slowest_words(setup_db, min_count=1)[0] == ("test", 500.0, 1)
+    # "test " in 500 ms: 1 word of 5 characters in 1/120 minute
+    assert database.get_word_speed(setup_db) == pytest.approx(120.0)
+    (id,) = database.get_connection().execute(
+        "SELECT id FROM games WHERE created_at = 8700"
+    ).fetchone()
+    assert database.get_game_words(id) == [("test", 500, 0)]
+    assert database.verify_user_stats() == {}
+
+
+def test_word_schedule_round_trip(setup_db):
+    assert database.save_word_schedule(setup_db, [("test", 1, 1.0, 2.5, 100.0)])
+    assert database.save_word_schedule(setup_db, [("test", 2, 6.0, 2.6, 200.0)])
+    assert database.get_word_schedule(setup_db) == [("test", 2, 6.0, 2.6, 200.0)]
+    # schedules changed outside the scheduler (e.g. by an import) are picked up
+    assert models.ReviewScheduler.load_due_words(setup_db, 10) == ["test"]
+    assert database.save_word_schedule(setup_db, [("test", 3, 15.0, 2.6, time.time() + 1000)])
+    assert models.ReviewScheduler.load_due_words(setup_db, 10) == []
+
+
+def test_default_period_is_current(setup_db, monkeypatch):
+    end, start = database.get_default_period()
+    assert start < end
+    monkeypatch.setattr(database.time, "time", lambda: end + 3600)
+    assert database.get_default_period()[0] == end + 3600
+    assert isinstance(database.get_top_error_chars(), list)
+
+
+def test_bucketed_stats(setup_db):
+    monday = time.mktime((2001, 1, 1, 12, 0, 0, 0, 0, -1))
+    database.ingest_games([
+        {"created_at": monday + day * 86400, "seed": 0, "pos": pos, "elapsed": elapsed,
+         "word_count": 10, "wordset_id": setup_db, "mode": "Zen", "errors": {}}
+        for day, pos, elapsed in [(0, 50, 10.0), (2, 50, 20.0), (7, 0, 0.0)]
+    ])
+    period = (monday + 30 * 86400, monday - 86400)
+    weeks = database.get_bucketed_stats("week", period, wordset_id=setup_db)
+    assert [(w.bucket, w.games) for w in weeks] == [("2001-01-01", 2), ("2001-01-08", 1)]
+    assert weeks[0].wpm_mean == pytest.approx(45) and weeks[0].wpm_std == pytest.approx(15)
+    assert weeks[1].wpm_mean is None and weeks[1].accuracy_mean is None
+    (month,) = database.get_bucketed_stats("month", period, by_mode=True, mode="Zen")
+    assert (month.bucket, month.mode, month.games) == ("2001-01-01", "Zen", 3)
+    assert len(database.get_game_data(period)) == 3
+
+
+def test_connections_are_per_thread(db_path):
+    connections = []
+    thread = threading.Thread(
+        target=lambda: connections.append(database.get_connection())
+    )
+    thread.start()
+    thread.join()
+    assert connections[0] is not database.get_connection()
+    assert isinstance(connections[0], sqlite3.Connection)
+
+
+@pytest.mark.parametrize(
+    "queryString, params, expected_plan",
+    [
+        (
+            database.selectGameDataQueryString,
+            (0, 1),
+            ["SEARCH games USING COVERING INDEX games_created_at_idx"],
+        ),
+        (
+            database.selectTopErrorCharsQueryString,
+            (0, 1, 10),
+            [
+                "SEARCH G USING COVERING INDEX games_created_at_idx",
+                "SEARCH E USING PRIMARY KEY",
+                "SEARCH archived_errors USING PRIMARY KEY",
+            ],
+        ),
+        (
+            database.selectGameIdQueryString,
+            (1,),
+            ["SEARCH games USING COVERING INDEX sqlite_autoindex_games_2"],
+        ),
+        (
+            database.selectWordsetByIdQueryString,
+            (1,),
+            [
+                "SEARCH WS USING INTEGER PRIMARY KEY",
+                "SEARCH W USING COVERING INDEX words_wordset_id_idx",
+            ],
+        ),
+        (
+            database.selectPeriodSummaryQueryString,
+            (0, 1),
+            ["SEARCH daily_stats USING PRIMARY KEY (day>? AND day<?)"],
+        ),
+        (
+            database._bucketed_stats_query("week", True, False, False, True),
+            (0, 1, 1),
+            ["SEARCH daily_stats USING INDEX daily_stats_wordset_idx (wordset_id=? AND day>? AND day<?)"],
+        ),
+        (
+            database._game_history_query("wpm", True, False, False, False, True),
+            (100, 5000, 10),
+            [
+                "SEARCH G USING INDEX games_wpm_idx (finished=? AND wpm>? AND (wpm,created_at)<(?,?))",
+                "SEARCH WS USING INTEGER PRIMARY KEY (rowid=?)",
+            ],
+        ),
+    ],
+)
+def test_query_plan(db_path, queryString, params, expected_plan):
+    plan = [
+        row[3]
+        for row in database.get_connection().execute(
+            "EXPLAIN QUERY PLAN " + queryString, params
         )
-        VALUES (?, ?, ?, ?, ?, ?, ?)
-        """
+    ]
+    # scanning a subquery's own output is fine, scanning a table is not
+    assert not any(
+        step.startswith("SCAN") and not step.startswith("SCAN (subquery")
+        for step in plan
     )
-    for val in ["default", wordset_id, 42, 0, "", 0, 30000]:
-        createQuery.addBindValue(val)
-    assert createQuery.exec()
+    for expected in expected_plan:
+        assert any(step.startswith(expected) for step in plan), plan
+
+
+def test_default_maintenance_keeps_history(setup_db):
+    con = database.get_connection()
+    (count,) = con.execute("SELECT COUNT(*) FROM games").fetchone()
+    database.run_maintenance()
+    assert con.execute("SELECT COUNT(*) FROM games").fetchone() == (count,)
+
+
+def test_retention_keeps_statistics(setup_db):
+    period = (86400.0 * 500, 0)
+    summary = database.get_period_summary(period)
+    error_chars = sorted(database.get_top_error_chars(period))
+    assert database.get_game_history(period=period)
+
+    assert database.apply_retention(max_age_days=365) > 0
+    assert database.get_game_history(period=period) == []
+    assert database.get_period_summary(period) == summary
+    assert sorted(database.get_top_error_chars(period)) == error_chars
+    database.run_maintenance(max_age_days=365, analyze=True)
+    assert database.get_connection().execute("PRAGMA auto_vacuum").fetchone() == (2,)
 
 
-@pytest.mark.usefixtures("setup_db")
-def test_get_wordset(con):
-    pass
+def test_recompute_after_retention(setup_db):
+    # one game kept by the retention policy next to the archived ones
+    database.ingest_games([{
+        "created_at": time.time() - 100, "seed": 0, "pos": 50, "elapsed": 20.0,
+        "word_count": 9, "wordset_id": setup_db, "errors": {"z": 3},
+    }])
+    stats = database.get_user_stats()
+    error_totals = database.get_error_totals(100)
+    confusion_totals = database.get_confusion_totals()
+    assert stats["games"]
+    assert database.verify_user_stats() == {}
+    database.recompute_user_stats()
+    assert database.get_user_stats().keys() == stats.keys()
+    for name, value in database.get_user_stats().items():
+        assert value == pytest.approx(stats[name]), name
+    assert database.get_error_totals(100) == error_totals
+    assert database.get_confusion_totals() == confusion_totals
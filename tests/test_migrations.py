@@ -0,0 +1,84 @@
+import sqlite3
+
+import pytest
+
+from .context import speed_typing_game
+from speed_typing_game import migrations
+
+
+@pytest.fixture
+def legacy_db():
+    con = sqlite3.connect(":memory:")
+    con.executescript(
+        """
+            CREATE TABLE wordsets (
+                id INTEGER PRIMARY KEY AUTOINCREMENT UNIQUE NOT NULL,
+                name VARCHAR(40) NOT NULL,
+                language_code VARCHAR(6) NOT NULL,
+                difficulty INTEGER
+            );
+            CREATE TABLE words (
+                id INTEGER PRIMARY KEY AUTOINCREMENT UNIQUE NOT NULL,
+                content VARCHAR(50) NOT NULL,
+                wordset_id INTEGER NOT NULL,
+                FOREIGN KEY (wordset_id)
+                    REFERENCES wordsets(id)
+                    ON DELETE CASCADE,
+                UNIQUE(content, wordset_id)
+            );
+            CREATE TABLE games (
+                id INTEGER PRIMARY KEY AUTOINCREMENT UNIQUE NOT NULL,
+                mode VARCHAR(10),
+                wordset_id INTEGER,
+                seed INTEGER NOT NULL,
+                pos INTEGER NOT NULL,
+                incorrect_chars TEXT,
+                elapsed REAL,
+                created_at REAL NOT NULL UNIQUE,
+                FOREIGN KEY (wordset_id)
+                    REFERENCES wordsets (id)
+                    ON DELETE SET NULL
+            );
+            INSERT INTO wordsets (name, language_code, difficulty)
+            VALUES ('test_name', 'en', 1);
+            INSERT INTO words (content, wordset_id) VALUES ('test_word', 1);
+            INSERT INTO games (
+                mode, wordset_id, seed, pos, incorrect_chars, elapsed, created_at
+            )
+            VALUES ('default', 1, 42, 0, '', 10, 30000),
+                   ('default', 1, 43, 10, 'aab', 20, 40000);
+        """
+    )
+    yield con
+    con.close()
+
+
+def test_migrate_legacy_database(legacy_db):
+    assert migrations.migrate(legacy_db) == len(migrations.MIGRATIONS)
+    assert migrations.get_schema_version(legacy_db) == len(migrations.MIGRATIONS)
+    row = legacy_db.execute(
+        "SELECT seed, word_count, last_updated FROM games WHERE created_at = 30000"
+    ).fetchone()
+    assert row == (42, None, 30010)
+    errors = legacy_db.execute(
+        """
+        SELECT E.char, E.count, G.error_count FROM game_errors E
+        JOIN games G ON G.id = E.game_id
+        ORDER BY E.char
+        """
+    ).fetchall()
+    assert errors == [("a", 2, 3), ("b", 1, 3)]
+
+
+def test_migrate_is_idempotent(legacy_db):
+    version = migrations.migrate(legacy_db)
+    assert migrations.migrate(legacy_db) == version
+
+
+def test_migrate_empty_database():
+    con = sqlite3.connect(":memory:")
+    migrations.migrate(con)
+    tables = {
+        row[0] for row in con.execute("SELECT name FROM sqlite_master WHERE type = 'table'")
+    }
+    assert {"wordsets", "words", "games"} <= tables
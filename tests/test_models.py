@@ -12,3 +12,68 @@ def polish_wordset():
 
 def test_wordset_fromfile():
     assert 1 == 1
+
+
+def test_confusion_matrix_counts():
+    from speed_typing_game.models import ConfusionMatrix
+    confusion = ConfusionMatrix("ab", [("a", "b", 2)])
+    confusion.record("a", "a")
+    confusion.record("ą", "a")
+    assert sorted(confusion.items()) == [("a", "a", 1), ("a", "b", 2), ("ą", "a", 1)]
+
+
+def test_word_timings():
+    from speed_typing_game.models import WordTimings
+    timings = WordTimings()
+    text = "ab cd ef"
+    for pos, (correct, timestamp) in enumerate(
+        [(True, 1.0), (True, 1.1), (True, 1.2), (False, 1.5), (True, 1.6), (True, 2.0)]
+    ):
+        timings.record(text, pos, correct, True, timestamp)
+    assert list(timings.items()) == [("ab", 200, 0), ("cd", 800, 1)]
+
+
+def test_review_scheduler():
+    from speed_typing_game.models import ReviewScheduler
+    scheduler = ReviewScheduler(1, [("late", 1, 1.0, 2.5, 100.0), ("later", 1, 1.0, 2.5, 200.0),
+                                    ("future", 1, 1.0, 2.5, 1e12)])
+    assert scheduler.due_words(5, now=1000.0) == ["late", "later"]
+    assert scheduler.due_words(1, now=1000.0) == ["late"]
+    scheduler.review_game(
+        [("late", 500, 0), ("later", 2000, 1), ("new", 400, 1), ("easy", 400, 0)], now=1000.0
+    )
+    assert scheduler.due_words(5, now=1000.0) == []
+    assert scheduler.due_words(5, now=1000.0 + 86400) == ["later", "new"]
+    assert {word for word, *_ in scheduler.flush()} == {"late", "later", "new"}
+    assert "easy" not in scheduler.entries
+
+
+def test_adaptive_difficulty():
+    from speed_typing_game.models import Mode, TypingGame, Wordset
+    wordset = Wordset("bands", "en", 1, ("a", "bb", "ccc", "dddd", "eeeee", "ffffff"))
+    assert wordset.get_difficulty_bands() == (("a", "bb"), ("ccc", "dddd"), ("eeeee", "ffffff"))
+    game = TypingGame(mode=Mode.ADAPTIVE, wordset=wordset, seed=1)
+    game.baseline_wpm = 60.0
+    assert set(game.text.split()) <= {"ccc", "dddd"}
+    # 4 characters in 500 ms are 96 words of 5 characters per minute
+    game.word_timings.words = [("ccc", 500, 0)] * 10
+    visible = game.text[:20]
+    assert game.adapt_difficulty(len(visible))
+    assert game.band == 2
+    assert game.text.startswith(visible)
+    assert set(game.text[len(visible):].split()[1:]) <= {"eeeee", "ffffff"}
+    # the same character speed on longer words keeps the band
+    game.word_timings.words += [("eeeee", 750, 0)] * 10
+    assert not game.adapt_difficulty(len(visible))
+    assert game.band == 2
+
+
+def test_practice_mixes_review_words():
+    from speed_typing_game.models import Mode, TypingGame, Wordset
+    wordset = Wordset("practice", "en", 1, ("a", "b"))
+    game = TypingGame(mode=Mode.PRACTICE, wordset=wordset, seed=1)
+    assert set(game.text.split()) <= {"a", "b"}
+    assert game.set_review_words(["due"])
+    assert game.text.split().count("due") == 1
+    game.start_time = 1.0
+    assert not game.set_review_words(["later"])
@@ -0,0 +1,64 @@
+import math
+
+import pytest
+
+from .context import speed_typing_game
+from speed_typing_game import stats
+
+
+@pytest.fixture(params=[True, False], ids=["numpy", "python"])
+def backend(request, monkeypatch):
+    if request.param and not stats.HAS_NUMPY:
+        pytest.skip("NumPy is not installed")
+    monkeypatch.setattr(stats, "HAS_NUMPY", request.param)
+    yield request.param
+
+
+def test_rolling_mean(backend):
+    assert stats.rolling_mean([1, 2, 3, 4, 5], 2) == pytest.approx([1.5, 2.5, 3.5, 4.5])
+    assert stats.rolling_mean([1, 2], 3) == []
+
+
+def test_percentiles(backend):
+    values = [15, 20, 35, 40, 50]
+    assert stats.percentiles(values, (0, 40, 50, 100)) == pytest.approx([15, 29, 35, 50])
+    assert all(math.isnan(p) for p in stats.percentiles([], (50,)))
+
+
+def test_personal_best_and_trend(backend):
+    dates = [0, 1, 2, 3]
+    values = [10, 30, 20, 40]
+    assert stats.personal_best(dates, values) == (3, 40)
+    slope, intercept = stats.linear_trend(dates, values)
+    assert (slope, intercept) == (pytest.approx(8), pytest.approx(13))
+    assert stats.linear_trend([5, 5], [1, 2])[0] == 0
+
+
+def test_summarize_empty(backend):
+    summary = stats.summarize([], [], [])
+    assert summary["games"] == 0
+    assert summary["best wpm"] is None
+
+
+def test_slowest_ngrams():
+    from speed_typing_game.models import NgramLatencies
+    latencies = NgramLatencies()
+    for char, timestamp in zip("thee", (0.0, 0.1, 0.4, 0.5)):
+        latencies.record(char, True, timestamp)
+    latencies.record("x", False, 0.6)
+    latencies.record("y", True, 0.7)
+    rows = sorted(latencies.items())
+    assert [ngram for ngram, _, _ in rows] == ["ee", "he", "hee", "th", "the"]
+    slowest = stats.slowest_ngrams(rows, count=2)
+    assert [ngram for ngram, _, _ in slowest] == ["hee", "the"]
+    assert slowest[0][1] == pytest.approx(400, rel=0.02)
+
+
+def test_lttb(backend):
+    x = list(range(100))
+    y = [0.0] * 100
+    y[37] = 10.0
+    picked = stats.lttb(x, y, 10)
+    assert len(picked) == 10 and picked[0] == 0 and picked[-1] == 99
+    assert 37 in picked and picked == sorted(picked)
+    assert stats.lttb(x[:5], y[:5], 10) == [0, 1, 2, 3, 4]
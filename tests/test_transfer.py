@@ -0,0 +1,67 @@
+import os
+import sqlite3
+
+import pytest
+
+from .context import speed_typing_game
+from speed_typing_game import database, migrations, models, transfer
+
+
+@pytest.fixture
+def source_records(tmp_path):
+    assert database.init_database(str(tmp_path / "source.sqlite"))
+    wordset = models.Wordset("transfer", "en", 0, ("one", "two"))
+    database.add_wordsets_to_database([wordset])
+    for i in range(5):
+        models.TypingGame(
+            seed=i, mode=models.Mode.CHALLENGE, wordset=wordset, pos=10 + i,
+            incorrect_chars="ab"[:i % 3], elapsed=20, created_at=1000.0 + i,
+            last_updated=1020.0 + i, confusions=[("o", "p", i + 1), ("t", "t", 3)],
+            latencies=[("on", 60 + i, 2)], words=[("one", 300 + i, i % 2)]
+        ).save(finished=bool(i))
+    yield list(database.iter_game_records(chunk_size=2))
+    database.close_connection()
+
+
+@pytest.mark.parametrize("filename", ["games.ndjson", "games.csv"])
+def test_export_import_round_trip(tmp_path, source_records, filename):
+    path = str(tmp_path / filename)
+    assert transfer.export_games(path, chunk_size=2) == 5
+    database.close_connection()
+
+    assert database.init_database(str(tmp_path / "target.sqlite"))
+    database.add_wordsets_to_database([models.Wordset("transfer", "en", 0, ("one",))])
+    assert transfer.import_games(path, chunk_size=2) == (5, 0, 0)
+    assert list(database.iter_game_records()) == source_records
+    assert transfer.import_games(path) == (0, 5, 0)
+
+
+def test_merge_database(tmp_path, source_records):
+    database.close_connection()
+    assert database.init_database(str(tmp_path / "target.sqlite"))
+    database.add_wordsets_to_database([models.Wordset("local", "en", 0, ("three",))])
+    assert database.merge_database(str(tmp_path / "source.sqlite")) == (1, 4)
+    assert database.merge_database(str(tmp_path / "source.sqlite")) == (0, 0)
+    finished = [record for record in source_records if record["finished"]]
+    assert list(database.iter_game_records()) == finished
+    assert sorted(database.get_wordset(name="transfer")[4]) == ["one", "two"]
+    assert database.verify_user_stats() == {}
+
+
+def test_merge_database_leaves_source_untouched(tmp_path, source_records):
+    database.close_connection()
+    source = str(tmp_path / "source.sqlite")
+    with sqlite3.connect(source) as con:
+        con.execute("DROP INDEX games_created_at_idx")
+        con.execute(f"PRAGMA user_version = {len(migrations.MIGRATIONS) - 1}")
+    con.close()
+    assert database.init_database(str(tmp_path / "target.sqlite"))
+    assert database.merge_database(source) == (1, 4)
+    with sqlite3.connect(source) as con:
+        assert migrations.get_schema_version(con) == len(migrations.MIGRATIONS) - 1
+    con.close()
+
+    missing = str(tmp_path / "missing.sqlite")
+    with pytest.raises(sqlite3.OperationalError):
+        database.merge_database(missing)
+    assert not os.path.exists(missing)
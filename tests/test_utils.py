@@ -0,0 +1,31 @@
+import json
+
+from .context import speed_typing_game
+from speed_typing_game import utils
+
+
+def test_stylesheet_substitutes_every_variable():
+    palette_name, palette, style_sheet = utils.get_stylesheet("dark")
+    assert "var(--" not in style_sheet
+    assert f'"{palette["--background-color"]}"' in style_sheet
+    assert utils.get_stylesheet("dark") is utils.get_stylesheet("dark")
+
+
+def test_palette_registry(tmp_path):
+    colors = {key: "#000000" for key in utils.REQUIRED_PALETTE_COLORS}
+    for theme, palette_name, content in [
+        ("dark", "b", json.dumps(colors)),
+        ("dark", "a", json.dumps(colors)),
+        ("dark", "broken", "{"),
+        ("light", "incomplete", json.dumps({"--error-color": "#ff0000"})),
+    ]:
+        (tmp_path / theme / palette_name).mkdir(parents=True)
+        (tmp_path / theme / palette_name / "colors.json").write_text(content)
+    registry = utils.PaletteRegistry(str(tmp_path))
+    assert registry.get_palette_names() == ["a", "b"]
+    assert registry.get_palette_names(["light"]) == []
+    assert registry.get_theme("b") == "dark"
+    assert registry.get_theme("broken") is None
+    assert registry.get_palette("dark", "b") == ("b", colors)
+    assert registry.get_palette("dark", "missing")[0] == "a"
+    assert registry.get_palette("light") is None
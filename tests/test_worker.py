@@ -0,0 +1,55 @@
+import threading
+
+import pytest
+from PyQt6.QtCore import QCoreApplication
+
+from .context import speed_typing_game
+from speed_typing_game import worker
+
+
+@pytest.fixture(scope="module")
+def app():
+    yield QCoreApplication.instance() or QCoreApplication([])
+
+
+def test_requests_run_on_one_thread(app):
+    database_worker = worker.DatabaseWorker()
+    futures = [
+        database_worker.submit(lambda: threading.get_ident()) for _ in range(5)
+    ]
+    idents = {future.result(timeout=5) for future in futures}
+    database_worker.shutdown()
+    assert len(idents) == 1
+    assert threading.get_ident() not in idents
+
+
+def test_callback_runs_on_owner_thread(app):
+    database_worker = worker.DatabaseWorker()
+    results = []
+    future = database_worker.submit(
+        sum, (1, 2, 3),
+        callback=lambda result: results.append((result, threading.get_ident())),
+    )
+    future.result(timeout=5)
+    for _ in range(100):
+        app.processEvents()
+        if results:
+            break
+    database_worker.shutdown()
+    assert results == [(6, threading.get_ident())]
+
+
+def test_errback_receives_failure(app):
+    database_worker = worker.DatabaseWorker()
+    errors = []
+    future = database_worker.submit(
+        int, "x", callback=errors.append, errback=lambda error: errors.append(type(error))
+    )
+    with pytest.raises(ValueError):
+        future.result(timeout=5)
+    for _ in range(100):
+        app.processEvents()
+        if errors:
+            break
+    database_worker.shutdown()
+    assert errors == [ValueError]